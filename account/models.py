@@ -118,6 +118,21 @@ class City(TimeBasedModel):
     def get_default_city_pk() -> int:
         return CityGroup.get_default_city_group().pk
 
+    UNAVAILABLE_PRODUCTS_DOMAINS_KEY = "CITY_DOMAINS_WITH_UNAVAILABLE_PRODUCTS"
+
+    @staticmethod
+    def get_domains_with_unavailable_products() -> set:
+        cached_data = cache.get(City.UNAVAILABLE_PRODUCTS_DOMAINS_KEY)
+        if cached_data is None:
+            cached_data = set(
+                City.objects.filter(product__isnull=False)
+                .values_list("domain", flat=True)
+                .distinct()
+            )
+            cache.set(City.UNAVAILABLE_PRODUCTS_DOMAINS_KEY, cached_data, timeout=60 * 10)
+
+        return cached_data
+
 
 class CityGroup(TimeBasedModel):
     name = models.CharField(max_length=255, verbose_name="Название группы", unique=True)
@@ -144,14 +159,17 @@ class CityGroup(TimeBasedModel):
 
     @staticmethod
     def get_main_city_domain(domain: str) -> str | None:
-        key = f"GET_MAIN_CITY_DOMAIN_{domain.upper()}"
-        cached_data = cache.get(key)
-        if not cached_data:
-            cg = CityGroup.objects.filter(cities__domain=domain).first()
-            cached_data = cg.main_city.domain if cg and cg.main_city else None
-            cache.set(key, cached_data, timeout=60 * 60 * 24)
+        from shop.services.city_table import CityTable
 
-        return cached_data
+        main_city = CityTable.get_main_city(CityTable.get_city_group(domain))
+        return main_city.domain if main_city else None
+
+    @staticmethod
+    def get_pk_by_domain(domain: str) -> int | None:
+        from shop.services.city_table import CityTable
+
+        city = CityTable.get_city(domain)
+        return city.city_group_id if city else None
 
     @staticmethod
     def get_default_city_group() -> "CityGroup":
@@ -2,7 +2,8 @@ from django_filters import rest_framework as filters
 from django.db.models import Q, Min, Max, QuerySet
 
 from account.models import CityGroup
-from shop.models import Category, Characteristic, Product
+from shop.models import Product
+from shop.services import CategoryDescendantsIndex, CharacteristicFacetService
 from api.mixins import GeneralSearchMixin
 
 
@@ -124,8 +125,9 @@ class ProductFilter(GeneralSearchMixin, filters.FilterSet):
             if name not in ("price_lte", "price_gte") and value is not None:
                 queryset = self.filters[name].filter(queryset, value)
 
-        aggregates = queryset.aggregate(
-            min_price=Min("prices__price"), max_price=Max("prices__price")
+        price_field = self._price_field
+        aggregates = queryset.filter(**self._price_scope).aggregate(
+            min_price=Min(price_field), max_price=Max(price_field)
         )
 
         self.min_price = aggregates["min_price"] or 0
@@ -142,15 +144,49 @@ class ProductFilter(GeneralSearchMixin, filters.FilterSet):
 
         gte_data = self.data.get("price_gte")
         lte_data = self.data.get("price_lte")
-        price_filter = Q()
+        if lte_data is None and gte_data is None:
+            return queryset
 
+        price_filter = Q(**self._price_scope)
         if lte_data is not None:
-            price_filter &= Q(prices__price__lte=lte_data)
+            price_filter &= Q(**{f"{self._price_field}__lte": lte_data})
         if gte_data is not None:
-            price_filter &= Q(prices__price__gte=gte_data)
+            price_filter &= Q(**{f"{self._price_field}__gte": gte_data})
 
         return queryset.filter(price_filter)
 
+    @property
+    def _city_group_pk(self):
+        """
+        Возвращает id группы городов для домена фильтра.
+        """
+
+        if not hasattr(self, "_cg_pk"):
+            self._cg_pk = (
+                CityGroup.get_pk_by_domain(self.city_domain) if self.city_domain else None
+            )
+
+        return self._cg_pk
+
+    @property
+    def _price_field(self) -> str:
+        """
+        Возвращает путь к полю цены: цена каталога группы городов, если она известна.
+        """
+
+        return "catalog_prices__price" if self._city_group_pk else "prices__price"
+
+    @property
+    def _price_scope(self) -> dict:
+        """
+        Возвращает условие, ограничивающее цены группой городов домена.
+        """
+
+        if not self._city_group_pk:
+            return {}
+
+        return {"catalog_prices__city_group_id": self._city_group_pk}
+
     def filter_search(self, queryset, name, value):
         """
         Выполняет полнотекстовый поиск по товарам.
@@ -167,8 +203,9 @@ class ProductFilter(GeneralSearchMixin, filters.FilterSet):
             exclude_=("brands", "categories"),
             page=page,
             ordering=ordering,
+            ids_only=True,
         )
-        queryset = search_results["products"]["queryset"].filter(pk__in=queryset)
+        queryset = self.get_hits_queryset(search_results["products"]).filter(pk__in=queryset)
         if self.city_domain:
             queryset = queryset.exclude(unavailable_in__domain=self.city_domain)
 
@@ -190,49 +227,26 @@ class ProductFilter(GeneralSearchMixin, filters.FilterSet):
 
     def _get_chars(self, queryset: QuerySet = None):
         """
-        Получает доступные характеристики для товаров в QuerySet.
+        Получает доступные характеристики для товаров в QuerySet
+        вместе с количеством товаров по каждому значению.
         """
 
         if queryset is None:
             queryset = self.qs
 
-        result = []
-        category_ids = queryset.values_list("category", flat=True)
-        characteristics_queryset = Characteristic.objects.filter(
-            Q(categories__children__in=category_ids) | Q(categories__in=category_ids),
-            for_filtering=True,
-            is_active=True,
-        ).distinct()
-        for char in characteristics_queryset:
-            values = (
-                char.characteristicvalue_set.filter(
-                    product__in=queryset, is_active=True
-                )
-                .values("value", "slug")
-                .order_by("slug")
-                .distinct("slug")
-            )
-            if values.exists():
-                result.append({"name": char.name, "slug": char.slug, "values": values})
-
-        return result
+        return CharacteristicFacetService.get_facets(queryset)
 
     def filter_category(self, queryset, name, value):
         """
         Фильтрует товары по категории и дочерним категориям.
         """
 
-        q = Q()
         category_slugs = set(map(lambda x: x.strip(), value.split(",")))
-        for ctg in Category.objects.filter(slug__in=category_slugs):
-            category_slugs.update(
-                ctg.get_descendants()
-                .filter(is_active=True, is_visible=True)
-                .values_list("slug", flat=True)
-            )
+        category_ids = CategoryDescendantsIndex.get_ids_by_slugs(category_slugs)
 
-        q |= Q(category__slug__in=category_slugs)
-        q |= Q(additional_categories__slug=category_slugs)
+        q = Q(category_id__in=category_ids) | Q(
+            additional_categories__in=category_ids
+        )
 
         queryset = queryset.filter(q).distinct()
         if not self.data.get("search"):
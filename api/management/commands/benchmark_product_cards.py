@@ -0,0 +1,61 @@
+import timeit
+
+from django.core.management import BaseCommand
+from django.core.management.base import CommandParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.mixins import AnnotateProductMixin
+from api.serializers import ProductCardBuilder, ProductCatalogSerializer
+from shop.models import Product
+
+
+class Command(BaseCommand):
+    """
+    Django management команда для сравнения построения карточек товаров
+    `ProductCatalogSerializer` и `ProductCardBuilder` на данных каталога.
+    """
+
+    help = 'Сравнивает скорость построения карточек товаров каталога'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--products', type=int, default=500, help='Количество товаров в выдаче')
+        parser.add_argument('--repeat', type=int, default=10, help='Количество повторов')
+        parser.add_argument('--city-domain', type=str, default='', help='Домен города для цен')
+
+    def handle(self, *args, **kwargs):
+        annotator = AnnotateProductMixin()
+        annotator.request = Request(APIRequestFactory().get('/', {'city_domain': kwargs['city_domain']}))
+        queryset = annotator.annotate_queryset(
+            Product.objects.filter(is_active=True).order_by('-priority', 'pk')
+        )[:kwargs['products']]
+
+        builder = ProductCardBuilder.for_queryset(queryset)
+        context = {'city_domain': kwargs['city_domain']}
+        instances = list(queryset)
+        rows = list(builder.values(queryset))
+        if not instances:
+            self.stderr.write(self.style.ERROR('Нет товаров для сравнения'))
+            return
+
+        serialized = [dict(card) for card in ProductCatalogSerializer(instances, many=True, context=context).data]
+        if serialized != builder.build(rows):
+            self.stderr.write(self.style.ERROR('Карточки сериализатора и ProductCardBuilder различаются'))
+
+        cases = {
+            'serializer': lambda: ProductCatalogSerializer(instances, many=True, context=context).data,
+            'builder': lambda: builder.build(rows),
+            'serializer+fetch': lambda: ProductCatalogSerializer(list(queryset.all()), many=True, context=context).data,
+            'builder+fetch': lambda: builder.build(builder.values(queryset.all())),
+        }
+        timings = {
+            name: timeit.timeit(case, number=kwargs['repeat']) / kwargs['repeat'] / len(instances) * 1e6
+            for name, case in cases.items()
+        }
+        for name, per_card in timings.items():
+            self.stdout.write(f'{name}: {per_card:.1f} мкс на карточку')
+
+        self.stdout.write(
+            f"Ускорение: x{timings['serializer'] / timings['builder']:.1f}, "
+            f"с выборкой из БД: x{timings['serializer+fetch'] / timings['builder+fetch']:.1f}"
+        )
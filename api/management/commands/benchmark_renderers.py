@@ -0,0 +1,53 @@
+import json
+import timeit
+
+from django.core.management import BaseCommand
+from django.core.management.base import CommandParser
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import ORJSONRenderer
+from api.serializers import CategorySerializer, ProductCatalogSerializer
+from shop.models import Category, Product
+
+
+class Command(BaseCommand):
+    """
+    Django management команда для сравнения скорости `JSONRenderer` и `ORJSONRenderer`
+    на реальных данных каталога: странице карточек товаров и дереве категорий.
+    """
+
+    help = 'Сравнивает скорость рендеринга JSON ответов каталога'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--products', type=int, default=100, help='Количество товаров в выдаче')
+        parser.add_argument('--repeat', type=int, default=50, help='Количество повторов рендеринга')
+        parser.add_argument('--city-domain', type=str, default='', help='Домен города для цен')
+
+    def handle(self, *args, **kwargs):
+        context = {'city_domain': kwargs['city_domain']}
+        products = Product.objects.filter(is_active=True).order_by('-priority')[:kwargs['products']]
+        payloads = {
+            'catalog': ProductCatalogSerializer(products, many=True, context=context).data,
+            'categories': CategorySerializer(
+                Category.objects.filter(level=0, is_active=True, is_visible=True).order_by('order'),
+                many=True,
+                context=context,
+            ).data,
+        }
+
+        renderers = {'json': JSONRenderer(), 'orjson': ORJSONRenderer()}
+        for name, payload in payloads.items():
+            rendered = {key: renderer.render(payload) for key, renderer in renderers.items()}
+            if json.loads(rendered['json']) != json.loads(rendered['orjson']):
+                self.stderr.write(self.style.ERROR(f'{name}: результаты рендереров различаются'))
+
+            timings = {
+                key: timeit.timeit(lambda r=renderer: r.render(payload), number=kwargs['repeat']) / kwargs['repeat']
+                for key, renderer in renderers.items()
+            }
+            self.stdout.write(
+                f"{name}: {len(rendered['json']) / 1024:.1f} KiB, "
+                f"json {timings['json'] * 1000:.2f} ms, "
+                f"orjson {timings['orjson'] * 1000:.2f} ms, "
+                f"x{timings['json'] / timings['orjson']:.1f}"
+            )
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management import BaseCommand
+from django.core.management.base import CommandParser
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django_elasticsearch_dsl.registries import registry
+
+
+class Command(BaseCommand):
+    """
+    Django management команда для сравнения скорости подготовки документов Elasticsearch
+    из QuerySet модели без предзагрузки (по запросу на связи каждого документа) и из
+    индексирующего QuerySet документа с пакетной загрузкой связей. Документы только
+    подготавливаются и в Elasticsearch не отправляются.
+    """
+
+    help = 'Сравнивает скорость подготовки документов поиска с пакетной загрузкой связей и без неё'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--limit', type=int, default=1000, help='Количество объектов каждого индекса')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Размер пачки выборки из базы данных')
+
+    def handle(self, *args, **kwargs):
+        for document in sorted(registry.get_documents(), key=lambda document: document._index._name):
+            doc = document()
+            querysets = {
+                'before': doc.django.model._default_manager.all(),
+                'after': doc.get_queryset(),
+            }
+
+            results = {}
+            for name, queryset in querysets.items():
+                queryset = queryset.order_by('pk')[:kwargs['limit']]
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    count = sum(1 for _ in doc.get_actions(queryset.iterator(chunk_size=kwargs['chunk_size']), 'index'))
+                    elapsed = time.perf_counter() - started
+                results[name] = (count, len(queries), count / elapsed if elapsed else 0)
+
+            self.stdout.write(
+                f"{document._index._name}: "
+                + ', '.join(
+                    f'{name} {count} docs, {queries} queries, {rate:.0f} docs/s'
+                    for name, (count, queries, rate) in results.items()
+                )
+                + f", x{results['after'][2] / results['before'][2] if results['before'][2] else 0:.1f}"
+            )
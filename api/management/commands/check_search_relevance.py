@@ -0,0 +1,131 @@
+import json
+
+from django.core.management import BaseCommand
+from django.core.management.base import CommandError, CommandParser
+from elasticsearch_dsl import Search, connections
+
+from shop.documents import BrandDocument, CategoryDocument, ProductDocument
+from shop.services import SearchQueryBuilder
+
+
+INDEXES = (
+    ProductDocument._index._name,
+    CategoryDocument._index._name,
+    BrandDocument._index._name,
+)
+
+
+class Command(BaseCommand):
+    """
+    Django management команда для сверки релевантности общего поиска.
+
+    В режиме `--record` выполняет запросы из файла (по одному в строке) прежними
+    wildcard запросами и сохраняет упорядоченные id результатов по индексам.
+    В режиме `--check` выполняет записанные запросы через подполя `autocomplete`
+    и сравнивает результаты с записанными: долю совпавших результатов и сохранение
+    их взаимного порядка.
+    """
+
+    help = 'Записывает и сверяет выдачу общего поиска по набору запросов'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        mode = parser.add_mutually_exclusive_group(required=True)
+        mode.add_argument('--record', type=str, help='Файл для записи эталонной выдачи')
+        mode.add_argument('--check', type=str, help='Файл с записанной эталонной выдачей')
+        parser.add_argument('--queries', type=str, help='Файл с поисковыми запросами для записи')
+        parser.add_argument(
+            '--domain', type=str,
+            help='Домен главного города группы, обязателен для записи (по умолчанию при сверке - записанный)',
+        )
+        parser.add_argument('--size', type=int, default=10, help='Количество результатов по индексу')
+        parser.add_argument(
+            '--min-overlap', type=float, default=0.0,
+            help='Минимальная средняя доля совпавших результатов',
+        )
+
+    def handle(self, *args, **kwargs):
+        if kwargs['record']:
+            return self.record(kwargs)
+        return self.check_recorded(kwargs)
+
+    def search(self, builder: SearchQueryBuilder, index: str, domain: str, size: int) -> list[int]:
+        """
+        Выполняет запрос по индексу и возвращает id результатов в порядке выдачи.
+
+        :param builder: Построитель запросов.
+        :param index: Имя индекса.
+        :param domain: Домен главного города группы.
+        :param size: Количество результатов.
+        :return: Список id.
+        :rtype: list[int]
+        """
+        search = (
+            Search(using=connections.get_connection(), index=index)
+            .query(builder.for_index(index, domain))
+            .filter('term', is_active=True)
+            .source(['id'])
+            .extra(size=size)
+        )
+        return [hit.id for hit in search.execute()]
+
+    def record(self, options: dict) -> None:
+        if not options['queries']:
+            raise CommandError('--queries is required with --record')
+        if not options['domain']:
+            # Без домена запрос по товарам не находит цен группы городов и выдача пуста
+            raise CommandError('--domain is required with --record')
+
+        with open(options['queries'], encoding='utf-8') as file:
+            queries = [line.strip() for line in file if line.strip()]
+
+        results = {
+            query: {
+                index: self.search(
+                    SearchQueryBuilder(query, autocomplete=False), index, options['domain'], options['size']
+                )
+                for index in INDEXES
+            }
+            for query in queries
+        }
+        with open(options['record'], 'w', encoding='utf-8') as file:
+            json.dump(
+                {'domain': options['domain'], 'size': options['size'], 'queries': results},
+                file, ensure_ascii=False, indent=2,
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'Записано запросов: {len(results)}'))
+
+    def check_recorded(self, options: dict) -> None:
+        with open(options['check'], encoding='utf-8') as file:
+            recorded = json.load(file)
+
+        domain = options['domain'] or recorded.get('domain')
+        if not domain:
+            raise CommandError(f'--domain is required: {options["check"]} has no recorded domain')
+
+        overlaps, reordered = [], 0
+        for query, expected_by_index in recorded['queries'].items():
+            builder = SearchQueryBuilder(query)
+            for index, expected in expected_by_index.items():
+                if not expected:
+                    continue
+
+                actual = self.search(builder, index, domain, recorded['size'])
+                common = set(expected) & set(actual)
+                overlap = len(common) / len(expected)
+                order_kept = [i for i in expected if i in common] == [i for i in actual if i in common]
+                overlaps.append(overlap)
+                reordered += not order_kept
+
+                if overlap < 1 or not order_kept:
+                    self.stdout.write(
+                        f'{query!r} [{index}]: совпадение {overlap:.0%}, '
+                        f'порядок {"сохранён" if order_kept else "изменён"}'
+                    )
+
+        average = sum(overlaps) / len(overlaps) if overlaps else 1.0
+        self.stdout.write(
+            f'Выдач: {len(overlaps)}, среднее совпадение {average:.1%}, с изменённым порядком: {reordered}'
+        )
+        if average < options['min_overlap']:
+            raise CommandError(f'Среднее совпадение {average:.1%} ниже {options["min_overlap"]:.1%}')
@@ -0,0 +1,23 @@
+from django.core.management import BaseCommand
+from django.core.management.base import CommandParser
+
+from api.mixins.cache_response import CacheTags
+from shop.models import CatalogPrice, Product
+
+
+class Command(BaseCommand):
+    """
+    Django management команда для полной пересборки денормализованных цен каталога.
+
+    Используется после массовых изменений цен в обход сигналов (например, `QuerySet.update`).
+    """
+
+    help = 'Пересобирает цены каталога по группам городов из таблицы цен'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--batch-size', type=int, default=1000, help='Размер пакета для bulk_create')
+
+    def handle(self, *args, **kwargs):
+        count = CatalogPrice.rebuild(batch_size=kwargs['batch_size'])
+        CacheTags.invalidate_model(CatalogPrice, Product)
+        self.stdout.write(self.style.SUCCESS(f'Цены каталога пересобраны: {count} строк.'))
@@ -0,0 +1,31 @@
+from django.core.management import BaseCommand
+from django.core.management.base import CommandParser
+from django.db import transaction
+
+from api.mixins.cache_response import CacheTags
+from shop.models import Product
+
+
+class Command(BaseCommand):
+    """
+    Django management команда для пересчета денормализованного рейтинга товаров.
+
+    Используется после массовых изменений отзывов в обход сигналов (например, `QuerySet.update`).
+    """
+
+    help = 'Пересчитывает средний рейтинг и количество отзывов товаров'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--batch-size', type=int, default=1000, help='Количество товаров в одном UPDATE')
+
+    def handle(self, *args, **kwargs):
+        batch_size = kwargs['batch_size']
+        product_ids = list(Product.objects.order_by('pk').values_list('pk', flat=True))
+
+        count = 0
+        for i in range(0, len(product_ids), batch_size):
+            with transaction.atomic():
+                count += Product.update_rating(product_ids[i:i + batch_size])
+
+        CacheTags.invalidate_model(Product)
+        self.stdout.write(self.style.SUCCESS(f'Рейтинг пересчитан для {count} товаров.'))
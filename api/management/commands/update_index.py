@@ -1,16 +1,41 @@
-import subprocess
+import time
+
 from django.core.management import BaseCommand
-from django.core.management.base import CommandError
+from django.core.management.base import CommandError, CommandParser
+from django.utils import timezone
+from django_elasticsearch_dsl import Document
+from django_elasticsearch_dsl.registries import registry
+from elasticsearch.helpers import parallel_bulk
+from elasticsearch_dsl import connections
+from loguru import logger
+
+from api.mixins.general_search import SearchResultCache
+from shop.services import SearchIndexQueue
 
 
 class Command(BaseCommand):
     """
-    Django management команда для автоматической перестройки индексов Elasticsearch без интерактивного подтверждения.
+    Django management команда для перестройки индексов Elasticsearch без простоя поиска.
 
-    Использует команду `search_index --rebuild` для удаления и пересоздания индексов.
+    Каждый документ загружается в новый индекс с меткой времени в имени (`products-20240101120000`)
+    параллельной потоковой bulk загрузкой. Поиск в это время продолжает работать по старому
+    индексу через алиас с именем индекса документа (`products`). После загрузки алиас атомарно
+    переключается на новый индекс, а старые индексы удаляются. Очередь инкрементальной
+    индексации документа на время перестройки приостанавливается, и накопленные за это время
+    изменения применяются уже к новому индексу. Кэш результатов поиска по индексу
+    инвалидируется после переключения.
     """
 
-    help = 'Rebuild Elasticsearch indexes without interactive confirmation'
+    help = 'Rebuild Elasticsearch indexes into new indices and swap aliases without downtime'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--indexes', nargs='*', default=None,
+            help='Имена индексов (алиасов) для перестройки, по умолчанию все',
+        )
+        parser.add_argument('--chunk-size', type=int, default=500, help='Количество документов в bulk запросе')
+        parser.add_argument('--workers', type=int, default=4, help='Количество потоков bulk загрузки')
+        parser.add_argument('--keep-old', action='store_true', help='Не удалять старые индексы')
 
     def handle(self, *args, **options):
         """
@@ -18,17 +43,115 @@ class Command(BaseCommand):
 
         :param args: Дополнительные позиционные аргументы.
         :param options: Дополнительные именованные аргументы.
-        :raises CommandError: В случае ошибки выполнения команды `search_index --rebuild`.
+        :raises CommandError: В случае ошибки загрузки документов или переключения алиаса.
+        """
+        documents = sorted(registry.get_documents(), key=lambda document: document._index._name)
+        if options['indexes']:
+            documents = [document for document in documents if document._index._name in options['indexes']]
+
+        for document in documents:
+            self.rebuild(document, options['chunk_size'], options['workers'], options['keep_old'])
+
+        self.stdout.write(self.style.SUCCESS('Successfully rebuilt Elasticsearch indexes'))
+
+    def rebuild(self, document: type[Document], chunk_size: int, workers: int, keep_old: bool) -> None:
         """
+        Загружает документы в новый индекс и переключает на него алиас.
 
-        try:
-            # Запускает команду `search_index --rebuild` в дочернем процессе и передает подтверждение 'y'.
-            result = subprocess.run(
-                ['python', 'manage.py', 'search_index', '--rebuild'],
-                input='y', text=True, capture_output=True, check=True
+        :param document: Класс документа.
+        :param chunk_size: Количество документов в bulk запросе.
+        :param workers: Количество потоков bulk загрузки.
+        :param keep_old: Не удалять старые индексы.
+        """
+        client = connections.get_connection()
+        alias = document._index._name
+        name = f'{alias}-{timezone.now():%Y%m%d%H%M%S}'
+        settings = document._index._settings
+
+        # Обновление и реплики не нужны, пока индекс не доступен для поиска
+        index = document._index.clone(name=name)
+        index.settings(refresh_interval='-1', number_of_replicas=0)
+        index.create(using=client)
+
+        with SearchIndexQueue.pause(document):
+            started = time.monotonic()
+            try:
+                indexed = self.load(document, name, chunk_size, workers)
+            except Exception as e:
+                client.indices.delete(index=name, ignore_unavailable=True)
+                raise CommandError(f'Error loading {alias} into {name}: {e}')
+            elapsed = time.monotonic() - started
+
+            client.indices.put_settings(
+                index=name,
+                settings={
+                    'refresh_interval': settings.get('refresh_interval', '1s'),
+                    'number_of_replicas': settings.get('number_of_replicas', 1),
+                },
             )
-            self.stdout.write(self.style.SUCCESS('Successfully rebuilt Elasticsearch indexes'))
-            self.stdout.write(result.stdout)
-        except subprocess.CalledProcessError as e:
-            self.stderr.write(self.style.ERROR(f"Error rebuilding Elasticsearch indexes: {e.stderr}"))
-            raise CommandError(f"Error rebuilding Elasticsearch indexes: {e.stderr}")
+            client.indices.refresh(index=name)
+            old = self.swap_alias(client, alias, name)
+            SearchResultCache.invalidate_index(alias)
+
+        if not keep_old:
+            for old_name in old:
+                client.indices.delete(index=old_name, ignore_unavailable=True)
+
+        self.stdout.write(
+            f'{alias} -> {name}: {indexed} docs in {elapsed:.1f}s, '
+            f'{indexed / elapsed if elapsed else 0:.0f} docs/s'
+        )
+
+    def load(self, document: type[Document], name: str, chunk_size: int, workers: int) -> int:
+        """
+        Загружает документы из базы данных в индекс параллельной потоковой bulk загрузкой.
+
+        :param document: Класс документа.
+        :param name: Имя нового индекса.
+        :param chunk_size: Количество документов в bulk запросе и в пачке выборки из базы данных.
+        :param workers: Количество потоков bulk загрузки.
+        :return: Количество загруженных документов.
+        :rtype: int
+        :raises CommandError: Если часть документов не загружена.
+        """
+        doc = document()
+        objects = doc.get_queryset().iterator(chunk_size=chunk_size)
+        actions = ({**action, '_index': name} for action in doc.get_actions(objects, 'index'))
+
+        indexed, failed = 0, 0
+        for ok, item in parallel_bulk(
+            doc._get_connection(), actions, thread_count=workers, chunk_size=chunk_size, raise_on_error=False
+        ):
+            if ok:
+                indexed += 1
+            else:
+                failed += 1
+                logger.error(f'SEARCH INDEX: failed to index document into {name}: {item}')
+
+        if failed:
+            raise CommandError(f'{failed} documents failed to index into {name}')
+
+        return indexed
+
+    @staticmethod
+    def swap_alias(client, alias: str, name: str) -> list[str]:
+        """
+        Атомарно переключает алиас на новый индекс.
+        Индекс с именем алиаса, созданный до перехода на алиасы, удаляется в той же операции.
+
+        :param client: Клиент Elasticsearch.
+        :param alias: Имя алиаса.
+        :param name: Имя нового индекса.
+        :return: Имена индексов, с которых снят алиас.
+        :rtype: list[str]
+        """
+        actions = [{'add': {'index': name, 'alias': alias}}]
+        old = []
+        if client.indices.exists_alias(name=alias):
+            old = list(client.indices.get_alias(name=alias).keys())
+            actions = [{'remove': {'index': old_name, 'alias': alias}} for old_name in old] + actions
+        elif client.indices.exists(index=alias):
+            actions.insert(0, {'remove_index': {'index': alias}})
+
+        client.indices.update_aliases(actions=actions)
+        return old
@@ -0,0 +1,15 @@
+from prometheus_client import Counter
+
+
+cache_response_requests = Counter(
+    "api_cache_response_requests_total",
+    "Обращения к кэшу ответов API по результату (hit, miss, stale, wait)",
+    ["view", "result"],
+)
+
+
+search_cache_requests = Counter(
+    "api_search_cache_requests_total",
+    "Обращения к кэшу результатов общего поиска по результату (hit, miss)",
+    ["result"],
+)
@@ -1,2 +1,3 @@
 from .log_request import LogRequestMiddleware
-from .api_key import ApiKeyMiddleware
\ No newline at end of file
+from .api_key import ApiKeyMiddleware
+from .city import CityMiddleware
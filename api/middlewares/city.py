@@ -0,0 +1,23 @@
+from django.http.request import HttpRequest
+
+from shop.services.city_table import CityTable
+
+
+class CityMiddleware:
+    """
+    Определяет город и группу городов по параметру `city_domain` (или `domain`)
+    один раз за запрос и сохраняет их в `request.city` и `request.city_group`.
+    """
+
+    DOMAIN_QUERY_PARAMS = ("city_domain", "domain")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest):
+        domain = next(
+            (request.GET[p] for p in self.DOMAIN_QUERY_PARAMS if request.GET.get(p)), None
+        )
+        request.city = CityTable.get_city(domain)
+        request.city_group = request.city.city_group if request.city else None
+        return self.get_response(request)
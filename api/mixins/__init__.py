@@ -1,3 +1,4 @@
+from .sparse_fieldsets import SparseFieldset, SparseFieldsetsMixin, SparseFieldsetsViewMixin
 from .rating import RatingMixin
 from .token_expired import TokenExpiredTimeMixin
 from .validate_phone import ValidatePhoneNumberMixin
@@ -13,4 +14,4 @@ from .product_ordering import ProductSorting
 from .cache_response import CacheResponse
 from .annotate_product import AnnotateProductMixin
 from .delete_some_mixin import DeleteSomeMixin
-from .general_search import GeneralSearchMixin
\ No newline at end of file
+from .general_search import GeneralSearchMixin
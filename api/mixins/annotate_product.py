@@ -1,12 +1,25 @@
 from typing import List
-from django.db.models import F, Sum, Count, Avg, Value, QuerySet
+from django.db.models import (
+    F,
+    Q,
+    Sum,
+    Value,
+    QuerySet,
+    DecimalField,
+    BooleanField,
+    FilteredRelation,
+)
+
+from account.models import CityGroup
+from cart.models import CartItem
 
 
 class AnnotateProductMixin:
     """
     Mixin для добавления аннотаций в QuerySet модели Product.
 
-    Поддерживает аннотации для цен, рейтинга, количества в корзине и других характеристик.
+    Поддерживает аннотации для цен, количества в корзине и других характеристик.
+    Рейтинг хранится в денормализованных полях `Product.rating_avg` и `Product.reviews_count`.
     """
 
     def annotate_queryset(self, queryset, prefix: str = "", fields: List[str] = None):
@@ -22,7 +35,7 @@ class AnnotateProductMixin:
         :rtype: QuerySet
         """
         if fields is None:
-            fields = ("prices", "rating", "cart_quantity")
+            fields = ("prices", "cart_quantity", "category_slug")
 
         for field in fields:
             method_name = f"_annotate_{field}"
@@ -30,9 +43,44 @@ class AnnotateProductMixin:
                 func = getattr(self, method_name)
                 queryset = func(queryset, prefix)
 
-        queryset = queryset.annotate(**{f"{prefix}category_slug": F(f"{prefix}category__slug")})
         return queryset
 
+    def apply_cart_quantity(self, products: List[dict]) -> List[dict]:
+        """
+        Проставляет в сериализованные карточки товаров количество в корзине
+        текущего пользователя одним запросом к его корзине.
+
+        :param products: Сериализованные товары с ключом `id`.
+        :return: Те же товары с полем `cart_quantity`.
+        :rtype: List[dict]
+        """
+        if not (hasattr(self, "request") and self.request.user.is_authenticated):
+            return products
+
+        quantities = dict(
+            CartItem.objects.filter(
+                customer_id=self.request.user.id,
+                product_id__in=[p["id"] for p in products if "id" in p],
+            ).values_list("product_id", "quantity")
+        )
+        for product in products:
+            if "id" in product:
+                product["cart_quantity"] = quantities.get(product["id"])
+
+        return products
+
+    def _annotate_category_slug(self, queryset, prefix: str = "") -> QuerySet:
+        """
+        Аннотирует QuerySet слагом категории товара.
+
+        :param queryset: QuerySet для аннотирования.
+        :param prefix: Префикс для аннотируемых полей.
+        :type prefix: str
+        :return: Аннотированный QuerySet.
+        :rtype: QuerySet
+        """
+        return queryset.annotate(**{f"{prefix}category_slug": F(f"{prefix}category__slug")})
+
     def _annotate_cart_quantity(self, queryset, prefix: str = "") -> QuerySet:
         """
         Аннотирует QuerySet количеством товаров в корзине текущего пользователя.
@@ -59,6 +107,9 @@ class AnnotateProductMixin:
         """
         Аннотирует QuerySet текущей и старой ценами для указанного домена города.
 
+        Цена берется из денормализованной таблицы `CatalogPrice` одной строкой
+        на товар для группы городов домена, поэтому `distinct()` не требуется.
+
         :param queryset: QuerySet для аннотирования.
         :param prefix: Префикс для аннотируемых полей.
         :type prefix: str
@@ -75,30 +126,28 @@ class AnnotateProductMixin:
             )
             return queryset
 
-        fields = {
-            f"{prefix}city_price": F(f"{prefix}prices__price"),
-            f"{prefix}old_price": F(f"{prefix}prices__old_price"),
-        }
-        queryset = (
-            queryset.prefetch_related(f"{prefix}prices")
-            .annotate(**fields)
-            .distinct()
-        )
-        return queryset
-
-    def _annotate_rating(self, queryset, prefix: str = "") -> QuerySet:
-        """
-        Аннотирует QuerySet рейтингом и количеством отзывов.
+        city_group_pk = CityGroup.get_pk_by_domain(domain)
+        if city_group_pk is None:
+            empty_price = Value(None, output_field=DecimalField(max_digits=10, decimal_places=2))
+            return queryset.annotate(
+                **{
+                    f"{prefix}city_price": empty_price,
+                    f"{prefix}old_price": empty_price,
+                    f"{prefix}in_promo": Value(False, output_field=BooleanField()),
+                }
+            )
 
-        :param queryset: QuerySet для аннотирования.
-        :param prefix: Префикс для аннотируемых полей.
-        :type prefix: str
-        :return: Аннотированный QuerySet.
-        :rtype: QuerySet
-        """
-        fields = {
-            f"{prefix}rating": Avg(f"{prefix}reviews__rating"),
-            f"{prefix}reviews_count": Count(f"{prefix}reviews"),
-        }
-        queryset = queryset.prefetch_related(f"{prefix}reviews").annotate(**fields)
+        relation = f"{prefix}catalog_prices"
+        queryset = queryset.annotate(
+            city_group_price=FilteredRelation(
+                relation,
+                condition=Q(**{f"{relation}__city_group_id": city_group_pk}),
+            )
+        ).annotate(
+            **{
+                f"{prefix}city_price": F("city_group_price__price"),
+                f"{prefix}old_price": F("city_group_price__old_price"),
+                f"{prefix}in_promo": F("city_group_price__in_promo"),
+            }
+        )
         return queryset
@@ -1,36 +1,339 @@
-from typing import Any
+import gzip
+import io
+import orjson
+import time
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Optional
 from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
 from django.core.cache import caches
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import models
+from django.http import HttpResponse
+from django.http.response import HttpResponseBase
+from django.utils.cache import patch_vary_headers
+from loguru import logger
 from rest_framework.response import Response
+from urllib.parse import unquote_to_bytes, urlencode, urlsplit
+
+from account.models import City, CityGroup
+
+from api.metrics import cache_response_requests
 
 cache = caches["dev_env"] if settings.DEBUG else caches["default"]
 
+CACHE_IGNORED_QUERY_PREFIXES = ("utm_",)
+CACHE_IGNORED_QUERY_PARAMS = ("fbclid", "gclid", "yclid", "_openstat")
+
+
+class CacheTags:
+    """
+    Версионируемые теги для инвалидации кэшированных ответов.
+
+    Тег - это метка модели (`shop.product`) или объекта (`shop.product:42`).
+    Запись в кэше хранит версии своих тегов на момент сохранения; изменение
+    объекта увеличивает версии его тегов, и зависящие от них записи
+    перестают считаться актуальными без перебора ключей.
+    """
+
+    key_prefix: str = "cache_tag_"
+    tracked_models: tuple = (
+        "shop.category",
+        "shop.brand",
+        "shop.product",
+        "shop.productgroup",
+        "shop.productfile",
+        "shop.productimage",
+        "shop.price",
+        "shop.catalogprice",
+        "shop.characteristic",
+        "shop.characteristicvalue",
+        "shop.review",
+        "shop.favoriteproduct",
+        "shop.promo",
+        "shop.page",
+        "shop.opengraphmeta",
+        "shop.footeritem",
+        "shop.banner",
+        "shop.slider",
+        "shop.mainpagecategorybaritem",
+        "shop.sidebarmenuitem",
+        "shop.itemsetelement",
+        "account.city",
+        "account.citygroup",
+    )
+
+    @staticmethod
+    def for_model(model) -> str:
+        """
+        Возвращает тег модели.
+
+        :param model: Класс или экземпляр модели.
+        :rtype: str
+        """
+        return model._meta.label_lower
+
+    @classmethod
+    def for_object(cls, model, pk: Any) -> str:
+        """
+        Возвращает тег объекта модели.
+
+        :param model: Класс или экземпляр модели.
+        :param pk: Первичный ключ объекта.
+        :rtype: str
+        """
+        return f"{cls.for_model(model)}:{pk}"
+
+    @classmethod
+    def for_all_objects(cls, model) -> str:
+        """
+        Возвращает тег всех объектов модели. Им помечаются записи объектов,
+        он инвалидируется только массово (см. `invalidate_model`).
+
+        :param model: Класс или экземпляр модели.
+        :rtype: str
+        """
+        return cls.for_object(model, "*")
+
+    @classmethod
+    def for_instance(cls, instance: models.Model) -> List[str]:
+        """
+        Возвращает теги, затрагиваемые изменением объекта: тег модели, тег объекта
+        и теги объектов, на которые он ссылается внешними ключами
+        (например, изменение цены затрагивает тег её товара).
+
+        :param instance: Экземпляр модели.
+        :rtype: List[str]
+        """
+        tags = [cls.for_model(instance), cls.for_object(instance, instance.pk)]
+        for field in instance._meta.concrete_fields:
+            if field.many_to_one or field.one_to_one:
+                value = getattr(instance, field.attname)
+                if value is not None:
+                    tags.append(cls.for_object(field.related_model, value))
+
+        return tags
+
+    @classmethod
+    def is_tracked(cls, model) -> bool:
+        """
+        Проверяет, инвалидируются ли теги модели при её изменении.
+        Отслеживаются только модели из `tracked_models`, данные которых
+        попадают в кэшированные ответы.
+
+        :param model: Класс модели.
+        :rtype: bool
+        """
+        return cls.for_model(model) in cls.tracked_models
+
+    @classmethod
+    def get_versions(cls, tags: Iterable[str]) -> Dict[str, int]:
+        """
+        Возвращает текущие версии тегов, инициализируя отсутствующие.
+
+        :param tags: Теги.
+        :return: Словарь тег -> версия.
+        """
+        keys = {f"{cls.key_prefix}{tag}": tag for tag in tags}
+        versions = cache.get_many(keys.keys())
+        for key in keys.keys() - versions.keys():
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+
+        return {keys[key]: version for key, version in versions.items()}
+
+    @classmethod
+    def is_valid(cls, versions: Dict[str, int]) -> bool:
+        """
+        Проверяет, что версии тегов записи не изменились с момента её сохранения.
+
+        :param versions: Сохраненные версии тегов.
+        :rtype: bool
+        """
+        if not versions:
+            return True
+
+        current = cache.get_many(f"{cls.key_prefix}{tag}" for tag in versions)
+        return all(
+            current.get(f"{cls.key_prefix}{tag}") == version
+            for tag, version in versions.items()
+        )
+
+    @classmethod
+    def invalidate(cls, *tags: str) -> None:
+        """
+        Инвалидирует все записи, помеченные переданными тегами.
+
+        :param tags: Теги.
+        """
+        for tag in tags:
+            key = f"{cls.key_prefix}{tag}"
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, time.time_ns(), None)
+
+    @classmethod
+    def invalidate_model(cls, *models_: type) -> None:
+        """
+        Инвалидирует все записи моделей, включая записи отдельных объектов.
+        Используется после массовых изменений в обход сигналов.
+
+        :param models_: Классы моделей.
+        """
+        cls.invalidate(
+            *(tag for model in models_ for tag in (cls.for_model(model), cls.for_all_objects(model)))
+        )
+
 
 class CacheResponse:
     """
     Миксин для кэширования ответов представлений.
 
     Кэширует ответы методов `list` и `retrieve` с заданным временем жизни.
+    Записи помечаются тегами моделей и объектов, от которых зависит ответ,
+    и инвалидируются при их изменении (см. `CacheTags`).
+
+    `cache_tags` - теги ответов `list` (по умолчанию тег модели `queryset`).
+    `cache_retrieve_tags` - теги ответов `retrieve` в дополнение к тегу объекта.
+    `cache_refresh_in_background` - пересчитывать устаревшие записи задачей Celery.
+    `cache_rendered` - кэшировать готовое JSON-тело ответа вместо `response.data`;
+    такой ответ нельзя изменять после `super().list()`/`super().retrieve()`.
+    `cache_compress` - хранить готовое тело сжатым gzip.
+    `cache_per_user` - ответ целиком зависит от пользователя, ключ включает его id.
+    `cache_anonymous` - общий ответ строится от имени анонимного пользователя, чтобы
+    в него не попали данные пользователя запроса. Подходит только представлениям,
+    которым пользователь не нужен для выборки и проверки прав.
+    `cache_user_overlay` - дополнять общий ответ данными пользователя (`apply_user_overlay`);
+    используется вместе с `cache_anonymous`.
+    `cache_query_params` - параметры запроса, учитываемые в ключе (None - все).
+    `cache_query_defaults` - значения параметров по умолчанию, не попадающие в ключ.
+    `cache_collapse_city_domain` - ответ зависит от группы городов, а не от города.
     """
 
     _list_cache_lifetime: int = 60 * 15
     _retrieve_cache_lifetime: int = 60 * 30
 
+    _cache_stale_lifetime: int = 60 * 10
+    _cache_lock_timeout: int = 30
+    _cache_lock_wait: float = 2.0
+
+    cache_tags: Optional[Iterable[str]] = None
+    cache_retrieve_tags: Iterable[str] = ()
+    cache_refresh_in_background: bool = False
+    cache_rendered: bool = False
+    cache_compress: bool = False
+    cache_per_user: bool = False
+    cache_anonymous: bool = False
+    cache_user_overlay: bool = False
+    cache_query_params: Optional[Iterable[str]] = None
+    cache_query_defaults: Dict[str, str] = {"page": "1"}
+    cache_collapse_city_domain: bool = False
+
     def _generate_cache_key(self) -> str:
         """
-        Генерирует ключ для кэширования на основе полного пути запроса.
+        Генерирует ключ для кэширования на основе пути и канонизированных
+        параметров запроса (см. `get_cache_query`).
 
         :return: Сгенерированный ключ для кэша.
         :rtype: str
         """
-        return f"cache_response_{self.request.get_full_path()}"
+        query = urlencode(self.get_cache_query(), doseq=True)
+        return f"cache_response_{self.request.path}?{query}"
+
+    def get_cache_query_params(self) -> Optional[Iterable[str]]:
+        """
+        Возвращает параметры запроса, влияющие на ответ.
+
+        :return: Список параметров или None, если учитываются все параметры.
+        """
+        return self.cache_query_params
+
+    def get_cache_query(self) -> List[tuple]:
+        """
+        Канонизирует параметры запроса для ключа кэша: оставляет разрешенные
+        параметры, отбрасывает метки трекинга, пустые значения и значения
+        по умолчанию, сортирует параметры и их значения. При
+        `cache_collapse_city_domain` домен города заменяется группой городов,
+        так как цены задаются для группы.
+
+        :return: Отсортированный список пар (параметр, значения).
+        :rtype: List[tuple]
+        """
+        allowed = self.get_cache_query_params()
+        allowed = set(allowed) if allowed is not None else None
+
+        query = []
+        for param, values in self.request.query_params.lists():
+            if allowed is not None and param not in allowed:
+                continue
+            if param.startswith(CACHE_IGNORED_QUERY_PREFIXES) or param in CACHE_IGNORED_QUERY_PARAMS:
+                continue
+
+            values = sorted({value.strip() for value in values if value.strip()})
+            if not values or values == [self.cache_query_defaults.get(param)]:
+                continue
+
+            if param == "city_domain" and self.cache_collapse_city_domain:
+                values = [self._canonical_city_domain(value) for value in values]
+
+            query.append((param, values))
+
+        return sorted(query)
+
+    @staticmethod
+    def _canonical_city_domain(domain: str) -> str:
+        """
+        Заменяет домен города идентификатором его группы городов. Домены городов,
+        в которых часть товаров недоступна, сохраняются: их выдача отличается
+        от остальных городов группы.
+
+        :param domain: Домен города.
+        :rtype: str
+        """
+        if domain in City.get_domains_with_unavailable_products():
+            return domain
+
+        city_group_pk = CityGroup.get_pk_by_domain(domain)
+        return f"city_group_{city_group_pk}" if city_group_pk is not None else domain
+
+    def get_cache_tags(self, response: Response) -> List[str]:
+        """
+        Возвращает теги, от которых зависит ответ.
+
+        :param response: Ответ представления.
+        :return: Список тегов.
+        :rtype: List[str]
+        """
+        model = self.queryset.model if getattr(self, "queryset", None) is not None else None
+        if self.action == "retrieve" and model is not None:
+            pk = response.data.get("id") if isinstance(response.data, dict) else None
+            if pk is not None:
+                return [
+                    CacheTags.for_object(model, pk),
+                    CacheTags.for_all_objects(model),
+                    *self.cache_retrieve_tags,
+                ]
+
+        if self.cache_tags is not None:
+            return list(self.cache_tags)
+
+        return [CacheTags.for_model(model)] if model is not None else []
 
     def _get_cached_response(
         self, view_method_name: str, cache_lifetime: int, *args: Any, **kwargs: Any
-    ) -> Response:
+    ) -> HttpResponseBase:
         """
         Получение ответа из кэша или выполнение представления и кэширование ответа.
 
+        Пересчет устаревшей записи выполняет только один запрос, захвативший
+        блокировку; остальные получают устаревшую копию, а при её отсутствии
+        недолго ждут результата. Пересчет общей записи может быть передан
+        фоновой задаче Celery (`cache_refresh_in_background`).
+
+        Запросы сотрудников не кэшируются: им доступны неактивные объекты.
+
         :param view_method_name: Имя метода представления (`list` или `retrieve`).
         :type view_method_name: str
         :param cache_lifetime: Время жизни кэша в секундах.
@@ -38,20 +341,294 @@ class CacheResponse:
         :param args: Дополнительные позиционные аргументы.
         :param kwargs: Дополнительные именованные аргументы.
         :return: Ответ представления.
-        :rtype: Response
+        :rtype: HttpResponseBase
         """
+        if self.request.user.is_staff:
+            return self._get_view_method(view_method_name)(self.request, *args, **kwargs)
+
         cache_key = self._generate_cache_key()
-        cached_data = cache.get(cache_key) or {}
-        if not cached_data:
-            view_method = getattr(super(), view_method_name)
+        if self._is_personal_cache():
+            cache_key = f"{cache_key}_user_{self.request.user.pk}"
+        if self._is_rendered_cache():
+            cache_key = f"{cache_key}_rendered_{self.request.accepted_renderer.format}"
+        lock_key = f"{cache_key}_lock"
+        compute = partial(
+            self._compute_response, view_method_name, cache_key, cache_lifetime, *args, **kwargs
+        )
+
+        if getattr(self.request, "_cache_refresh", False):
+            try:
+                return compute()
+            finally:
+                cache.delete(lock_key)
+
+        cached_data = cache.get(cache_key)
+        if cached_data and self._is_fresh(cached_data):
+            self._track_cache("hit")
+            return self._build_cached_response(cached_data)
+
+        if cache.add(lock_key, 1, self._cache_lock_timeout):
+            if cached_data and self._refresh_in_background():
+                self._track_cache("stale")
+                return self._build_cached_response(cached_data)
+
+            try:
+                self._track_cache("miss")
+                return compute()
+            finally:
+                cache.delete(lock_key)
+
+        if cached_data:
+            self._track_cache("stale")
+            return self._build_cached_response(cached_data)
+
+        deadline = time.monotonic() + self._cache_lock_wait
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            if cached_data := cache.get(cache_key):
+                self._track_cache("wait")
+                return self._build_cached_response(cached_data)
+
+        self._track_cache("miss")
+        return compute()
+
+    def _compute_response(
+        self,
+        view_method_name: str,
+        cache_key: str,
+        cache_lifetime: int,
+        *args: Any,
+        **kwargs: Any,
+    ) -> HttpResponseBase:
+        """
+        Выполняет представление и сохраняет ответ в кэш.
+
+        Запись хранится дольше `cache_lifetime` на `_cache_stale_lifetime`,
+        чтобы её можно было отдавать как устаревшую копию во время пересчета.
+
+        :return: Ответ представления.
+        :rtype: HttpResponseBase
+        """
+        view_method = self._get_view_method(view_method_name)
+        if self.cache_anonymous and not self._is_personal_cache():
+            with self._as_anonymous():
+                response = view_method(self.request, *args, **kwargs)
+        else:
             response = view_method(self.request, *args, **kwargs)
+
+        cached_data = {
+            "status_code": response.status_code,
+            "tags": CacheTags.get_versions(self.get_cache_tags(response)),
+            "expires_at": time.time() + cache_lifetime,
+        }
+        if self._is_rendered_cache():
+            cached_data.update(self._render(response))
+        else:
             cached_data["data"] = response.data
-            cached_data["status_code"] = response.status_code
-            cache.set(cache_key, cached_data, cache_lifetime)
 
-        return Response(cached_data["data"], status=cached_data["status_code"])
+        cache.set(cache_key, cached_data, cache_lifetime + self._cache_stale_lifetime)
+        return self._build_cached_response(cached_data)
+
+    def _get_view_method(self, view_method_name: str) -> Callable:
+        """
+        Возвращает некэширующий метод представления: метод базового класса
+        (`list`, `retrieve`) или собственный метод представления.
+
+        :param view_method_name: Имя метода.
+        :rtype: Callable
+        """
+        return getattr(super(), view_method_name, None) or getattr(self, view_method_name)
+
+    def _is_personal_cache(self) -> bool:
+        """
+        Проверяет, кэшируется ли ответ отдельно для пользователя запроса.
+
+        :rtype: bool
+        """
+        return self.cache_per_user and self.request.user.is_authenticated
+
+    @contextmanager
+    def _as_anonymous(self):
+        """
+        Выполняет блок от имени анонимного пользователя, чтобы общая запись
+        кэша не содержала данных пользователя запроса.
+        """
+        user = self.request.user
+        self.request.user = AnonymousUser()
+        try:
+            yield
+        finally:
+            self.request.user = user
+
+    def apply_user_overlay(self, data: Any) -> Any:
+        """
+        Дополняет общую запись кэша данными пользователя запроса
+        (например, количеством товаров в корзине). Вызывается при
+        `cache_user_overlay` для аутентифицированных пользователей.
+
+        :param data: Данные общего ответа.
+        :return: Данные ответа пользователя.
+        """
+        return data
+
+    def _is_rendered_cache(self) -> bool:
+        """
+        Проверяет, кэшируется ли для запроса готовое тело ответа.
+        Браузерное API (HTML) всегда кэшируется данными.
+
+        :rtype: bool
+        """
+        renderer = getattr(self.request, "accepted_renderer", None)
+        return self.cache_rendered and renderer is not None and renderer.format == "json"
+
+    def _render(self, response: Response) -> Dict[str, Any]:
+        """
+        Рендерит ответ представления в байты для сохранения в кэш.
+
+        :param response: Ответ представления.
+        :return: Тело ответа (сжатое при `cache_compress`) и его заголовки.
+        """
+        response.accepted_renderer = self.request.accepted_renderer
+        response.accepted_media_type = self.request.accepted_media_type
+        response.renderer_context = self.get_renderer_context()
+        response.render()
+
+        content = response.content
+        if self.cache_compress:
+            content = gzip.compress(content)
+
+        return {
+            "content": content,
+            "content_type": response["Content-Type"],
+            "compressed": self.cache_compress,
+        }
+
+    def _build_cached_response(self, cached_data: Dict[str, Any]) -> HttpResponseBase:
+        """
+        Строит ответ из записи кэша. Готовое тело отдается без сериализаторов
+        и рендереров; сжатое тело отдается как есть клиентам, принимающим gzip.
+        Для аутентифицированных пользователей при `cache_user_overlay` данные
+        дополняются через `apply_user_overlay`.
+
+        :param cached_data: Запись кэша.
+        :rtype: HttpResponseBase
+        """
+        content = cached_data.get("content")
+        if self.cache_user_overlay and self.request.user.is_authenticated:
+            data = cached_data.get("data")
+            if content is not None:
+                data = orjson.loads(gzip.decompress(content) if cached_data["compressed"] else content)
+
+            return Response(self.apply_user_overlay(data), status=cached_data["status_code"])
+
+        if content is None:
+            return Response(cached_data["data"], status=cached_data["status_code"])
+
+        accepts_gzip = "gzip" in self.request.META.get("HTTP_ACCEPT_ENCODING", "")
+        if cached_data["compressed"] and not accepts_gzip:
+            content = gzip.decompress(content)
+
+        response = HttpResponse(
+            content,
+            status=cached_data["status_code"],
+            content_type=cached_data["content_type"],
+        )
+        if cached_data["compressed"]:
+            patch_vary_headers(response, ("Accept-Encoding",))
+            if accepts_gzip:
+                response["Content-Encoding"] = "gzip"
+
+        return response
+
+    @staticmethod
+    def _is_fresh(cached_data: Dict[str, Any]) -> bool:
+        """
+        Проверяет, что запись не истекла и её теги не инвалидированы.
+
+        :param cached_data: Запись кэша.
+        :rtype: bool
+        """
+        return cached_data.get("expires_at", 0) > time.time() and CacheTags.is_valid(
+            cached_data.get("tags")
+        )
+
+    def _refresh_in_background(self) -> bool:
+        """
+        Ставит пересчет записи в очередь Celery, если это разрешено для запроса.
+        Ответ фоновой задачи строится без пользователя, поэтому персональные
+        записи пересчитываются синхронно.
+
+        :return: True, если задача поставлена в очередь.
+        :rtype: bool
+        """
+        if not self.cache_refresh_in_background or self._is_personal_cache():
+            return False
+
+        from api.tasks import refresh_cached_response
+
+        try:
+            refresh_cached_response.delay(
+                self.request.get_full_path(),
+                self.request.get_host(),
+                self.request.is_secure(),
+            )
+        except Exception as err:
+            logger.error(f"Unable to schedule cache refresh for {self.request.get_full_path()}: {err}")
+            return False
+
+        return True
+
+    @staticmethod
+    def replay_request(path: str, host: str, secure: bool = False) -> HttpResponseBase:
+        """
+        Повторно выполняет GET-запрос к представлению для пересчета записи кэша.
+        Запрос собирается из сохраненных пути, строки запроса и хоста и
+        помечается `_cache_refresh`, поэтому кэш не читается, а перезаписывается.
+
+        Запрос выполняется от имени анонимного пользователя через `CityMiddleware`,
+        которая задает `request.city` и `request.city_group` так же, как для клиента.
+
+        :param path: Путь запроса вместе со строкой запроса.
+        :param host: Хост исходного запроса.
+        :param secure: Был ли исходный запрос выполнен по HTTPS.
+        :return: Ответ представления.
+        :rtype: HttpResponseBase
+        """
+        from django.urls import resolve
+
+        from api.middlewares import CityMiddleware
+
+        url = urlsplit(path)
+        server_name, _, server_port = host.partition(":")
+        request = WSGIRequest(
+            {
+                "REQUEST_METHOD": "GET",
+                "SCRIPT_NAME": "",
+                "PATH_INFO": unquote_to_bytes(url.path).decode("iso-8859-1"),
+                "QUERY_STRING": url.query,
+                "HTTP_HOST": host,
+                "SERVER_NAME": server_name,
+                "SERVER_PORT": server_port or ("443" if secure else "80"),
+                "wsgi.url_scheme": "https" if secure else "http",
+                "wsgi.input": io.BytesIO(),
+            }
+        )
+        request.user = AnonymousUser()
+        request._cache_refresh = True
+
+        match = resolve(request.path_info)
+        view = CityMiddleware(lambda request: match.func(request, *match.args, **match.kwargs))
+        return view(request)
+
+    def _track_cache(self, result: str) -> None:
+        """
+        Учитывает результат обращения к кэшу в метриках Prometheus.
+
+        :param result: `hit`, `miss`, `stale` или `wait`.
+        """
+        cache_response_requests.labels(view=self.__class__.__name__, result=result).inc()
 
-    def list(self, request, *args: Any, **kwargs: Any) -> Response:
+    def list(self, request, *args: Any, **kwargs: Any) -> HttpResponseBase:
         """
         Возвращает кэшированный ответ для метода `list`.
 
@@ -60,13 +637,13 @@ class CacheResponse:
         :param args: Дополнительные позиционные аргументы.
         :param kwargs: Дополнительные именованные аргументы.
         :return: Кэшированный ответ.
-        :rtype: Response
+        :rtype: HttpResponseBase
         """
         return self._get_cached_response(
             "list", self._list_cache_lifetime, *args, **kwargs
         )
 
-    def retrieve(self, request, *args: Any, **kwargs: Any) -> Response:
+    def retrieve(self, request, *args: Any, **kwargs: Any) -> HttpResponseBase:
         """
         Возвращает кэшированный ответ для метода `retrieve`.
 
@@ -75,8 +652,8 @@ class CacheResponse:
         :param args: Дополнительные позиционные аргументы.
         :param kwargs: Дополнительные именованные аргументы.
         :return: Кэшированный ответ.
-        :rtype: Response
+        :rtype: HttpResponseBase
         """
         return self._get_cached_response(
-            "retrieve", self._list_cache_lifetime, *args, **kwargs
+            "retrieve", self._retrieve_cache_lifetime, *args, **kwargs
         )
@@ -1,11 +1,18 @@
-from typing import Iterable, Dict, Any, List
+import hashlib
+import orjson
+from typing import Iterable, Dict, Any, List, Optional, Tuple
+from django.conf import settings
 from django.db.models import Case, IntegerField, When, Value, QuerySet
-from elasticsearch_dsl import Search, connections, Q
+from elasticsearch_dsl import MultiSearch, Search, connections
+from elasticsearch_dsl.response import Hit
 from loguru import logger
-from django.core.cache import cache
+
+from api.metrics import search_cache_requests
+from api.mixins.cache_response import CacheTags, cache
 
 from shop.documents import BrandDocument, CategoryDocument, ProductDocument
 from shop.models import SearchHistory
+from shop.services import SearchQueryBuilder
 from api.serializers import (
     ProductDocumentSerializer,
     CategoryDocumentSerializer,
@@ -13,6 +20,123 @@ from api.serializers import (
 )
 
 
+class SearchResultCache:
+    """
+    Кэш результатов общего поиска.
+
+    Ключ строится по нормализованному запросу (нижний регистр, схлопнутые пробелы,
+    транслитерация в латиницу, поэтому "профнастил" и "profnastil" дают одну запись),
+    домену главного города группы и параметрам выдачи. Запись помечается тегами
+    `CacheTags` найденных документов и индексов: индексатор после обновления документов
+    инвалидирует их теги, перестройка индекса - тег всего индекса.
+    """
+
+    key_prefix: str = "search_result:"
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """
+        Нормализует поисковый запрос: приводит к нижнему регистру и схлопывает пробелы.
+        Запрос в Elasticsearch строится по той же строке, поэтому запросы с одинаковым
+        ключом кэша дают одинаковую выдачу. Алфавит не меняется: транслитерация
+        склеила бы разные запросы (`профнастил` и `profnastil`).
+
+        :param query: Строка запроса.
+        :return: Нормализованная строка.
+        :rtype: str
+        """
+        return " ".join(query.lower().split())
+
+    @staticmethod
+    def tag_for_index(index: str) -> str:
+        return f"search:{index}"
+
+    @classmethod
+    def tag_for_document(cls, index: str, pk: Any) -> str:
+        return f"{cls.tag_for_index(index)}:{pk}"
+
+    @classmethod
+    def get_key(
+        cls,
+        query: str,
+        domain: str,
+        exclude_: Iterable[str],
+        page: int = None,
+        per_page: int = None,
+        ordering: str = None,
+        ids_only: bool = False,
+    ) -> str:
+        """
+        Возвращает ключ кэша для параметров поиска.
+
+        :rtype: str
+        """
+        params = orjson.dumps(
+            [cls.normalize_query(query), domain, sorted(exclude_), page, per_page, ordering, ids_only]
+        )
+        return f"{cls.key_prefix}{hashlib.md5(params).hexdigest()}"
+
+    @classmethod
+    def get(cls, key: str) -> Optional[Tuple[Dict[str, List[dict]], int]]:
+        """
+        Возвращает актуальную запись кэша.
+
+        :param key: Ключ кэша.
+        :return: `_source` результатов по индексам и общее количество найденных записей
+            или None, если записи нет или её теги инвалидированы.
+        """
+        cached = cache.get(key)
+        if cached is not None and not CacheTags.is_valid(cached["versions"]):
+            cached = None
+
+        search_cache_requests.labels(result="miss" if cached is None else "hit").inc()
+        if cached is None:
+            return None
+
+        return cached["sources"], cached["total"]
+
+    @classmethod
+    def set(cls, key: str, sources: Dict[str, List[dict]], total: int) -> None:
+        """
+        Сохраняет результаты поиска с версиями тегов найденных документов и индексов.
+
+        :param key: Ключ кэша.
+        :param sources: `_source` результатов по индексам.
+        :param total: Общее количество найденных записей.
+        """
+        tags = [cls.tag_for_index(index) for index in sources]
+        tags += [
+            cls.tag_for_document(index, source["id"])
+            for index, index_sources in sources.items()
+            for source in index_sources
+        ]
+        cache.set(
+            key,
+            {"sources": sources, "total": total, "versions": CacheTags.get_versions(tags)},
+            settings.SEARCH_CACHE_TIMEOUT,
+        )
+
+    @classmethod
+    def invalidate(cls, indexed: Dict[str, Iterable[Any]]) -> None:
+        """
+        Инвалидирует записи, содержащие переиндексированные документы.
+
+        :param indexed: Id документов по именам индексов.
+        """
+        CacheTags.invalidate(
+            *(cls.tag_for_document(index, pk) for index, ids in indexed.items() for pk in ids)
+        )
+
+    @classmethod
+    def invalidate_index(cls, index: str) -> None:
+        """
+        Инвалидирует все записи с результатами из индекса.
+
+        :param index: Имя индекса.
+        """
+        CacheTags.invalidate(cls.tag_for_index(index))
+
+
 class GeneralSearchMixin:
     """
     Mixin для выполнения общего поиска в Elasticsearch.
@@ -21,6 +145,15 @@ class GeneralSearchMixin:
     сортировки и постраничного вывода.
     """
 
+    # Размер выдачи и таймаут поиска по каждому индексу
+    search_sections = {
+        ProductDocument._index._name: {"size": 10, "timeout": "500ms"},
+        CategoryDocument._index._name: {"size": 5, "timeout": "300ms"},
+        BrandDocument._index._name: {"size": 5, "timeout": "300ms"},
+    }
+    # Таймаут всего запроса `_msearch` в секундах
+    search_request_timeout = 2
+
     def g_search(
         self,
         query: str,
@@ -29,9 +162,15 @@ class GeneralSearchMixin:
         page: int = None,
         per_page: int = 32,
         ordering: str = None,
+        ids_only: bool = False,
     ) -> Dict[str, Any]:
         """
-        Выполняет поиск по Elasticsearch.
+        Выполняет поиск по Elasticsearch одним запросом `_msearch`: по каждому индексу
+        отдельный поиск со своим размером выдачи и таймаутом, которые Elasticsearch
+        выполняет параллельно. Сортировка и постраничный вывод применяются к товарам.
+        Раздел, поиск по которому завершился ошибкой, возвращается пустым, а по истечении
+        таймаута - с найденными к этому моменту результатами. Полные результаты
+        кэшируются в `SearchResultCache`.
 
         :param query: Строка запроса для поиска.
         :param domain: Домен для фильтрации результатов.
@@ -39,83 +178,32 @@ class GeneralSearchMixin:
         :param page: Номер страницы для постраничного вывода.
         :param per_page: Количество результатов на странице.
         :param ordering: Поле для сортировки результатов.
+        :param ids_only: Загружать из `_source` только id результатов.
         :return: Словарь с категоризированными результатами и общее количество найденных записей.
         :rtype: Dict[str, Any]
         """
         if self.request.user.is_authenticated:
             SearchHistory.objects.get_or_create(title=query, user=self.request.user)
 
-        shoulds = []
         exclude_ = set(exclude_ or [])
-        query = query.lower()
+        builder = SearchQueryBuilder(SearchResultCache.normalize_query(query))
 
         indexes = {
             ProductDocument._index._name: {
                 "model": ProductDocument.Django.model,
                 "serializer": ProductDocumentSerializer,
-                "queries": Q(
-                    "bool",
-                    must=[
-                        Q("match", prices__cg_domain=domain),
-                        Q("term", _index=ProductDocument._index._name),
-                    ],
-                    should=(
-                        Q("term", article={"value": query, "boost": 5.0}),
-                        Q(
-                            "fuzzy",
-                            title={"value": query, "fuzziness": "AUTO", "boost": 5.0},
-                        ),
-                        Q("wildcard", title={"value": f"*{query}*", "boost": 2.5}),
-                        Q(
-                            "wildcard",
-                            description={"value": f"*{query}*", "boost": 1.5},
-                        ),
-                        Q("match_phrase", title=query),
-                        Q("match_phrase", description=query),
-                    ),
-                    minimum_should_match=1,
-                ),
+                "prepare": ProductDocument.set_city_prices,
+                "queries": builder.products(domain),
             },
             CategoryDocument._index._name: {
                 "model": CategoryDocument.Django.model,
                 "serializer": CategoryDocumentSerializer,
-                "queries": Q(
-                    "bool",
-                    must=[
-                        Q("term", is_visible=True),
-                        Q("term", products_exist=True),
-                        Q("term", _index=CategoryDocument._index._name),
-                    ],
-                    should=(
-                        Q("term", name={"value": query, "boost": 4.0}),
-                        Q(
-                            "fuzzy",
-                            name={"value": query, "fuzziness": "AUTO", "boost": 4.0},
-                        ),
-                        Q("wildcard", name={"value": f"*{query}*", "boost": 2.7}),
-                        Q("match", name=query),
-                        Q("match_phrase", name=query),
-                    ),
-                    minimum_should_match=1,
-                ),
+                "queries": builder.categories(),
             },
             BrandDocument._index._name: {
                 "model": BrandDocument.Django.model,
                 "serializer": BrandDocumentSerializer,
-                "queries": Q(
-                    "bool",
-                    must=[Q("term", _index=BrandDocument._index._name)],
-                    should=[
-                        Q("term", name={"value": query, "boost": 3.0}),
-                        Q(
-                            "fuzzy",
-                            name={"value": query, "fuzziness": "AUTO", "boost": 3.0},
-                        ),
-                        Q("wildcard", name={"value": f"*{query}*", "boost": 2.6}),
-                        Q("match_phrase", name=query),
-                    ],
-                    minimum_should_match=1,
-                ),
+                "queries": builder.brands(),
             },
         }
 
@@ -125,38 +213,101 @@ class GeneralSearchMixin:
             except KeyError:
                 logger.info(f"SEARCH: trying to del unexpected index: {index}")
 
-        client = connections.get_connection()
-        search = Search(using=client)
+        cache_key = SearchResultCache.get_key(query, domain, exclude_, page, per_page, ordering, ids_only)
+        cached = SearchResultCache.get(cache_key)
+        if cached is None:
+            sources, total_size, complete = self.execute_search(
+                indexes, domain, page, per_page, ordering, ids_only
+            )
+            if complete:
+                SearchResultCache.set(cache_key, sources, total_size)
+        else:
+            sources, total_size = cached
 
-        for index in indexes.values():
-            shoulds.append(index["queries"])
+        categorized_results = dict()
+        for index_name, index_sources in sources.items():
+            hits = [
+                Hit({"_index": index_name, "_id": str(source.get("id")), "_source": source})
+                for source in index_sources
+            ]
+            self.process_index(indexes, index_name, hits, categorized_results, domain)
 
-        queries = Q("bool", should=shoulds)
+        return categorized_results, total_size
 
-        search = search.query(queries)
-        search = search.filter("term", is_active=True)
+    def execute_search(
+        self,
+        indexes: Dict[str, Any],
+        domain: str,
+        page: int = None,
+        per_page: int = 32,
+        ordering: str = None,
+        ids_only: bool = False,
+    ) -> Tuple[Dict[str, List[dict]], int, bool]:
+        """
+        Выполняет поиск по индексам одним запросом `_msearch`.
 
-        if ordering is not None:
-            search = self.sort_config(search, ordering)
+        :param indexes: Информация об индексах.
+        :param domain: Домен для фильтрации результатов.
+        :param page: Номер страницы для постраничного вывода.
+        :param per_page: Количество результатов на странице.
+        :param ordering: Поле для сортировки результатов.
+        :param ids_only: Загружать из `_source` только id результатов.
+        :return: `_source` результатов по индексам, общее количество найденных записей
+            и признак того, что все разделы выполнены полностью, без ошибок и таймаутов.
+        :rtype: Tuple[Dict[str, List[dict]], int, bool]
+        """
+        multi_search = MultiSearch(
+            using=connections.get_connection().options(request_timeout=self.search_request_timeout)
+        ).params(max_concurrent_searches=len(indexes))
 
-        if page is not None:
-            from_ = (page - 1) * per_page
-            search = search[from_ : from_ + per_page]
-        else:
-            search = search.extra(size=10)
+        for index_name, index in indexes.items():
+            section = self.search_sections[index_name]
+            search = (
+                Search(index=index_name)
+                .query(index["queries"])
+                .filter("term", is_active=True)
+                .extra(size=section["size"], timeout=section["timeout"])
+            )
+            if ids_only:
+                search = search.source(["id"])
 
-        response = search.execute()
+            if index_name == ProductDocument._index._name:
+                if ordering is not None:
+                    search = self.sort_config(search, ordering, domain)
 
-        categorized_results = self.categorize_results(response, indexes, domain)
-        total_size = response.hits.total.value
-        return categorized_results, total_size
+                if page is not None:
+                    from_ = (page - 1) * per_page
+                    search = search[from_ : from_ + per_page]
+
+            multi_search = multi_search.add(search)
+
+        responses = multi_search.execute(raise_on_error=False) if indexes else []
+
+        sources, total_size, complete = dict(), 0, True
+        for index_name, response in zip(indexes, responses):
+            sources[index_name] = []
+            if response is None:
+                logger.error(f"SEARCH: {index_name} search failed")
+                complete = False
+                continue
+
+            if response.timed_out:
+                logger.info(f"SEARCH: {index_name} search timed out, partial results returned")
+                complete = False
+
+            sources[index_name] = [hit.to_dict() for hit in response]
+            total_size += response.hits.total.value
 
-    def sort_config(self, search: Search, ordering: str) -> Search:
+        return sources, total_size, complete
+
+    def sort_config(self, search: Search, ordering: str, domain: str = None) -> Search:
         """
         Конфигурирует сортировку для запроса поиска.
+        Сортировка по цене учитывает только цены группы городов домена.
 
         :param search: Объект поиска Elasticsearch.
         :param ordering: Поле для сортировки.
+        :param domain: Домен главного города группы.
         :return: Конфигурированный объект поиска.
         :rtype: Search
         """
@@ -167,11 +318,11 @@ class GeneralSearchMixin:
             sort_order = "asc"
 
         sort_args = {"order": sort_order}
-        if "in_promo" in ordering:
-            ordering = "price.in_promo"
-        elif "price" in ordering:
-            ordering = "price.price"
-            sort_args["nested"] = {"path": "price"}
+        if "in_promo" in ordering or "price" in ordering:
+            ordering = "prices.in_promo" if "in_promo" in ordering else "prices.price"
+            sort_args["nested"] = {"path": "prices"}
+            if domain:
+                sort_args["nested"]["filter"] = {"term": {"prices.cg_domain": domain}}
 
         return search.sort(
             {ordering: sort_args},
@@ -179,55 +330,47 @@ class GeneralSearchMixin:
             {"priority": {"order": "desc"}},
         )
 
-    def categorize_results(
-        self, response: Search, indexes: Dict[str, Any], domain: str
-    ) -> Dict[str, Any]:
-        """
-        Категоризирует результаты поиска по индексам.
-
-        :param response: Ответ Elasticsearch.
-        :param indexes: Информация об индексах.
-        :param domain: Домен для фильтрации результатов.
-        :return: Словарь с категоризированными результатами.
-        :rtype: Dict[str, Any]
-        """
-        categorized_results = dict()
-        hits = {index_name: list() for index_name in indexes}
-
-        for hit in response:
-            if hit.meta.index in hits:
-                hits[hit.meta.index].append(hit)
-
-        for index_name in hits:
-            self.process_index(
-                indexes,
-                index_name,
-                hits[index_name],
-                categorized_results,
-            )
-
-        return categorized_results
-
     def process_index(
         self,
         indexes: Dict[str, Any],
         index: str,
         hits: List[Any],
         categorized_results: Dict[str, Any],
+        domain: str = None,
     ) -> None:
         """
         Обрабатывает результаты поиска для конкретного индекса.
+        Результаты сериализуются из `_source` документов без запросов к базе данных.
 
         :param indexes: Информация об индексах.
         :param index: Имя индекса.
         :param hits: Результаты поиска для индекса.
         :param categorized_results: Словарь для записи категоризированных результатов.
+        :param domain: Домен для выбора цен результатов.
+        """
+        if prepare := indexes[index].get("prepare"):
+            for hit in hits:
+                prepare(hit, domain)
+
+        categorized_results[index] = {
+            "hits": hits,
+            "model": indexes[index]["model"],
+            "serializer": indexes[index]["serializer"],
+        }
+
+    @staticmethod
+    def get_hits_queryset(result: Dict[str, Any]) -> QuerySet:
         """
-        ids = [hit.id for hit in hits]
-        model = indexes[index]["model"]
-        serializer = indexes[index]["serializer"]
-        queryset: QuerySet = (
-            model.objects.filter(pk__in=ids)
+        Возвращает QuerySet объектов результатов поиска в порядке релевантности.
+        Нужен там, где результаты фильтруются дальше в базе данных.
+
+        :param result: Результаты поиска по индексу.
+        :return: Упорядоченный QuerySet.
+        :rtype: QuerySet
+        """
+        ids = [hit.id for hit in result["hits"]]
+        return (
+            result["model"].objects.filter(pk__in=ids)
             .annotate(
                 score_order=Case(
                     *[When(pk=id, then=Value(idx)) for idx, id in enumerate(ids)],
@@ -236,8 +379,3 @@ class GeneralSearchMixin:
             )
             .order_by("score_order")
         )
-
-        categorized_results[index] = {
-            "queryset": queryset,
-            "serializer": serializer,
-        }
@@ -1,6 +1,9 @@
-from typing import Optional
+from typing import Optional, Set
 from django.db.models import QuerySet
-from shop.models import Category
+
+from account.models import CityGroup
+from shop.models import Product
+from shop.services import CategoryDescendantsIndex
 
 
 class CategoriesWithProductsMixin:
@@ -8,6 +11,52 @@ class CategoriesWithProductsMixin:
     Mixin для получения категорий, содержащих продукты, соответствующие указанному домену.
     """
 
+    def get_category_ids_with_products(self, domain: str) -> Set[int]:
+        """
+        Возвращает идентификаторы активных и видимых категорий, в которых есть продукты
+        с ценой для группы городов указанного домена. Результат кешируется на экземпляре.
+
+        :param domain: Домен для фильтрации продуктов.
+        :type domain: str
+        :return: Множество идентификаторов категорий.
+        :rtype: Set[int]
+        """
+        cached = getattr(self, "_category_ids_with_products", None)
+        if cached is not None and cached[0] == domain:
+            return cached[1]
+
+        city_group_pk = CityGroup.get_pk_by_domain(domain) if domain else None
+        category_ids = set()
+        if city_group_pk is not None:
+            category_ids = set(
+                Product.objects.filter(
+                    category__is_active=True,
+                    category__is_visible=True,
+                    catalog_prices__city_group_id=city_group_pk,
+                )
+                .order_by()
+                .values_list("category_id", flat=True)
+                .distinct()
+            )
+
+        self._category_ids_with_products = (domain, category_ids)
+        return category_ids
+
+    def has_products(self, category_id: int, domain: str) -> bool:
+        """
+        Проверяет, есть ли в категории или её потомках продукты, доступные в указанном домене.
+
+        :param category_id: Идентификатор категории.
+        :type category_id: int
+        :param domain: Домен для фильтрации продуктов.
+        :type domain: str
+        :rtype: bool
+        """
+        with_products = self.get_category_ids_with_products(domain)
+        return not with_products.isdisjoint(
+            CategoryDescendantsIndex.get_descendant_ids([category_id])
+        )
+
     def get_categories_with_products(
         self, domain: str, queryset: Optional[QuerySet] = None
     ) -> QuerySet:
@@ -21,20 +70,13 @@ class CategoriesWithProductsMixin:
         :return: Отфильтрованный QuerySet категорий.
         :rtype: QuerySet
         """
-        if queryset is None or not queryset.exists():
+        if queryset is None:
             return queryset
 
         return queryset.filter(
             pk__in=[
-                t.id
-                for t in queryset
-                if t.get_descendants(include_self=True)
-                .filter(
-                    is_active=True,
-                    is_visible=True,
-                    products__isnull=False,
-                    products__prices__city_group__cities__domain=domain,
-                )
-                .exists()
+                pk
+                for pk in queryset.values_list("pk", flat=True)
+                if self.has_products(pk, domain)
             ]
         )
@@ -1,6 +1,9 @@
 from loguru import logger
 from django.db.models.functions import Coalesce
-from django.db.models import Case, When, BooleanField, F, Q, Avg, QuerySet
+from django.db.models import OuterRef, Subquery, QuerySet
+
+from account.models import CityGroup
+from shop.models import CatalogPrice
 
 
 class ProductSorting:
@@ -48,6 +51,24 @@ class ProductSorting:
         else:
             return queryset.order_by(f"{self.reversed_prefix}{ordering}", "-priority")
 
+    def _city_group_price(self, field: str) -> Subquery | None:
+        """
+        Возвращает подзапрос к цене каталога товара в группе городов домена.
+
+        :param field: Поле `CatalogPrice`, значение которого нужно получить.
+        :return: Подзапрос или None, если группа городов не найдена.
+        :rtype: Subquery | None
+        """
+        city_group_pk = CityGroup.get_pk_by_domain(self.city_domain)
+        if city_group_pk is None:
+            return None
+
+        return Subquery(
+            CatalogPrice.objects.filter(
+                product_id=OuterRef("pk"), city_group_id=city_group_pk
+            ).values(field)[:1]
+        )
+
     def _sort_price(self) -> QuerySet:
         """
         Сортирует продукты по цене.
@@ -55,22 +76,20 @@ class ProductSorting:
         :return: QuerySet отсортированный по цене.
         :rtype: QuerySet
         """
-        if self.city_domain:
-            return self.queryset.order_by(
-                f"{self.reversed_prefix}prices__price", "-priority"
-            ).distinct()
+        if self.city_domain and (price := self._city_group_price("price")) is not None:
+            return self.queryset.alias(sort_price=price).order_by(
+                f"{self.reversed_prefix}sort_price", "-priority"
+            )
         return self.queryset
 
     def _sort_rating(self) -> QuerySet:
         """
-        Сортирует продукты по среднему рейтингу.
+        Сортирует продукты по среднему рейтингу (индексируемое поле `rating_avg`).
 
         :return: QuerySet отсортированный по рейтингу.
         :rtype: QuerySet
         """
-        return self.queryset.annotate(
-            avg_rating=Coalesce(Avg("reviews__rating"), 0.0)
-        ).order_by(f"{self.reversed_prefix}avg_rating", "-priority")
+        return self.queryset.order_by(f"{self.reversed_prefix}rating_avg", "-priority")
 
     def _sort_in_promo(self) -> QuerySet:
         """
@@ -79,17 +98,8 @@ class ProductSorting:
         :return: QuerySet отсортированный по скидке.
         :rtype: QuerySet
         """
-        if self.city_domain:
-            condition = (
-                Q(prices__price__isnull=False)
-                & Q(prices__old_price__isnull=False)
-                & Q(prices__price__lt=F("prices__old_price"))
-            )
-            return self.queryset.annotate(
-                in_promo=Case(
-                    When(condition, then=True),
-                    default=False,
-                    output_field=BooleanField(),
-                )
-            ).order_by(f"{self.reversed_prefix}in_promo", "-priority")
+        if self.city_domain and (in_promo := self._city_group_price("in_promo")) is not None:
+            return self.queryset.alias(
+                sort_in_promo=Coalesce(in_promo, False)
+            ).order_by(f"{self.reversed_prefix}sort_in_promo", "-priority")
         return self.queryset
@@ -1,6 +1,5 @@
 from rest_framework.serializers import ModelSerializer, SerializerMethodField
 from rest_framework.fields import empty
-from django.db.models import Avg
 
 
 class RatingMixin(ModelSerializer):
@@ -9,6 +8,8 @@ class RatingMixin(ModelSerializer):
 
     `rating` - средний рейтинг объекта, основанный на связанных отзывах.
     `reviews_count` - количество отзывов для объекта.
+
+    Значения берутся из денормализованных полей `rating_avg` и `reviews_count` объекта.
     """
 
     reviews_count: SerializerMethodField = SerializerMethodField()
@@ -37,8 +38,7 @@ class RatingMixin(ModelSerializer):
         :return: Средний рейтинг объекта, округленный до одной десятичной.
         :rtype: float
         """
-        value = obj.reviews.aggregate(average_rating=Avg('rating'))['average_rating'] or 0.0
-        return round(value, 1)
+        return round(obj.rating_avg, 1)
 
     def get_reviews_count(self, obj) -> int:
         """
@@ -48,4 +48,4 @@ class RatingMixin(ModelSerializer):
         :return: Количество отзывов для объекта.
         :rtype: int
         """
-        return obj.reviews.count()
+        return obj.reviews_count
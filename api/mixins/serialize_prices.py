@@ -1,8 +1,9 @@
 from decimal import Decimal
-from typing import Optional
+from typing import Optional, Tuple
 
-from account.models import City
-from shop.models import Price
+from account.models import CityGroup
+from shop.models import CatalogPrice
+from shop.services import CityTable
 
 
 class SerializerGetPricesMixin:
@@ -21,6 +22,46 @@ class SerializerGetPricesMixin:
         request = self.context.get("request")
         return getattr(request, "query_params", {})
 
+    def get_city_group(self) -> Optional[CityGroup]:
+        """
+        Возвращает группу городов запроса, определенную `CityMiddleware`,
+        или находит её по домену из параметров запроса.
+
+        :return: Группа городов или None.
+        :rtype: Optional[CityGroup]
+        """
+        request = self.context.get("request")
+        if hasattr(request, "city_group"):
+            return request.city_group
+
+        params = self.get_request_params()
+        return CityTable.get_city_group(params.get("city_domain") or params.get("domain"))
+
+    def get_prices(self, obj) -> Tuple[Optional[Decimal], Optional[Decimal]]:
+        """
+        Возвращает текущую и старую цены продукта для домена города из запроса.
+        Цены берутся из аннотаций `city_price` и `old_price`, если они есть,
+        иначе загружаются одним запросом и сохраняются на объекте.
+
+        :param obj: Объект продукта.
+        :return: Кортеж (цена, старая цена).
+        :rtype: Tuple[Optional[Decimal], Optional[Decimal]]
+        """
+        if not (hasattr(obj, "city_price") and hasattr(obj, "old_price")):
+            city_group_pk = getattr(self.get_city_group(), "pk", None)
+
+            price = None
+            if city_group_pk is not None:
+                price = (
+                    CatalogPrice.objects.filter(city_group_id=city_group_pk, product=obj)
+                    .values_list("price", "old_price")
+                    .first()
+                )
+
+            obj.city_price, obj.old_price = price or (None, None)
+
+        return obj.city_price, obj.old_price
+
     def get_city_price(self, obj) -> Optional[Decimal]:
         """
         Возвращает текущую цену продукта для указанного домена города.
@@ -29,19 +70,7 @@ class SerializerGetPricesMixin:
         :return: Цена продукта или None, если цена не найдена.
         :rtype: Optional[Decimal]
         """
-        params = self.get_request_params()
-        city_domain = params.get("city_domain") or params.get("domain")
-        if city_domain:
-            try:
-                c = City.objects.get(domain=city_domain)
-            except City.DoesNotExist:
-                return None
-
-            price = Price.objects.filter(city_group__cities=c, product=obj).first()
-            if price:
-                return price.price
-
-        return None
+        return self.get_prices(obj)[0]
 
     def get_old_price(self, obj) -> Optional[Decimal]:
         """
@@ -51,16 +80,4 @@ class SerializerGetPricesMixin:
         :return: Старая цена продукта или None, если цена не найдена.
         :rtype: Optional[Decimal]
         """
-        params = self.get_request_params()
-        city_domain = params.get("city_domain") or params.get("domain")
-        if city_domain:
-            try:
-                c = City.objects.get(domain=city_domain)
-            except City.DoesNotExist:
-                return None
-
-            price = Price.objects.filter(city_group__cities=c, product=obj).first()
-            if price:
-                return price.old_price
-
-        return None
+        return self.get_prices(obj)[1]
@@ -0,0 +1,115 @@
+from typing import FrozenSet, Optional
+
+from rest_framework.request import Request
+
+
+class SparseFieldset:
+    """
+    Набор полей ответа, запрошенный параметрами `?fields=` и `?omit=`.
+
+    `fields` - перечень выводимых полей (None - все поля),
+    `omit` - перечень исключаемых полей.
+    """
+
+    FIELDS_QUERY_PARAM = "fields"
+    OMIT_QUERY_PARAM = "omit"
+
+    def __init__(self, fields: Optional[FrozenSet[str]] = None, omit: FrozenSet[str] = frozenset()):
+        self.fields = fields
+        self.omit = omit
+
+    @staticmethod
+    def _parse(value: Optional[str]) -> FrozenSet[str]:
+        return frozenset(name.strip() for name in (value or "").split(",") if name.strip())
+
+    @classmethod
+    def from_request(cls, request: Request) -> Optional["SparseFieldset"]:
+        """
+        Создает набор полей из параметров запроса.
+
+        :param request: Объект запроса.
+        :return: Набор полей или None, если параметры не переданы.
+        :rtype: Optional[SparseFieldset]
+        """
+        fields = cls._parse(request.query_params.get(cls.FIELDS_QUERY_PARAM))
+        omit = cls._parse(request.query_params.get(cls.OMIT_QUERY_PARAM))
+        if not (fields or omit):
+            return None
+
+        return cls(fields or None, omit)
+
+    def includes(self, name: str) -> bool:
+        """
+        Проверяет, входит ли поле в ответ.
+
+        :param name: Название поля.
+        :rtype: bool
+        """
+        if name in self.omit:
+            return False
+
+        return self.fields is None or name in self.fields
+
+
+class SparseFieldsetsMixin:
+    """
+    Mixin сериализатора, убирающий поля, не входящие в набор `sparse_fieldset`
+    из контекста. Убранные поля не вычисляются, поэтому не выполняются и их запросы.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fieldset: Optional[SparseFieldset] = self.context.get("sparse_fieldset")
+        if fieldset is None:
+            return
+
+        for name in list(self.fields):
+            if not fieldset.includes(name):
+                self.fields.pop(name)
+
+    @staticmethod
+    def is_field_requested(context: dict, name: str) -> bool:
+        """
+        Проверяет, запрошено ли поле в наборе полей из контекста.
+
+        :param context: Контекст сериализатора.
+        :param name: Название поля.
+        :rtype: bool
+        """
+        fieldset: Optional[SparseFieldset] = context.get("sparse_fieldset")
+        return fieldset is None or fieldset.includes(name)
+
+
+class SparseFieldsetsViewMixin:
+    """
+    Mixin представления, передающий в контекст сериализатора набор полей
+    из параметров `?fields=` и `?omit=` для чтения данных.
+    """
+
+    @property
+    def sparse_fieldset(self) -> Optional[SparseFieldset]:
+        """
+        Набор полей текущего запроса. Для небезопасных методов не применяется.
+
+        :rtype: Optional[SparseFieldset]
+        """
+        if not hasattr(self, "_sparse_fieldset"):
+            self._sparse_fieldset = None
+            if self.request.method in ("GET", "HEAD"):
+                self._sparse_fieldset = SparseFieldset.from_request(self.request)
+
+        return self._sparse_fieldset
+
+    def is_field_requested(self, name: str) -> bool:
+        """
+        Проверяет, запрошено ли поле в текущем запросе.
+
+        :param name: Название поля.
+        :rtype: bool
+        """
+        return self.sparse_fieldset is None or self.sparse_fieldset.includes(name)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["sparse_fieldset"] = self.sparse_fieldset
+        return context
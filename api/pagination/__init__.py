@@ -1 +1 @@
-from .pagination import CustomProductPagination
\ No newline at end of file
+from .pagination import CursorProductPagination, CustomProductPagination
@@ -1,7 +1,16 @@
-from functools import cached_property
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from functools import cached_property, partial
+from typing import List, Optional, Tuple
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from django.core.exceptions import FieldDoesNotExist
 from django.core.paginator import InvalidPage
-from rest_framework.exceptions import NotFound
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound, ValidationError
 from django.core.paginator import Page, Paginator as DjangoPaginator
 
 
@@ -55,7 +64,7 @@ class CustomPaginator(DjangoPaginator):
         :raises InvalidPage: Если номер страницы невалиден.
         """
         number = self.validate_number(number)
-        if len(self.object_list) > self.per_page:
+        if self.count > self.per_page:
             bottom = (number - 1) * self.per_page
         else:
             bottom = 0
@@ -117,3 +126,222 @@ class CustomProductPagination(PageNumberPagination):
         :return: Пагинированный ответ.
         """
         return super().get_paginated_response(data)
+
+
+class CursorProductPagination(BasePagination):
+    """
+    Keyset-пагинация для каталога продуктов.
+
+    Страница выбирается условием по значениям полей сортировки последнего
+    показанного товара, поэтому время выборки не зависит от глубины страницы,
+    а весь QuerySet не вычисляется. Включается параметром `?pagination=cursor`
+    или передачей `cursor`.
+    """
+
+    cursor_query_param = "cursor"
+    mode_query_param = "pagination"
+    mode_query_value = "cursor"
+    page_size = int(api_settings.PAGE_SIZE or 32)
+    invalid_cursor_message = "Неверный курсор"
+    unsupported_ordering_message = "Сортировка не поддерживается курсорной пагинацией"
+
+    @classmethod
+    def is_requested(cls, request) -> bool:
+        """
+        Проверяет, запрошен ли режим курсорной пагинации.
+
+        :param request: HTTP-запрос.
+        :rtype: bool
+        """
+        return (
+            cls.cursor_query_param in request.query_params
+            or request.query_params.get(cls.mode_query_param) == cls.mode_query_value
+        )
+
+    def paginate_queryset(
+        self, queryset, request, view=None, count: int = None
+    ) -> Optional[list]:
+        """
+        Возвращает товары страницы, следующей за курсором (или предшествующей ему).
+
+        :param queryset: Отсортированный QuerySet для пагинации.
+        :param request: HTTP-запрос.
+        :param view: View, связанный с запросом.
+        :param count: Не используется, оставлен для совместимости с `CustomProductPagination`.
+        :return: Список объектов текущей страницы.
+        :rtype: list
+        :raises NotFound: Если курсор невалиден.
+        :raises ValidationError: Если сортировку нельзя использовать для курсора.
+        """
+        self.request = request
+        self.ordering = self._get_ordering(queryset)
+        values, reverse = self._decode_cursor(request)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [(field, not descending) for field, descending in ordering]
+
+        queryset = queryset.annotate(
+            **{f"_cursor_{i}": F(field) for i, (field, _) in enumerate(ordering)}
+        ).order_by(*(f"{'-' if desc else ''}{field}" for field, desc in ordering))
+        if values is not None:
+            queryset = queryset.filter(
+                self._keyset_filter(ordering, values, queryset.model)
+            )
+
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.has_next = has_more if not reverse else values is not None
+        self.has_previous = values is not None if not reverse else has_more
+        self.first, self.last = (results[0], results[-1]) if results else (None, None)
+        return results
+
+    def get_paginated_response(self, data) -> Response:
+        """
+        Возвращает пагинированный ответ со ссылками на соседние страницы.
+
+        :param data: Данные текущей страницы.
+        :return: Пагинированный ответ.
+        """
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema: dict) -> dict:
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next or self.last is None:
+            return None
+        return self._build_link(self.last, reverse=False)
+
+    def get_previous_link(self) -> Optional[str]:
+        if not self.has_previous or self.first is None:
+            return None
+        return self._build_link(self.first, reverse=True)
+
+    def _build_link(self, obj, reverse: bool) -> str:
+        """
+        Строит ссылку на страницу относительно переданного объекта.
+
+        :param obj: Граничный объект (или строка `values()`) текущей страницы.
+        :param reverse: Направление (True - предыдущая страница).
+        :rtype: str
+        """
+        get = obj.get if isinstance(obj, dict) else partial(getattr, obj)
+        values = [get(f"_cursor_{i}") for i in range(len(self.ordering))]
+        cursor = base64.urlsafe_b64encode(
+            json.dumps({"v": values, "r": reverse}, cls=DjangoJSONEncoder).encode()
+        ).decode()
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.mode_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def _decode_cursor(self, request) -> tuple:
+        """
+        Декодирует курсор из параметров запроса.
+
+        :param request: HTTP-запрос.
+        :return: Кортеж (значения полей сортировки или None, направление).
+        :raises NotFound: Если курсор невалиден.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            values, reverse = cursor["v"], bool(cursor.get("r"))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return values, reverse
+
+    @classmethod
+    def _get_ordering(cls, queryset) -> List[Tuple[str, bool]]:
+        """
+        Возвращает поля сортировки QuerySet с направлением, дополненные первичным ключом.
+
+        :param queryset: Отсортированный QuerySet.
+        :return: Список кортежей (поле, по убыванию).
+        :raises ValidationError: Если сортировка задана выражением, а не именем поля.
+        """
+        ordering = []
+        for field in queryset.query.order_by or queryset.model._meta.ordering:
+            if not isinstance(field, str):
+                raise ValidationError({cls.mode_query_param: cls.unsupported_ordering_message})
+            ordering.append((field.lstrip("-"), field.startswith("-")))
+
+        if not any(field in ("pk", "id") for field, _ in ordering):
+            ordering.append(("pk", False))
+
+        return ordering
+
+    @staticmethod
+    def _is_nullable(model, field: str) -> bool:
+        """
+        Проверяет, может ли поле сортировки принимать NULL.
+        Аннотации считаются допускающими NULL.
+
+        :param model: Модель QuerySet.
+        :param field: Имя поля сортировки.
+        :rtype: bool
+        """
+        if field == "pk":
+            return False
+
+        try:
+            return model._meta.get_field(field).null
+        except FieldDoesNotExist:
+            return True
+
+    @classmethod
+    def _keyset_filter(
+        cls, ordering: List[Tuple[str, bool]], values: list, model
+    ) -> Q:
+        """
+        Строит условие выборки строк, следующих за курсором при заданной сортировке.
+
+        NULL-значения учитываются так же, как в PostgreSQL: в конце при сортировке
+        по возрастанию и в начале при сортировке по убыванию.
+
+        :param ordering: Поля сортировки с направлением.
+        :param values: Значения полей сортировки в курсоре.
+        :param model: Модель QuerySet.
+        :rtype: Q
+        """
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (field, descending), value in zip(ordering, values):
+            if value is None:
+                after = Q(**{f"{field}__isnull": False}) if descending else Q(pk__in=[])
+                same = Q(**{f"{field}__isnull": True})
+            else:
+                after = Q(**{f"{field}__{'lt' if descending else 'gt'}": value})
+                if not descending and cls._is_nullable(model, field):
+                    after |= Q(**{f"{field}__isnull": True})
+                same = Q(**{field: value})
+
+            condition |= equal & after
+            equal &= same
+
+        return condition
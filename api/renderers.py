@@ -0,0 +1,63 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON рендерер на основе orjson.
+
+    Как и в `JSONRenderer`, Decimal выводится числом, ленивые строки перевода
+    и прочие типы, которые orjson не умеет сериализовать, преобразуются
+    `JSONEncoder` из DRF, datetime в UTC выводится с суффиксом `Z`.
+
+    Отличия от `JSONRenderer`:
+    - запись float: `1e16` вместо `1e+16`;
+    - NaN и бесконечность выводятся как `null`, а не вызывают ValueError;
+    - целые числа шире 64 бит orjson не сериализует, такие данные
+      рендерятся `JSONRenderer`.
+    """
+
+    OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+    _encoder = JSONEncoder()
+
+    @classmethod
+    def default(cls, obj):
+        """
+        Преобразует объекты, которые orjson не сериализует сам.
+
+        :param obj: Объект для сериализации.
+        :return: Сериализуемое представление объекта.
+        """
+        return cls._encoder.default(obj)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Рендерит `data` в JSON.
+
+        :param data: Данные ответа.
+        :param accepted_media_type: Принятый тип содержимого.
+        :param renderer_context: Контекст рендеринга.
+        :return: Тело ответа в байтах.
+        :rtype: bytes
+        """
+        if data is None:
+            return b""
+
+        renderer_context = renderer_context or {}
+        options = self.OPTIONS
+        if self.get_indent(accepted_media_type, renderer_context):
+            options |= orjson.OPT_INDENT_2
+
+        try:
+            ret = orjson.dumps(data, default=self.default, option=options)
+        except orjson.JSONEncodeError:
+            # Целые числа шире 64 бит сериализует только стандартный кодировщик
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Как и JSONRenderer, экранируем разделители строк для совместимости с JavaScript
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+        return ret
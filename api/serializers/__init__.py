@@ -26,7 +26,12 @@ from .characteristic_value import (
 )
 from .product_image import ProductImageSerializer
 from .brand import BrandSerializer
-from .product_catalog import ProductCatalogSerializer
+from .product_catalog import (
+    ProductCatalogSerializer,
+    ProductCatalogListSerializer,
+    ProductRelatedListSerializer,
+)
+from .product_card import ProductCardBuilder
 from .product_group import (
     ProductForGroupNonImageSerializer,
     ProductForGroupImageSerializer,
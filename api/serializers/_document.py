@@ -7,8 +7,19 @@ from django_elasticsearch_dsl_drf.serializers import DocumentSerializer
 from shop.documents import BrandDocument, CategoryDocument, ProductDocument
 
 
+class DocumentImageField(serializers.ImageField):
+    """
+    Изображение, которое в `_source` документа хранится готовым URL.
+    """
+
+    def to_representation(self, value):
+        if isinstance(value, str):
+            return value or None
+        return super().to_representation(value)
+
+
 class CategoryDocumentSerializer(DocumentSerializer):
-    image = serializers.ImageField()
+    image = DocumentImageField()
     description = serializers.CharField(required=False, allow_blank=True)
 
     class Meta:
@@ -35,6 +46,8 @@ class ProductDocumentSerializer(DocumentSerializer):
         read_only=True,
     )
     price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, source="city_price")
+    old_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    rating = serializers.FloatField(required=False)
     search_image = serializers.SerializerMethodField()
 
     class Meta:
@@ -48,8 +61,14 @@ class ProductDocumentSerializer(DocumentSerializer):
             "thumb_img",
             "category_slug",
             "slug",
-            "city_price",
+            "price",
+            "old_price",
+            "rating",
+            "reviews_count",
         ]
 
     def get_search_image(self, obj) -> str | None:
-        return obj.search_image.url if obj.search_image else None
+        search_image = getattr(obj, "search_image", None)
+        if isinstance(search_image, str):
+            return search_image or None
+        return search_image.url if search_image else None
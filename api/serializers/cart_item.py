@@ -1,7 +1,11 @@
 from typing import OrderedDict
 from rest_framework import serializers
 from cart.models import CartItem, Product
-from api.serializers import ProductCatalogSerializer, ActiveModelSerializer
+from api.serializers import (
+    ProductCatalogSerializer,
+    ProductRelatedListSerializer,
+    ActiveModelSerializer,
+)
 
 
 class CartItemSerializer(ActiveModelSerializer):
@@ -15,6 +19,7 @@ class CartItemSerializer(ActiveModelSerializer):
 
     class Meta:
         model = CartItem
+        list_serializer_class = ProductRelatedListSerializer
         fields = ["id", "product", "product_id", "quantity", "allow_to_order"]
         read_only_fields = ("id",)
 
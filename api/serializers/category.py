@@ -3,10 +3,37 @@ from django.db.models import Q
 from api.serializers import ActiveModelSerializer
 from rest_framework import serializers
 from shop.models import Category
+from shop.services import CategoryTree
 from api.mixins import CategoriesWithProductsMixin
 
 
-class CategorySerializer(ActiveModelSerializer):
+class CategoryTreeMixin:
+    """
+    Mixin для сериализаторов категорий, получающих детей и родителей из
+    снимка дерева категорий вместо запросов на каждый узел.
+    """
+
+    def get_category_tree(self) -> dict:
+        """
+        Возвращает снимок дерева категорий, общий для всех вложенных сериализаторов.
+        """
+        tree = self.context.get("category_tree")
+        if tree is None:
+            tree = self.context["category_tree"] = CategoryTree.get_tree()
+        return tree
+
+    def get_parents(self, obj) -> list:
+        """
+        Возвращает список родительских категорий в виде кортежей (name, slug, id),
+        начиная от корневой категории до текущего родителя.
+        """
+        return [
+            (parent.name, parent.slug)
+            for parent in CategoryTree.get_ancestors(self.get_category_tree(), obj)
+        ]
+
+
+class CategorySerializer(CategoryTreeMixin, ActiveModelSerializer):
     children = serializers.SerializerMethodField()
 
     parents = serializers.SerializerMethodField()
@@ -39,28 +66,11 @@ class CategorySerializer(ActiveModelSerializer):
     def get_children(self, obj) -> None | OrderedDict:
         if obj.is_leaf_node():
             return None
-        return CategorySerializer(obj.get_children(), many=True).data
+        children = CategoryTree.get_children(self.get_category_tree(), obj.pk)
+        return CategorySerializer(children, many=True, context=self.context).data
 
-    def get_parents(self, obj) -> list:
-        """
-        Возвращает список родительских категорий в виде кортежей (name, slug, id),
-        начиная от корневой категории до текущего родителя.
-        """
-        parents = []
-        current_parent = obj.parent
-        while current_parent:
-            parents.append(
-                (
-                    current_parent.name,
-                    current_parent.slug,
-                    # current_parent.id,
-                )
-            )
-            current_parent = current_parent.parent
-        return list(reversed(parents))
-
-
-class CategorySimplifiedSerializer(ActiveModelSerializer):
+
+class CategorySimplifiedSerializer(CategoryTreeMixin, ActiveModelSerializer):
     parents = serializers.SerializerMethodField()
 
     class Meta:
@@ -86,24 +96,6 @@ class CategorySimplifiedSerializer(ActiveModelSerializer):
         data["image"] = instance.image.url if instance.image else None
         return data
 
-    def get_parents(self, obj) -> list:
-        """
-        Возвращает список родительских категорий в виде кортежей (name, slug, id),
-        начиная от корневой категории до текущего родителя.
-        """
-        parents = []
-        current_parent = obj.parent
-        while current_parent:
-            parents.append(
-                (
-                    current_parent.name,
-                    current_parent.slug,
-                    # current_parent.id,
-                )
-            )
-            current_parent = current_parent.parent
-        return list(reversed(parents))
-
 
 class CategorySliderSerializer(ActiveModelSerializer):
 
@@ -143,18 +135,8 @@ class CategoryOrphanSerializer(CategorySliderSerializer, CategoriesWithProductsM
 
     def get_children(self, obj) -> None | OrderedDict:
         domain = self.context.get("city_domain", "")
-        childrens = obj.children.all()
-        return childrens.filter(
-            pk__in=[
-                c.id
-                for c in childrens
-                if c.get_descendants(include_self=True)
-                .filter(
-                    is_visible=True,
-                    is_active=True,
-                    products__isnull=False,
-                    products__prices__city_group__cities__domain=domain,
-                )
-                .exists()
-            ]
-        ).values("id", "name", "slug")
+        return [
+            child
+            for child in obj.children.values("id", "name", "slug")
+            if self.has_products(child["id"], domain)
+        ]
@@ -1,6 +1,6 @@
 from typing import OrderedDict
 from account.models import CustomUser
-from api.serializers import ProductCatalogSerializer
+from api.serializers import ProductCatalogSerializer, ProductRelatedListSerializer
 from shop.models import FavoriteProduct, Product
 from api.serializers import ActiveModelSerializer
 from rest_framework import serializers
@@ -13,6 +13,7 @@ class FavoriteProductSerializer(ActiveModelSerializer):
 
     class Meta:
         model = FavoriteProduct
+        list_serializer_class = ProductRelatedListSerializer
         fields = [
             "id",
             "user_id",
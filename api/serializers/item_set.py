@@ -1,5 +1,7 @@
 from typing import OrderedDict
 from rest_framework import serializers 
+from django.db.models import prefetch_related_objects
+from django.db.models.manager import BaseManager
 from api.serializers import (
     BannerSerializer,
     PromoSerializer,
@@ -12,6 +14,8 @@ from api.mixins import PriceFilterMixin
 from shop.models import (
     ItemSet,
     ItemSetElement,
+    Product,
+    Promo,
 )
 
 
@@ -39,6 +43,31 @@ class ItemSetSerializer(serializers.ModelSerializer, PriceFilterMixin):
         return data
 
 
+class ItemSetElementListSerializer(serializers.ListSerializer):
+    """
+    Список элементов наборов: связанные объекты загружаются одним запросом
+    на каждый тип содержимого вместе с данными, нужными их сериализаторам.
+    """
+
+    def to_representation(self, data):
+        elements = list(data.all() if isinstance(data, BaseManager) else data)
+        prefetch_related_objects(elements, "content_object")
+
+        by_model = {}
+        for element in elements:
+            if element.content_object is not None:
+                by_model.setdefault(type(element.content_object), []).append(
+                    element.content_object
+                )
+
+        if products := by_model.get(Product):
+            ProductCatalogSerializer.prefetch_catalog_data(products, self.context)
+        if promos := by_model.get(Promo):
+            prefetch_related_objects(promos, "cities", "categories")
+
+        return super().to_representation(elements)
+
+
 class ItemSetElementSerializer(serializers.ModelSerializer):
 
     content_object = serializers.SerializerMethodField()
@@ -53,6 +82,7 @@ class ItemSetElementSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ItemSetElement
+        list_serializer_class = ItemSetElementListSerializer
         fields = [
             "id",
             "item_set",
@@ -0,0 +1,120 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import QuerySet
+from rest_framework import serializers
+
+from api.mixins import SparseFieldset
+from shop.models import Product
+
+
+def _nullable(convert: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    return lambda value: None if value is None else convert(value)
+
+
+_price = _nullable(serializers.DecimalField(max_digits=10, decimal_places=2).to_representation)
+_image_storage = Product._meta.get_field("catalog_image").storage
+
+
+class ProductCardBuilder:
+    """
+    Быстрое построение карточек товаров из строк `QuerySet.values()`.
+
+    Результат совпадает с `ProductCatalogSerializer` для аннотированного
+    QuerySet (цены, слаг категории, количество в корзине), но не создает
+    экземпляры моделей и поля сериализатора. План построения карточки
+    компилируется один раз для набора полей запроса.
+    """
+
+    # Поле карточки -> (колонка строки, преобразование значения)
+    CARD_FIELDS: Dict[str, Tuple[Optional[str], Callable[[Any], Any]]] = {
+        "id": ("id", _nullable(int)),
+        "title": ("title", _nullable(str)),
+        "article": ("article", _nullable(str)),
+        "slug": ("slug", _nullable(str)),
+        "city_price": ("city_price", _price),
+        "old_price": ("old_price", _price),
+        "in_stock": ("in_stock", _nullable(bool)),
+        "category_slug": ("category_slug", lambda value: value),
+        "catalog_image": ("catalog_image", lambda name: _image_storage.url(name) if name else None),
+        "cart_quantity": ("cart_quantity", _nullable(int)),
+        "is_popular": ("is_popular", _nullable(bool)),
+        "is_new": ("is_new", _nullable(bool)),
+        "unit": ("unit", _nullable(str)),
+        "in_promo": (None, None),
+        "rating": ("rating_avg", _nullable(float)),
+        "reviews_count": ("reviews_count", _nullable(int)),
+        "is_active": ("is_active", _nullable(bool)),
+    }
+
+    _plans: Dict[Tuple, "ProductCardBuilder"] = {}
+
+    def __init__(self, fields: Tuple[str, ...]):
+        self.fields = fields
+        self.values_fields = [
+            self.CARD_FIELDS[name][0] for name in fields if self.CARD_FIELDS[name][0]
+        ]
+        self.getters = [(name, self._compile(name)) for name in fields]
+
+    def _compile(self, name: str) -> Callable[[dict], Any]:
+        """
+        Возвращает функцию получения значения поля карточки из строки.
+
+        :param name: Поле карточки.
+        """
+        if name == "in_promo":
+            # Как в ProductCatalogSerializer: сравниваются значения Decimal, а не строки
+            if not {"city_price", "old_price"}.issubset(self.fields):
+                return lambda row: False
+
+            def in_promo(row: dict) -> bool:
+                cp, op = row["city_price"], row["old_price"]
+                return cp is not None and op is not None and cp < op
+
+            return in_promo
+
+        column, convert = self.CARD_FIELDS[name]
+        return lambda row: convert(row[column])
+
+    @classmethod
+    def for_queryset(
+        cls, queryset: QuerySet, fieldset: Optional[SparseFieldset] = None
+    ) -> "ProductCardBuilder":
+        """
+        Возвращает скомпилированный план для QuerySet и набора полей запроса.
+        Количество в корзине выводится, только если QuerySet им аннотирован.
+
+        :param queryset: Аннотированный QuerySet товаров.
+        :param fieldset: Набор полей запроса.
+        :rtype: ProductCardBuilder
+        """
+        annotations = queryset.query.annotations
+        fields = tuple(
+            name
+            for name in cls.CARD_FIELDS
+            if (name != "cart_quantity" or "cart_quantity" in annotations)
+            and (fieldset is None or fieldset.includes(name))
+        )
+        if fields not in cls._plans:
+            cls._plans[fields] = cls(fields)
+
+        return cls._plans[fields]
+
+    def values(self, queryset: QuerySet) -> QuerySet:
+        """
+        Возвращает QuerySet строк с колонками, нужными для карточек.
+
+        :param queryset: Аннотированный QuerySet товаров.
+        :rtype: QuerySet
+        """
+        return queryset.values(*self.values_fields)
+
+    def build(self, rows: Iterable[dict]) -> List[dict]:
+        """
+        Строит карточки товаров из строк `values()`.
+
+        :param rows: Строки QuerySet.
+        :return: Список карточек товаров.
+        :rtype: List[dict]
+        """
+        getters = self.getters
+        return [{name: get(row) for name, get in getters} for row in rows]
@@ -1,71 +1,134 @@
+from functools import partial
+from typing import Iterable
 from loguru import logger
 from api.serializers import ActiveModelSerializer
+from api.mixins import SparseFieldsetsMixin
 
-from shop.models import Product
+from account.models import CityGroup
+from shop.models import CatalogPrice, Product
 from rest_framework import serializers
-from django.db.models import Sum
+from django.db.models import prefetch_related_objects
+from django.db.models.manager import BaseManager
 
 
-class ProductCatalogSerializer(ActiveModelSerializer):
+class ProductCatalogListSerializer(serializers.ListSerializer):
+    """
+    Список карточек товаров: цены и категории всех товаров загружаются
+    пакетно до сериализации отдельных карточек.
+    """
+
+    def to_representation(self, data):
+        products = list(data.all() if isinstance(data, BaseManager) else data)
+        ProductCatalogSerializer.prefetch_catalog_data(products, self.context)
+        return super().to_representation(products)
+
+
+class ProductRelatedListSerializer(serializers.ListSerializer):
+    """
+    Список объектов со ссылкой `product`, товар которых сериализуется
+    `ProductCatalogSerializer` (позиции корзины, избранное).
+    """
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, BaseManager) else data)
+        prefetch_related_objects(items, "product")
+        ProductCatalogSerializer.prefetch_catalog_data(
+            [item.product for item in items], self.context
+        )
+        return super().to_representation(items)
+
+
+class ProductCatalogSerializer(SparseFieldsetsMixin, ActiveModelSerializer):
     city_price = serializers.DecimalField(max_digits=10, decimal_places=2)
     old_price = serializers.DecimalField(max_digits=10, decimal_places=2)
     category_slug = serializers.SerializerMethodField()
 
     cart_quantity = serializers.IntegerField(min_value=1, read_only=True)
     in_promo = serializers.SerializerMethodField()
-    rating = serializers.FloatField()
-    reviews_count = serializers.IntegerField()
+    rating = serializers.FloatField(source="rating_avg", read_only=True)
+    reviews_count = serializers.IntegerField(read_only=True)
 
     def get_category_slug(self, obj) -> str:
+        if hasattr(obj, "category_slug"):
+            return obj.category_slug
         return obj.category.slug if obj.category else None
 
     def get_in_promo(self, obj) -> bool:
         return True #
 
-    def check_price(self, instance):
-        fields = {"city_price": "price", "old_price": "old_price"}
-        domain = self.context.get("city_domain")
-        if not all([hasattr(instance, field) for field in fields.keys()]):
-            price = instance.prices.filter(city_group__cities__domain=domain).first()
-            for field in fields:
-                if not hasattr(instance, field):
-                    value = getattr(price, fields[field], None)
-                    setattr(instance, field, value)
-        
- 
-    def check_rating(self, instance):
-        if not hasattr(instance, "reviews_count"):
-            setattr(instance, "reviews_count", instance.reviews.count())
-
-        if not hasattr(instance, "rating"):
-            value = 0
-            t_rating = instance.reviews.aggregate(sum_rating=Sum("rating"))["sum_rating"] or 0
-            if instance.reviews_count > 0:
-                value = t_rating / instance.reviews_count
-
-            setattr(instance, "rating", value)
+    @staticmethod
+    def prefetch_catalog_data(products: Iterable[Product], context: dict) -> None:
+        """
+        Загружает цены в группе городов домена из контекста и категории
+        для всех товаров двумя запросами. Товары с аннотированными ценами
+        и загруженными категориями, а также не запрошенные поля пропускаются.
+
+        :param products: Товары для сериализации.
+        :param context: Контекст сериализатора.
+        """
+        products = [p for p in products if p is not None]
+        is_requested = partial(SparseFieldsetsMixin.is_field_requested, context)
+        no_category = [
+            p
+            for p in products
+            if not (hasattr(p, "category_slug") or Product.category.is_cached(p))
+        ]
+        if no_category and is_requested("category_slug"):
+            prefetch_related_objects(no_category, "category")
 
+        no_price = [
+            p for p in products if not (hasattr(p, "city_price") and hasattr(p, "old_price"))
+        ]
+        if not no_price or not (is_requested("city_price") or is_requested("old_price")):
+            return
+
+        domain = context.get("city_domain")
+        city_group_pk = CityGroup.get_pk_by_domain(domain) if domain else None
+        prices = {}
+        if city_group_pk is not None:
+            prices = {
+                product_id: (price, old_price)
+                for product_id, price, old_price in CatalogPrice.objects.filter(
+                    product_id__in=[p.pk for p in no_price],
+                    city_group_id=city_group_pk,
+                ).values_list("product_id", "price", "old_price")
+            }
+
+        for product in no_price:
+            price, old_price = prices.get(product.pk, (None, None))
+            if not hasattr(product, "city_price"):
+                product.city_price = price
+            if not hasattr(product, "old_price"):
+                product.old_price = old_price
+
+    def check_price(self, instance):
+        # Товар вне списка: цены из CatalogPrice, как и для списка карточек
+        self.prefetch_catalog_data([instance], self.context)
 
     def to_representation(self, instance):
-        check_fields = ("price", "rating")
+        check_fields = ("price",)
         for field in check_fields:
             func = getattr(self, f"check_{field}")
             func(instance)
 
         data = super().to_representation(instance)
-        val = getattr(instance, "catalog_image", None)
-        data["catalog_image"] = val.url if val and hasattr(val, "url") else None
+        if "catalog_image" in self.fields:
+            val = getattr(instance, "catalog_image", None)
+            data["catalog_image"] = val.url if val and hasattr(val, "url") else None
 
-        in_promo = False
-        if (cp := data["city_price"]) and (op := data["old_price"]):
-            in_promo = cp < op
+        if "in_promo" in self.fields:
+            in_promo = False
+            if "city_price" in data and "old_price" in data:
+                cp, op = getattr(instance, "city_price", None), getattr(instance, "old_price", None)
+                in_promo = cp is not None and op is not None and cp < op
 
-        data["in_promo"] = in_promo
+            data["in_promo"] = in_promo
 
         return data
 
     class Meta:
         model = Product
+        list_serializer_class = ProductCatalogListSerializer
         fields = [
             "id",
             "title",
@@ -2,6 +2,7 @@ from typing import Any
 from loguru import logger
 
 from django.db import transaction
+from django.db.models import Prefetch, QuerySet
 
 from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
 from rest_framework import serializers
@@ -10,6 +11,8 @@ from api.serializers import ActiveModelSerializer
 from api.mixins import (
     RatingMixin,
     SerializerGetPricesMixin, 
+    SparseFieldset,
+    SparseFieldsetsMixin,
 )
 from api.serializers import (
     CategorySerializer,
@@ -24,7 +27,7 @@ from api.serializers import (
 from shop.models import CharacteristicValue, Product, ProductFile, ProductGroup
 
 
-class ProductDetailSerializer(RatingMixin, SerializerGetPricesMixin, ActiveModelSerializer):
+class ProductDetailSerializer(SparseFieldsetsMixin, RatingMixin, SerializerGetPricesMixin, ActiveModelSerializer):
     images = ProductImageSerializer(many=True)
     city_price = serializers.SerializerMethodField()
     old_price = serializers.SerializerMethodField()
@@ -33,6 +36,57 @@ class ProductDetailSerializer(RatingMixin, SerializerGetPricesMixin, ActiveModel
     priority = serializers.IntegerField(read_only=True)
     characteristic_values = SimplifiedCharacteristicValueSerializer(many=True, write_only=True)
 
+    # Связи, загружаемые для детальной карточки, по полям ответа: каждый элемент плана -
+    # один запрос независимо от количества характеристик, групп и товаров в группах.
+    select_related_plan = {"brand": ("brand",), "category": ("category",)}
+    prefetch_related_plan = {
+        "images": ("images",),
+        "files": ("files",),
+        "characteristic_values": (
+            Prefetch(
+                "characteristic_values",
+                queryset=CharacteristicValue.objects.select_related("characteristic"),
+            ),
+        ),
+        "groups": (
+            Prefetch(
+                "groups",
+                queryset=ProductGroup.objects.select_related("characteristic"),
+            ),
+            Prefetch(
+                "groups__products",
+                queryset=Product.objects.select_related("category"),
+            ),
+            Prefetch(
+                "groups__products__characteristic_values",
+                queryset=CharacteristicValue.objects.select_related("characteristic"),
+            ),
+        ),
+    }
+
+    @classmethod
+    def prefetch_queryset(cls, queryset: QuerySet, fieldset: SparseFieldset = None) -> QuerySet:
+        """
+        Применяет план загрузки связей детальной карточки к QuerySet продуктов.
+        Связи полей, не входящих в набор полей запроса, не загружаются.
+
+        :param queryset: QuerySet продуктов.
+        :param fieldset: Набор полей запроса.
+        :return: QuerySet с подгрузкой связей.
+        :rtype: QuerySet
+        """
+        def lookups(plan: dict) -> list:
+            return [
+                lookup
+                for field, field_lookups in plan.items()
+                if fieldset is None or fieldset.includes(field)
+                for lookup in field_lookups
+            ]
+
+        return queryset.select_related(*lookups(cls.select_related_plan)).prefetch_related(
+            *lookups(cls.prefetch_related_plan)
+        )
+
     class Meta:
         model = Product
         fields = [
@@ -112,30 +166,40 @@ class ProductDetailSerializer(RatingMixin, SerializerGetPricesMixin, ActiveModel
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        if instance.brand:
+        if "brand" in self.fields and instance.brand:
             data["brand"] = BrandSerializer(instance.brand).data
-        if instance.category:
+        if "category" in self.fields and instance.category:
             data["category"] = CategorySerializer(instance.category).data
-        
-        if instance.characteristic_values.exists():
-            data["characteristic_values"] = CharacteristicValueSerializer(instance.characteristic_values.all(), many=True).data
+
+        if "characteristic_values" not in self.fields:
+            return data
+
+        if characteristic_values := instance.characteristic_values.all():
+            data["characteristic_values"] = CharacteristicValueSerializer(characteristic_values, many=True).data
 
         return data
 
     def get_groups(self, obj) -> None | ReturnDict:
         context = {"current_product": obj.id}
-        visual_groups = obj.groups.filter(characteristic__name__istartswith="цвет")
+        visual_groups, non_visual_groups = [], []
+        for group in obj.groups.all():
+            name = group.characteristic.name if group.characteristic else ""
+            if name.lower().startswith("цвет"):
+                visual_groups.append(group)
+            else:
+                non_visual_groups.append(group)
+
         return {
             "visual_groups": ProductGroupSerializer(
                 visual_groups, many=True, context={"visual_groups": True, **context}
             ).data,
             "non_visual_group": ProductGroupSerializer(
-                obj.groups.exclude(id__in=visual_groups), many=True, context=context
+                non_visual_groups, many=True, context=context
             ).data,
         }
 
     def get_files(self, obj) -> ReturnList | Any | ReturnDict:
-        return ProductFileSerializer(obj.files, many=True).data
+        return ProductFileSerializer(obj.files.all(), many=True).data
 
 
 class ProductFileSerializer(ActiveModelSerializer):
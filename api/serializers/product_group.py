@@ -17,9 +17,21 @@ class ProductForGroupNonImageSerializer(ActiveModelSerializer):
     def get_is_selected(self, obj) -> bool:
         return self.context.get("current_product") == obj.id
 
-    def get_characteristics(self, obj) -> QuerySet:
+    def get_characteristics(self, obj) -> QuerySet | list:
+        name = self.context.get("characteristic_name")
+        if "characteristic_values" in getattr(obj, "_prefetched_objects_cache", {}):
+            return [
+                {
+                    "id": value.id,
+                    "value": value.value,
+                    "characteristic__name": value.characteristic.name,
+                }
+                for value in obj.characteristic_values.all()
+                if not name or value.characteristic.name == name
+            ]
+
         characteristic_values = CharacteristicValue.objects.filter(product=obj)
-        if name := self.context.get("characteristic_name"):
+        if name:
             characteristic_values = characteristic_values.filter(
                 characteristic__name=name
             )
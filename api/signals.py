@@ -0,0 +1,56 @@
+from django.dispatch import receiver
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+from account.models import City
+from api.mixins.cache_response import CacheTags
+from shop.models import Product
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_cache_tags(sender, instance, **kwargs):
+    """
+    Инвалидирует кэшированные ответы, зависящие от измененного или удаленного объекта.
+    Версии тегов увеличиваются после фиксации транзакции, иначе параллельный запрос
+    успеет закэшировать прежние данные под новыми версиями.
+
+    :param sender: Отправитель сигнала.
+    :param instance: Экземпляр модели.
+    :param kwargs: Дополнительные параметры.
+    """
+    if CacheTags.is_tracked(sender):
+        tags = CacheTags.for_instance(instance)
+        transaction.on_commit(lambda: CacheTags.invalidate(*tags))
+
+
+@receiver(m2m_changed)
+def invalidate_cache_tags_m2m(sender, instance, action, **kwargs):
+    """
+    Инвалидирует кэшированные ответы при изменении связей многие-ко-многим
+    после фиксации транзакции. Инвалидируются теги объектов обеих сторон связи
+    (например, товара и его группы товаров).
+
+    :param sender: Промежуточная модель связи.
+    :param instance: Экземпляр модели, связи которого изменились.
+    :param action: Тип изменения.
+    :param kwargs: Дополнительные параметры.
+    """
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if sender is Product.unavailable_in.through:
+        transaction.on_commit(lambda: cache.delete(City.UNAVAILABLE_PRODUCTS_DOMAINS_KEY))
+
+    tags = []
+    if CacheTags.is_tracked(instance.__class__):
+        tags.extend(CacheTags.for_instance(instance))
+
+    model, pk_set = kwargs.get("model"), kwargs.get("pk_set")
+    if model is not None and CacheTags.is_tracked(model):
+        tags.append(CacheTags.for_model(model))
+        tags.extend(CacheTags.for_object(model, pk) for pk in pk_set or ())
+
+    if tags:
+        transaction.on_commit(lambda: CacheTags.invalidate(*tags))
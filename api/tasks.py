@@ -59,9 +59,38 @@ def collect_feed_xml_files():
     return result
 
 
+@shared_task
+def drain_search_index_queue():
+    """
+    Индексирует в Elasticsearch объекты, накопившиеся в очереди инкрементальной индексации,
+    и инвалидирует кэшированные результаты поиска, содержащие эти объекты.
+    """
+    from api.mixins.general_search import SearchResultCache
+    from shop.services import SearchIndexQueue
+
+    indexed = SearchIndexQueue.drain()
+    SearchResultCache.invalidate(indexed)
+    return {index: len(ids) for index, ids in indexed.items()}
+
+
 def send_email_with_attachment(email_to, file_path):
     subject = f"Экспорт {get_shop_name()}"
     email = EmailMessage(subject, from_email=settings.EMAIL_HOST_USER, to=[email_to])
     email.attach_file(file_path)
     result = email.send(fail_silently=True)
     logger.debug(f"Export File was mailed with status: {result}")
+
+
+@shared_task
+def refresh_cached_response(path: str, host: str, secure: bool = False):
+    """
+    Пересчитывает кэшированный ответ API, повторно выполняя представление для пути.
+    Запрос помечается `_cache_refresh`, поэтому `CacheResponse` не читает кэш,
+    сохраняет новый ответ и снимает блокировку пересчета.
+
+    Запрос собирается и выполняется в `CacheResponse.replay_request`.
+    """
+    from api.mixins.cache_response import CacheResponse
+
+    response = CacheResponse.replay_request(path, host, secure)
+    return f"Cached response for {path} refreshed with status {response.status_code}"
@@ -0,0 +1,222 @@
+import gzip
+import json
+from types import SimpleNamespace
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+
+from api.mixins.cache_response import CacheResponse, CacheTags
+from api.tasks import refresh_cached_response
+from shop.models import Category, Price, Product, ProductGroup
+from account.models import CityGroup
+
+
+class CacheTagsTestCase(TestCase):
+    def setUp(self):
+        cache = LocMemCache("cache-tags-test", {})
+        cache.clear()
+        patcher = mock.patch("api.mixins.cache_response.cache", cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.category = Category.objects.create(name="tags-ctg", slug="tags-ctg")
+        self.product = Product.objects.create(
+            title="tags-product", slug="tags-product", article="tags-article", category=self.category
+        )
+        self.city_group = CityGroup.objects.create(name="tags-city-group")
+
+    def test_price_change_invalidates_product_tag(self):
+        versions = CacheTags.get_versions([CacheTags.for_object(Product, self.product.pk)])
+        self.assertTrue(CacheTags.is_valid(versions))
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Price.objects.create(product=self.product, city_group=self.city_group, price=100)
+        self.assertTrue(CacheTags.is_valid(versions))
+
+        for callback in callbacks:
+            callback()
+        self.assertFalse(CacheTags.is_valid(versions))
+
+    def test_unrelated_change_keeps_object_tag(self):
+        versions = CacheTags.get_versions([CacheTags.for_object(Product, self.product.pk)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="other-ctg", slug="other-ctg")
+        self.assertTrue(CacheTags.is_valid(versions))
+
+    def test_reverse_m2m_change_invalidates_related_model_tag(self):
+        group = ProductGroup.objects.create(name="tags-group")
+        versions = CacheTags.get_versions(
+            [CacheTags.for_model(ProductGroup), CacheTags.for_object(ProductGroup, group.pk)]
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.groups.add(group)
+        self.assertFalse(CacheTags.is_valid(versions))
+
+    def test_only_cached_models_are_tracked(self):
+        for label in CacheTags.tracked_models:
+            self.assertTrue(CacheTags.is_tracked(apps.get_model(label)))
+
+        self.assertFalse(CacheTags.is_tracked(get_user_model()))
+
+    def test_invalidate_model_invalidates_object_entries(self):
+        versions = CacheTags.get_versions(
+            [CacheTags.for_object(Product, self.product.pk), CacheTags.for_all_objects(Product)]
+        )
+
+        CacheTags.invalidate_model(Product)
+        self.assertFalse(CacheTags.is_valid(versions))
+
+
+class DummyListView:
+    calls = 0
+
+    def list(self, request, *args, **kwargs):
+        DummyListView.calls += 1
+        return Response(
+            {"calls": DummyListView.calls, "authenticated": request.user.is_authenticated}
+        )
+
+
+class DummyCachedView(CacheResponse, DummyListView):
+    action = "list"
+    cache_tags = ()
+
+    def get_renderer_context(self):
+        return {"view": self, "request": self.request}
+
+    def apply_user_overlay(self, data):
+        data["user"] = self.request.user.pk
+        return data
+
+
+class CacheResponseStampedeTestCase(TestCase):
+    def setUp(self):
+        self.cache = LocMemCache("cache-response-test", {})
+        self.cache.clear()
+        patcher = mock.patch("api.mixins.cache_response.cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        DummyListView.calls = 0
+        self.view = DummyCachedView()
+        self.view.request = Request(APIRequestFactory().get("/dummy/?page=1"))
+
+    def test_fresh_entry_is_served_from_cache(self):
+        self.assertEqual(self.view.list(self.view.request).data, {"calls": 1, "authenticated": False})
+        self.assertEqual(self.view.list(self.view.request).data["calls"], 1)
+
+    def test_stale_entry_is_served_while_locked(self):
+        self.view.list(self.view.request)
+        cache_key = self.view._generate_cache_key()
+        entry = self.cache.get(cache_key)
+        entry["expires_at"] = 0
+        self.cache.set(cache_key, entry)
+
+        self.cache.add(f"{cache_key}_lock", 1)
+        self.assertEqual(self.view.list(self.view.request).data["calls"], 1)
+
+        self.cache.delete(f"{cache_key}_lock")
+        self.assertEqual(self.view.list(self.view.request).data["calls"], 2)
+
+    def test_rendered_entry_is_served_as_bytes(self):
+        self.view.cache_rendered = self.view.cache_compress = True
+        request = APIRequestFactory().get("/dummy/", HTTP_ACCEPT_ENCODING="gzip")
+        self.view.request = Request(request)
+        self.view.request.accepted_renderer = JSONRenderer()
+        self.view.request.accepted_media_type = "application/json"
+        self.view.format_kwarg = None
+
+        self.view.list(self.view.request)
+        response = self.view.list(self.view.request)
+        self.assertEqual(DummyListView.calls, 1)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(json.loads(gzip.decompress(response.content))["calls"], 1)
+
+    def test_shared_entry_is_built_anonymously_and_overlaid(self):
+        self.view.cache_anonymous = self.view.cache_user_overlay = True
+        self.view.list(self.view.request)
+
+        self.view.request.user = SimpleNamespace(is_authenticated=True, is_staff=False, pk=7)
+        data = self.view.list(self.view.request).data
+        self.assertEqual(DummyListView.calls, 1)
+        self.assertEqual(data, {"calls": 1, "authenticated": False, "user": 7})
+
+    def test_shared_entry_is_built_as_request_user_by_default(self):
+        self.view.request.user = SimpleNamespace(is_authenticated=True, is_staff=False, pk=7)
+        self.assertEqual(self.view.list(self.view.request).data, {"calls": 1, "authenticated": True})
+
+    def test_staff_requests_bypass_cache(self):
+        self.view.request.user = SimpleNamespace(is_authenticated=True, is_staff=True, pk=1)
+        self.view.list(self.view.request)
+        self.view.list(self.view.request)
+        self.assertEqual(DummyListView.calls, 2)
+
+    def test_cache_key_is_canonical(self):
+        keys = set()
+        for path in (
+            "/dummy/?city_domain=x.ru&order_by=price",
+            "/dummy/?order_by=price&city_domain=x.ru&page=1",
+            "/dummy/?utm_source=ad&order_by=price&brand=&city_domain=x.ru",
+        ):
+            self.view.request = Request(APIRequestFactory().get(path))
+            keys.add(self.view._generate_cache_key())
+
+        self.assertEqual(len(keys), 1)
+
+    @mock.patch("account.models.CityGroup.get_pk_by_domain", return_value=3)
+    @mock.patch("account.models.City.get_domains_with_unavailable_products", return_value={"z.ru"})
+    def test_city_domain_is_collapsed_to_city_group(self, *mocks):
+        self.view.cache_collapse_city_domain = True
+        keys = []
+        for domain in ("x.ru", "y.ru", "z.ru"):
+            self.view.request = Request(APIRequestFactory().get(f"/dummy/?city_domain={domain}"))
+            keys.append(self.view._generate_cache_key())
+
+        self.assertEqual(keys[0], keys[1])
+        self.assertNotEqual(keys[0], keys[2])
+
+
+class RefreshCachedResponseTestCase(SimpleTestCase):
+    @override_settings(ALLOWED_HOSTS=["x.ru"])
+    @mock.patch("api.middlewares.city.CityTable.get_city")
+    def test_replay_sets_city_and_anonymous_user(self, get_city):
+        get_city.return_value = SimpleNamespace(city_group="city-group")
+        seen = {}
+
+        def view(request):
+            seen.update(
+                path=request.get_full_path(),
+                host=request.get_host(),
+                secure=request.is_secure(),
+                city_group=request.city_group,
+                authenticated=request.user.is_authenticated,
+                refresh=request._cache_refresh,
+            )
+            return HttpResponse()
+
+        match = SimpleNamespace(func=view, args=(), kwargs={})
+        with mock.patch("django.urls.resolve", return_value=match):
+            refresh_cached_response("/api/pages/contact-info/?city_domain=x.ru", "x.ru", True)
+
+        get_city.assert_called_once_with("x.ru")
+        self.assertEqual(
+            seen,
+            {
+                "path": "/api/pages/contact-info/?city_domain=x.ru",
+                "host": "x.ru",
+                "secure": True,
+                "city_group": "city-group",
+                "authenticated": False,
+                "refresh": True,
+            },
+        )
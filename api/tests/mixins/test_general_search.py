@@ -0,0 +1,136 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+from elasticsearch_dsl import MultiSearch
+from elasticsearch_dsl.response import Response
+
+from api.metrics import search_cache_requests
+from api.mixins import GeneralSearchMixin
+from api.mixins.general_search import SearchResultCache
+
+
+class GeneralSearchMixinTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.mixin = GeneralSearchMixin()
+        self.mixin.request = SimpleNamespace(user=AnonymousUser())
+
+    def search(self, **kwargs):
+        searches = []
+
+        def execute(multi_search, raise_on_error=True):
+            searches.extend(search.to_dict() for search in multi_search._searches)
+            return [None] * len(multi_search._searches)
+
+        with mock.patch.object(MultiSearch, "execute", autospec=True, side_effect=execute):
+            results, total = self.mixin.g_search("водосток", "moskva", **kwargs)
+
+        return searches, results, total
+
+    def test_each_index_is_searched_with_its_own_size_and_timeout(self):
+        searches, results, total = self.search()
+
+        self.assertEqual(
+            [(search["size"], search["timeout"]) for search in searches],
+            [
+                (section["size"], section["timeout"])
+                for section in GeneralSearchMixin.search_sections.values()
+            ],
+        )
+        self.assertEqual(set(results), set(GeneralSearchMixin.search_sections))
+        self.assertEqual(total, 0)
+
+    def test_only_product_section_is_paginated_and_sorted(self):
+        searches, results, _ = self.search(
+            exclude_=("categories", "brands"), page=2, per_page=20, ordering="-price", ids_only=True
+        )
+
+        self.assertEqual(list(results), ["products"])
+        self.assertEqual(len(searches), 1)
+        self.assertEqual((searches[0]["from"], searches[0]["size"]), (20, 20))
+        self.assertEqual(searches[0]["_source"], ["id"])
+        self.assertEqual(searches[0]["sort"][0]["prices.price"]["nested"]["path"], "prices")
+
+
+class SearchResultCacheTestCase(SimpleTestCase):
+
+    SOURCES = {
+        "products": [{"id": 1, "title": "Водосток", "prices": []}],
+        "categories": [{"id": 2, "name": "Водостоки"}],
+        "brands": [],
+    }
+
+    def setUp(self):
+        self.mixin = GeneralSearchMixin()
+        self.mixin.request = SimpleNamespace(user=AnonymousUser())
+
+        locmem = LocMemCache("search-result-cache-tests", {})
+        locmem.clear()
+        for target in ("api.mixins.general_search.cache", "api.mixins.cache_response.cache"):
+            patcher = mock.patch(target, locmem)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def execute(self, multi_search, raise_on_error=True):
+        return [
+            Response(
+                search,
+                {
+                    "timed_out": False,
+                    "hits": {
+                        "total": {"value": len(self.SOURCES[search._index[0]])},
+                        "hits": [
+                            {"_index": search._index[0], "_id": str(source["id"]), "_source": source}
+                            for source in self.SOURCES[search._index[0]]
+                        ],
+                    },
+                },
+            )
+            for search in multi_search._searches
+        ]
+
+    def search(self, query):
+        with mock.patch.object(MultiSearch, "execute", autospec=True, side_effect=self.execute) as execute:
+            results, total = self.mixin.g_search(query, "moskva")
+
+        return execute.call_count, results, total
+
+    def get_count(self, result):
+        return search_cache_requests.labels(result=result)._value.get()
+
+    def test_normalized_queries_share_entry(self):
+        hits, misses = self.get_count("hit"), self.get_count("miss")
+
+        self.assertEqual(self.search("Водосток")[0], 1)
+        calls, results, total = self.search("  водосток ")
+
+        self.assertEqual(calls, 0)
+        self.assertEqual([hit.id for hit in results["products"]["hits"]], [1])
+        self.assertEqual(total, 2)
+        self.assertEqual((self.get_count("hit") - hits, self.get_count("miss") - misses), (1, 1))
+
+    def test_transliterated_query_has_own_entry(self):
+        self.assertEqual(self.search("профнастил")[0], 1)
+        self.assertEqual(self.search("profnastil")[0], 1)
+        self.assertEqual(SearchResultCache.normalize_query(" ПРОФНАСТИЛ "), "профнастил")
+
+    def test_indexed_document_invalidates_entry(self):
+        self.search("водосток")
+        SearchResultCache.invalidate({"products": [1]})
+
+        self.assertEqual(self.search("водосток")[0], 1)
+
+    def test_other_documents_keep_entry(self):
+        self.search("водосток")
+        SearchResultCache.invalidate({"products": [3]})
+
+        self.assertEqual(self.search("водосток")[0], 0)
+
+    def test_index_rebuild_invalidates_entry(self):
+        self.search("водосток")
+        SearchResultCache.invalidate_index("categories")
+
+        self.assertEqual(self.search("водосток")[0], 1)
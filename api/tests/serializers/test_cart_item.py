@@ -1,7 +1,9 @@
+from django.db import connection
 from django.test import TestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from loguru import logger
-from shop.models import Brand, Product, Price, City, CityGroup, Category
+from shop.models import Brand, Product, Price, CatalogPrice, City, CityGroup, Category
 from cart.models import CartItem
 from api.serializers import CartItemSerializer, SimplifiedCartItemSerializer
 
@@ -112,3 +114,25 @@ class CartItemSerializerTestCase(TestCase):
         self.assertEqual(cart_item.customer, self.user)
         self.assertEqual(cart_item.product, self.product)
         self.assertEqual(cart_item.quantity, 5)
+
+    def test_cart_item_list_serializer_batches_prices(self):
+        dummy_domain = "voronezh.domain.com"
+        Price.objects.create(product=self.product, city_group=self.city_group, price=100)
+        Price.objects.create(product=self.product_2, city_group=self.city_group, price=200)
+        CartItem.objects.create(product=self.product, customer=self.user, quantity=1)
+        CartItem.objects.create(product=self.product_2, customer=self.user, quantity=2)
+
+        items = CartItem.objects.filter(customer=self.user).order_by("id")
+        serializer = CartItemSerializer(items, many=True, context={"city_domain": dummy_domain})
+
+        with CaptureQueriesContext(connection) as queries:
+            data = serializer.data
+
+        price_table = CatalogPrice._meta.db_table
+        self.assertEqual(
+            len([q for q in queries if f'"{price_table}"' in q["sql"]]), 1
+        )
+
+        self.assertEqual(
+            [item["product"]["city_price"] for item in data], ["100.00", "200.00"]
+        )
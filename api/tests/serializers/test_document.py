@@ -1,7 +1,9 @@
 import io
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
+from elasticsearch_dsl.response import Hit
 from django.core.files.uploadedfile import SimpleUploadedFile
 from api.serializers import CategoryDocumentSerializer, ProductDocumentSerializer
+from shop.documents import ProductDocument
 from shop.models import Brand, Category, Product
 from PIL import Image
 from django.core.files.base import ContentFile
@@ -102,3 +104,53 @@ class ProductDocumentSerializerTest(TestCase):
         validated_data = serializer.validated_data
         self.assertEqual(validated_data['title'], data['title'])
         self.assertEqual(validated_data['description'], data['description'])
+
+
+class ProductDocumentHitSerializerTest(SimpleTestCase):
+
+    def get_hit(self, **source):
+        return Hit(
+            {
+                "_index": "products",
+                "_id": "1",
+                "_source": {
+                    "id": 1,
+                    "title": "Test Product",
+                    "article": "TEST123",
+                    "description": "Test Description",
+                    "slug": "test-product",
+                    "category": {"slug": "test-category", "name": "Test Category"},
+                    "search_image": "https://s3.aws.cloud/catalog/products/search_images/1.webp",
+                    "prices": [
+                        {"city_group_id": 1, "cg_domain": "moskva", "price": "99.50", "old_price": None},
+                        {"city_group_id": 2, "cg_domain": "voronezh", "price": "90", "old_price": "120"},
+                    ],
+                    "rating": 4.5,
+                    "reviews_count": 2,
+                    **source,
+                },
+            }
+        )
+
+    def test_serialization_from_source(self):
+        hit = self.get_hit()
+        ProductDocument.set_city_prices(hit, "voronezh")
+
+        data = ProductDocumentSerializer(hit).data
+
+        self.assertEqual(data["category_slug"], "test-category")
+        self.assertEqual(data["search_image"], "https://s3.aws.cloud/catalog/products/search_images/1.webp")
+        self.assertEqual(data["price"], "90.00")
+        self.assertEqual(data["old_price"], "120.00")
+        self.assertEqual(data["rating"], 4.5)
+        self.assertEqual(data["reviews_count"], 2)
+
+    def test_serialization_without_city_price(self):
+        hit = self.get_hit(search_image=None)
+        ProductDocument.set_city_prices(hit, "spb")
+
+        data = ProductDocumentSerializer(hit).data
+
+        self.assertIsNone(data["price"])
+        self.assertIsNone(data["old_price"])
+        self.assertIsNone(data["search_image"])
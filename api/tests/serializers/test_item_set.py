@@ -0,0 +1,46 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from shop.models import Category, ItemSet, ItemSetElement, Price, Product
+from account.models import City, CityGroup
+from api.serializers import ItemSetElementSerializer
+
+
+class ItemSetElementSerializerTestCase(TestCase):
+
+    def setUp(self):
+        self.domain = "voronezh.domain.com"
+        self.city_group = CityGroup.objects.create(name="Воронеж Group")
+        self.city = City.objects.create(name="Воронеж", domain=self.domain)
+        self.city_group.cities.add(self.city)
+        self.category = Category.objects.create(name="Item set category", order=1, slug="item-set-category")
+        self.item_set = ItemSet.objects.create(title="Products", description="Products", itemset_type="product")
+        content_type = ContentType.objects.get_for_model(Product)
+
+        for i in range(3):
+            product = Product.objects.create(
+                title=f"Item set product {i}",
+                slug=f"item-set-product-{i}",
+                article=f"ITEMSET{i}",
+                category=self.category,
+            )
+            Price.objects.create(product=product, city_group=self.city_group, price=100 + i)
+            ItemSetElement.objects.create(
+                item_set=self.item_set, content_type=content_type, object_id=product.pk, order=i
+            )
+
+    def count_queries(self, elements) -> int:
+        serializer = ItemSetElementSerializer(elements, many=True, context={"city_domain": self.domain})
+        with CaptureQueriesContext(connection) as queries:
+            data = serializer.data
+        self.assertTrue(all(item["content_object"]["city_price"] for item in data))
+        return len(queries)
+
+    def test_queries_do_not_depend_on_elements_count(self):
+        CityGroup.get_pk_by_domain(self.domain)
+        elements = ItemSetElement.objects.filter(item_set=self.item_set)
+
+        self.assertEqual(
+            self.count_queries(elements[:1]), self.count_queries(elements)
+        )
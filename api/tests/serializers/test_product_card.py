@@ -0,0 +1,104 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from api.mixins import SparseFieldset
+from api.serializers import ProductCardBuilder, ProductCatalogSerializer
+from shop.models import Product
+
+
+class ProductCardBuilderTestCase(SimpleTestCase):
+
+    ROWS = [
+        {
+            "id": 1,
+            "title": "Металлочерепица",
+            "article": "ART-1",
+            "slug": "metallocherepitsa",
+            "city_price": Decimal("99.5"),
+            "old_price": Decimal("120"),
+            "in_stock": True,
+            "category_slug": "krovlya",
+            "catalog_image": "catalog/products/images/1.webp",
+            "is_popular": False,
+            "is_new": True,
+            "unit": "шт.",
+            "rating_avg": 4.5,
+            "reviews_count": 2,
+            "is_active": True,
+        },
+        {
+            "id": 2,
+            "title": "Водосток",
+            "article": "ART-2",
+            "slug": "vodostok",
+            "city_price": None,
+            "old_price": None,
+            "in_stock": False,
+            "category_slug": None,
+            "catalog_image": "",
+            "is_popular": True,
+            "is_new": False,
+            "unit": None,
+            "rating_avg": 0.0,
+            "reviews_count": 0,
+            "is_active": True,
+        },
+        {
+            "id": 3,
+            "title": "Саморез",
+            "article": "ART-3",
+            "slug": "samorez",
+            "city_price": Decimal("1000"),
+            "old_price": Decimal("999"),
+            "in_stock": True,
+            "category_slug": "krepezh",
+            "catalog_image": "",
+            "is_popular": False,
+            "is_new": False,
+            "unit": "шт.",
+            "rating_avg": 0.0,
+            "reviews_count": 0,
+            "is_active": True,
+        },
+    ]
+
+    def get_products(self):
+        products = []
+        for row in self.ROWS:
+            row = dict(row)
+            attrs = {key: row.pop(key) for key in ("city_price", "old_price", "category_slug")}
+            product = Product(**row)
+            for key, value in attrs.items():
+                setattr(product, key, value)
+            products.append(product)
+        return products
+
+    def get_builder(self, fieldset=None):
+        return ProductCardBuilder.for_queryset(Product.objects.all(), fieldset)
+
+    def test_cards_match_serializer(self):
+        serialized = ProductCatalogSerializer(self.get_products(), many=True).data
+
+        self.assertEqual(
+            [dict(card) for card in serialized], self.get_builder().build(self.ROWS)
+        )
+
+    def test_cards_match_serializer_with_fieldset(self):
+        fieldset = SparseFieldset(fields=frozenset({"id", "slug", "city_price", "in_promo"}))
+        serialized = ProductCatalogSerializer(
+            self.get_products(), many=True, context={"sparse_fieldset": fieldset}
+        ).data
+
+        self.assertEqual(
+            [dict(card) for card in serialized], self.get_builder(fieldset).build(self.ROWS)
+        )
+
+    def test_in_promo_compares_price_values(self):
+        # Строки "99.50" < "120.00" и "1000.00" < "999.00" сравниваются наоборот
+        serialized = ProductCatalogSerializer(self.get_products(), many=True).data
+
+        self.assertEqual([card["in_promo"] for card in serialized], [True, False, False])
+        self.assertEqual(
+            [card["in_promo"] for card in self.get_builder().build(self.ROWS)], [True, False, False]
+        )
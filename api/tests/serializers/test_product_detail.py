@@ -0,0 +1,102 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from account.models import City, CityGroup
+from shop.models import (
+    Brand,
+    Category,
+    Characteristic,
+    CharacteristicValue,
+    Price,
+    Product,
+    ProductFile,
+    ProductGroup,
+)
+from api.mixins import SparseFieldset
+from api.serializers import ProductCatalogSerializer, ProductDetailSerializer
+
+
+class ProductDetailSerializerTestCase(TestCase):
+
+    MAX_QUERIES = 10
+
+    def setUp(self):
+        self.domain = "voronezh.domain.com"
+        self.city_group = CityGroup.objects.create(name="Воронеж Group")
+        self.city = City.objects.create(name="Воронеж", domain=self.domain)
+        self.city_group.cities.add(self.city)
+
+        self.category = Category.objects.create(name="Detail category", order=1, slug="detail-category")
+        self.brand = Brand.objects.create(name="Detail brand", order=1, slug="detail-brand")
+        self.color = Characteristic.objects.create(name="Цвет", slug="detail-color")
+        self.size = Characteristic.objects.create(name="Размер", slug="detail-size")
+        self.product = self.create_product(0)
+        Price.objects.create(product=self.product, city_group=self.city_group, price=100)
+        ProductFile.objects.create(product=self.product, name="Инструкция")
+
+        self.color_group = ProductGroup.objects.create(name="Цвета", characteristic=self.color)
+        self.size_group = ProductGroup.objects.create(name="Размеры", characteristic=self.size)
+        self.add_to_groups(self.product)
+
+        request = APIRequestFactory().get("/", {"city_domain": self.domain})
+        self.context = {"request": Request(request)}
+
+    def create_product(self, index: int) -> Product:
+        return Product.objects.create(
+            title=f"Detail product {index}",
+            slug=f"detail-product-{index}",
+            article=f"DETAIL{index}",
+            category=self.category,
+            brand=self.brand,
+        )
+
+    def add_to_groups(self, product: Product) -> None:
+        CharacteristicValue.objects.create(product=product, characteristic=self.color, value=f"color {product.pk}")
+        CharacteristicValue.objects.create(product=product, characteristic=self.size, value=str(product.pk))
+        self.color_group.products.add(product)
+        self.size_group.products.add(product)
+
+    def count_queries(self) -> int:
+        queryset = ProductDetailSerializer.prefetch_queryset(Product.objects.filter(pk=self.product.pk))
+        with CaptureQueriesContext(connection) as queries:
+            data = ProductDetailSerializer(queryset.get(), context=self.context).data
+
+        self.assertEqual(data["city_price"], self.product.prices.get().price)
+        self.assertEqual(len(data["groups"]["visual_groups"]), 1)
+        self.assertEqual(len(data["groups"]["non_visual_group"]), 1)
+        return len(queries)
+
+    def test_queries_are_bounded(self):
+        self.count_queries()
+        queries = self.count_queries()
+        self.assertLessEqual(queries, self.MAX_QUERIES)
+
+        for i in range(1, 4):
+            self.add_to_groups(self.create_product(i))
+
+        self.assertEqual(self.count_queries(), queries)
+
+    def test_sparse_fieldset_skips_group_queries(self):
+        fieldset = SparseFieldset(omit=frozenset({"groups", "files"}))
+        context = {**self.context, "sparse_fieldset": fieldset}
+        queryset = ProductDetailSerializer.prefetch_queryset(
+            Product.objects.filter(pk=self.product.pk), fieldset
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            data = ProductDetailSerializer(queryset.get(), context=context).data
+
+        self.assertNotIn("groups", data)
+        self.assertNotIn("files", data)
+        group_table = ProductGroup._meta.db_table
+        self.assertFalse([q for q in queries if f'"{group_table}"' in q["sql"]])
+
+    def test_sparse_fieldset_for_catalog_card(self):
+        fieldset = SparseFieldset(fields=frozenset({"id", "slug", "title", "city_price"}))
+        data = ProductCatalogSerializer(
+            [self.product], many=True, context={"city_domain": self.domain, "sparse_fieldset": fieldset}
+        ).data
+
+        self.assertEqual(set(data[0]), {"id", "slug", "title", "city_price"})
@@ -0,0 +1,20 @@
+from django.db.models import F
+from django.test import SimpleTestCase
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.pagination import CursorProductPagination
+from shop.models import Product
+
+
+class CursorProductPaginationTestCase(SimpleTestCase):
+
+    def test_expression_ordering_is_rejected_with_400(self):
+        request = Request(APIRequestFactory().get("/", {"pagination": "cursor"}))
+        queryset = Product.objects.order_by(F("priority").desc(nulls_last=True))
+
+        with self.assertRaises(ValidationError) as raised:
+            CursorProductPagination().paginate_queryset(queryset, request)
+
+        self.assertEqual(raised.exception.status_code, 400)
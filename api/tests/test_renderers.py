@@ -0,0 +1,35 @@
+import datetime
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy as _
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import ORJSONRenderer
+
+
+class ORJSONRendererTestCase(SimpleTestCase):
+
+    def test_output_matches_json_renderer(self):
+        data = {
+            "price": Decimal("100.50"),
+            "created_at": datetime.datetime(2024, 1, 2, 3, 4, 5, 600, tzinfo=datetime.timezone.utc),
+            "day": datetime.date(2024, 1, 2),
+            "title": _("Товар"),
+            "separator": "a\u2028b",
+            1: [None, True, 1.5],
+        }
+
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_indent(self):
+        rendered = ORJSONRenderer().render({"a": 1}, "application/json; indent=4")
+        self.assertEqual(rendered, b'{\n  "a": 1\n}')
+
+    def test_big_integer_falls_back_to_json_renderer(self):
+        data = {"id": 2**64, "price": Decimal("1.50")}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_documented_differences(self):
+        self.assertEqual(ORJSONRenderer().render({"a": 1e16}), b'{"a":1e16}')
+        self.assertEqual(ORJSONRenderer().render({"a": float("nan")}), b'{"a":null}')
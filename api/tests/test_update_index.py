@@ -0,0 +1,68 @@
+from contextlib import nullcontext
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+from api.management.commands.update_index import Command
+
+
+class UpdateIndexTestCase(SimpleTestCase):
+    def setUp(self):
+        self.client = mock.Mock()
+        self.document = SimpleNamespace(
+            _index=SimpleNamespace(_name="products", _settings={}, clone=mock.Mock())
+        )
+
+        for target, value in (
+            ("connections.get_connection", mock.Mock(return_value=self.client)),
+            ("SearchIndexQueue.pause", mock.Mock(return_value=nullcontext())),
+            ("SearchResultCache.invalidate_index", mock.Mock()),
+        ):
+            patcher = mock.patch(f"api.management.commands.update_index.{target}", value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def rebuild(self, **kwargs):
+        command = Command(stdout=mock.Mock())
+        with mock.patch.object(Command, "load", **kwargs):
+            command.rebuild(self.document, chunk_size=10, workers=1, keep_old=False)
+
+        return self.document._index.clone.call_args.kwargs["name"]
+
+    def test_alias_is_moved_from_old_indices(self):
+        self.client.indices.exists_alias.return_value = True
+        self.client.indices.get_alias.return_value = {"products-1": {}}
+
+        name = self.rebuild(return_value=3)
+
+        self.client.indices.update_aliases.assert_called_once_with(
+            actions=[
+                {"remove": {"index": "products-1", "alias": "products"}},
+                {"add": {"index": name, "alias": "products"}},
+            ]
+        )
+        self.client.indices.delete.assert_called_once_with(index="products-1", ignore_unavailable=True)
+
+    def test_legacy_index_is_replaced_by_alias(self):
+        self.client.indices.exists_alias.return_value = False
+        self.client.indices.exists.return_value = True
+
+        name = self.rebuild(return_value=3)
+
+        self.client.indices.update_aliases.assert_called_once_with(
+            actions=[
+                {"remove_index": {"index": "products"}},
+                {"add": {"index": name, "alias": "products"}},
+            ]
+        )
+        self.client.indices.delete.assert_not_called()
+
+    def test_new_index_is_deleted_when_loading_fails(self):
+        with self.assertRaises(CommandError):
+            self.rebuild(side_effect=CommandError("2 documents failed"))
+
+        name = self.document._index.clone.call_args.kwargs["name"]
+        self.client.indices.delete.assert_called_once_with(index=name, ignore_unavailable=True)
+        self.client.indices.update_aliases.assert_not_called()
@@ -1,5 +1,7 @@
+from django.db import connection
 from django.urls import reverse
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from shop.models import Price, Product
 from api.test_utils import SetupTestData, send_request
 
@@ -102,3 +104,35 @@ class TestProductViewSet(TestCase):
             )
             self.assertEqual(response["results"][i]["city_price"], prices[self.popular_prods[i].id]["price"])
             self.assertEqual(response["results"][i]["old_price"], prices[self.popular_prods[i].id]["old_price"])
+
+    def test_list_view_with_cursor_pagination(self):
+        path = reverse("api:products-list")
+        params = {"city_domain": self.c.domain, "pagination": "cursor", "order_by": "price"}
+        for idx, prod in enumerate(self.popular_prods, 1):
+            self.s.setup_price(prod, self.cg.name, 100 * (len(self.popular_prods) - idx // 2))
+
+        response = send_request(self.client.get, path, params).json()
+        self.assertNotIn("count", response)
+        self.assertIsNone(response["previous"])
+
+        ids = [p["id"] for p in response["results"]["products"]]
+        while response["next"]:
+            response = send_request(self.client.get, response["next"]).json()
+            ids.extend(p["id"] for p in response["results"]["products"])
+
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), {p.id for p in self.popular_prods})
+        self.assertIsNotNone(response["previous"])
+
+    def test_list_view_with_cursor_pagination_does_not_count(self):
+        path = reverse("api:products-list")
+        params = {"city_domain": self.c.domain, "pagination": "cursor"}
+        for idx, prod in enumerate(self.popular_prods, 1):
+            self.s.setup_price(prod, self.cg.name, 100 * idx)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = send_request(self.client.get, path, params)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["results"]["products"])
+        self.assertFalse([query["sql"] for query in queries if '"__count"' in query["sql"]])
@@ -283,6 +283,21 @@ class CategoryViewSet(
     serializer_class = CategorySerializer
     permission_classes = [ReadOnlyOrAdminPermission]
 
+    _list_cache_lifetime = 60 * 60 * 6
+    _retrieve_cache_lifetime = 60 * 60 * 6
+    cache_tags = (
+        "shop.category",
+        "shop.product",
+        "shop.catalogprice",
+        "account.city",
+        "account.citygroup",
+    )
+    cache_retrieve_tags = ("shop.category",)
+    cache_refresh_in_background = True
+    cache_rendered = True
+    cache_compress = True
+    cache_collapse_city_domain = True
+
     def initial(self, request, *args, **kwargs):
         self.domain = request.query_params.get("city_domain", "")
         return super().initial(request, *args, **kwargs)
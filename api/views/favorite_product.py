@@ -161,6 +161,9 @@ class FavoriteProductViewSet(AnnotateProductMixin, ActiveQuerysetMixin, Integrit
     queryset = FavoriteProduct.objects.all()
     serializer_class = FavoriteProductSerializer
     permission_classes = [IsAuthenticated]
+    cache_per_user = True
+    cache_tags = ("shop.favoriteproduct", "shop.product", "shop.catalogprice")
+    cache_retrieve_tags = ("shop.product", "shop.catalogprice")
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -7,8 +7,7 @@ from django.views.decorators.cache import cache_page
 from django.core.files.storage import default_storage
 
 from shop.models import Product
-from account.models import City
-from shop.services import FeedsService
+from shop.services import CityTable, FeedsService
 from api.serializers.setting import SettingSerializer
 
 
@@ -72,8 +71,7 @@ class FeedsView(APIView):
 
     # @method_decorator(cache_page(120 * 60))
     def get(self, request):
-        city_domain = request.query_params.get("city_domain")
-        c = City.objects.filter(domain=city_domain).first()
+        c = CityTable.get_request_city(request, request.query_params.get("city_domain"))
         if not c:
             return JsonResponse({"error": "City with provided domain not found."}, status=400)
 
@@ -5,9 +5,8 @@ from rest_framework.response import Response
 from rest_framework.status import HTTP_200_OK, HTTP_503_SERVICE_UNAVAILABLE
 
 from account.models import CityGroup
-from api.mixins import GeneralSearchMixin, PriceFilterMixin, AnnotateProductMixin, CategoriesWithProductsMixin
+from api.mixins import GeneralSearchMixin, PriceFilterMixin, CategoriesWithProductsMixin
 from api.serializers import ProductDocumentSerializer
-from api.views.price import PRICE_RESPONSE_EXAMPLE
 
 
 from drf_spectacular.utils import (
@@ -16,11 +15,9 @@ from drf_spectacular.utils import (
     OpenApiResponse,
     OpenApiParameter,
 )
-from elasticsearch import ConnectionError
+from elasticsearch import ConnectionError, ConnectionTimeout
 
 
-null_price_example = {key: None for key in PRICE_RESPONSE_EXAMPLE.keys() if key != "id"}
-
 product_document_serializer_example = {
     "id": 2,
     "title": "Dummy Title",
@@ -29,11 +26,15 @@ product_document_serializer_example = {
     "search_image": "https://s3.aws.cloud/catalog/products/search_images/search_image1.webp",
     "category_slug": "Dummy Category Slug",
     "slug": "Dummy Slug",
-    "price": PRICE_RESPONSE_EXAMPLE,
+    "price": "1200.00",
+    "old_price": "1500.00",
+    "rating": 4.5,
+    "reviews_count": 12,
 }
 product_document_serializer_example_with_null_price = {
     **product_document_serializer_example,
-    "price": null_price_example,
+    "price": None,
+    "old_price": None,
 }
 category_document_serializer_example = {
     "id": 1,
@@ -91,7 +92,7 @@ brand_document_serializer_example = {
         ),
     },
 )
-class GeneralSearchView(GeneralSearchMixin, APIView, PriceFilterMixin, AnnotateProductMixin, CategoriesWithProductsMixin):
+class GeneralSearchView(GeneralSearchMixin, APIView, PriceFilterMixin, CategoriesWithProductsMixin):
     permission_classes = [AllowAny]
     pagination_class = None
 
@@ -103,28 +104,16 @@ class GeneralSearchView(GeneralSearchMixin, APIView, PriceFilterMixin, AnnotateP
 
         try:
             result, _ = self.g_search(query, cg_domain)
-        except ConnectionError as e:
+        except (ConnectionError, ConnectionTimeout) as e:
             logger.error(str(e))
             return Response(
                 {"error": f"Error connecting to elasticsearch: {str(e)}"},
                 status=HTTP_503_SERVICE_UNAVAILABLE,
             )
 
-        categorized_results = {index: result[index]["queryset"] for index in result}
-        for index in result:
-            r_d = result[index]
-            serializer = r_d["serializer"]
-            queryset = r_d["queryset"]
-
-            func_name = f"_process_{index}"
-            func = getattr(self, func_name, None)
-            if func and callable(func):
-                queryset = func(queryset)
-
-            categorized_results[index] = serializer(queryset, many=True).data
+        categorized_results = {
+            index: result[index]["serializer"](result[index]["hits"], many=True).data
+            for index in result
+        }
 
         return Response(categorized_results, status=HTTP_200_OK)
-    
-    def _process_products(self, queryset):
-        queryset = self.annotate_queryset(queryset, fields=["prices"])
-        return queryset
@@ -352,6 +352,25 @@ class ItemSetElementViewSet(ActiveQuerysetMixin, IntegrityErrorHandlingMixin, Ca
     queryset = ItemSetElement.objects.all()
     serializer_class = ItemSetElementSerializer
     permission_classes = [ReadOnlyOrAdminPermission]
+    cache_tags = (
+        "shop.itemsetelement",
+        "shop.product",
+        "shop.catalogprice",
+        "shop.brand",
+        "shop.category",
+        "shop.banner",
+        "shop.slider",
+        "shop.promo",
+    )
+    cache_retrieve_tags = (
+        "shop.product",
+        "shop.catalogprice",
+        "shop.brand",
+        "shop.category",
+        "shop.banner",
+        "shop.slider",
+        "shop.promo",
+    )
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -17,6 +17,7 @@ from account.models import Store
 from account.views import STORE_RESPONSE
 from api.permissions import ReadOnlyOrAdminPermission
 from shop.models import Page, Setting, SettingChoices
+from shop.services import CityTable
 from api.serializers import PageSerializer, StoreSerializer
 from api.mixins import ActiveQuerysetMixin, IntegrityErrorHandlingMixin, CacheResponse
 
@@ -248,7 +249,8 @@ class PageViewSet(ActiveQuerysetMixin, IntegrityErrorHandlingMixin, CacheRespons
         if not isinstance(data, dict):
             raise ValueError(f"'CONTACT_INFO' setting must be json object.")
         
-        stores = Store.objects.filter(city__domain=self.city_domain)
+        city = CityTable.get_request_city(self.request, self.city_domain)
+        stores = Store.objects.filter(city=city) if city else Store.objects.none()
         if stores.exists():
             data["stores"] = StoreSerializer(stores, many=True).data
             data["city_name"] = stores.first().city.name
@@ -15,13 +15,16 @@ from api.mixins import (
     ProductSorting,
     CacheResponse,
     PriceFilterMixin,
+    SparseFieldset,
+    SparseFieldsetsViewMixin,
 )
-from api.pagination import CustomProductPagination
+from api.mixins.cache_response import CacheTags
+from api.pagination import CursorProductPagination, CustomProductPagination
 from api.filters import ProductFilter
 from api.mixins import AnnotateProductMixin
 from api.permissions import ReadOnlyOrAdminPermission
 from api.serializers import ProductCatalogSerializer
-from api.serializers import ProductDetailSerializer
+from api.serializers import ProductDetailSerializer, ProductCardBuilder
 from api.views.category import CATEGORY_RESPONSE_EXAMPLE
 from api.views.brand import BRAND_RESPONSE_EXAMPLE
 from api.views.productimage import PRODUCT_IMAGE_RESPONSE_EXAMPLE
@@ -152,6 +155,21 @@ RETRIEVE_RESPONSE_EXAMPLE = {
 }
 RETRIEVE_RESPONSE_EXAMPLE.pop("characteristic_values")
 
+SPARSE_FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        name="fields",
+        type=str,
+        location=OpenApiParameter.QUERY,
+        description="Поля ответа через запятую, например `id,slug,title,city_price`",
+    ),
+    OpenApiParameter(
+        name="omit",
+        type=str,
+        location=OpenApiParameter.QUERY,
+        description="Исключаемые поля ответа через запятую, например `groups,files`",
+    ),
+]
+
 
 @extend_schema(tags=["Shop"])
 @extend_schema_view(
@@ -269,6 +287,7 @@ RETRIEVE_RESPONSE_EXAMPLE.pop("characteristic_values")
                 location=OpenApiParameter.QUERY,
                 description="Фильтр по нескольким брендам (slug)",
             ),
+            *SPARSE_FIELDSET_PARAMETERS,
         ],
     ),
     productdetail=extend_schema(
@@ -291,7 +310,8 @@ RETRIEVE_RESPONSE_EXAMPLE.pop("characteristic_values")
                 type=str,
                 location=OpenApiParameter.QUERY,
                 description="Домен города для получения цены товара",
-            )
+            ),
+            *SPARSE_FIELDSET_PARAMETERS,
         ],
     ),
     create=extend_schema(
@@ -388,6 +408,7 @@ RETRIEVE_RESPONSE_EXAMPLE.pop("characteristic_values")
     ),
 )
 class ProductViewSet(
+    SparseFieldsetsViewMixin,
     AnnotateProductMixin,
     ProductSorting,
     ActiveQuerysetMixin,
@@ -407,16 +428,75 @@ class ProductViewSet(
     serializer_class = ProductCatalogSerializer
     pagination_class = CustomProductPagination
 
+    _list_cache_lifetime = 60 * 60 * 6
+    _retrieve_cache_lifetime = 60 * 60 * 6
+    cache_tags = (
+        "shop.product",
+        "shop.category",
+        "shop.brand",
+        "shop.catalogprice",
+        "shop.review",
+        "shop.characteristicvalue",
+        "account.city",
+        "account.citygroup",
+    )
+    cache_retrieve_tags = (
+        "shop.category",
+        "shop.brand",
+        "shop.productgroup",
+        "shop.characteristic",
+        "account.citygroup",
+    )
+    cache_refresh_in_background = True
+    cache_rendered = True
+    cache_compress = True
+    cache_anonymous = True
+    cache_user_overlay = True
+    cache_collapse_city_domain = True
+
     def initial(self, request, *args, **kwargs):
         self.city_domain = self.request.query_params.get("city_domain")
         return super().initial(request, *args, **kwargs)
 
+    def get_cache_tags(self, response):
+        """
+        Дополняет теги карточки товара тегами товаров его групп:
+        в группах выводятся их названия и значения характеристик.
+        """
+        tags = super().get_cache_tags(response)
+        groups = response.data.get("groups") if isinstance(response.data, dict) else None
+        if self.action == "retrieve" and isinstance(groups, dict):
+            tags.extend(
+                CacheTags.for_object(Product, product["id"])
+                for group_list in groups.values()
+                for group in group_list
+                for product in group.get("products", [])
+            )
+
+        return tags
+
     def get_serializer_class(self):
         if self.action not in ("list", "frequenly_bought", "popular_products"):
             return ProductDetailSerializer
 
         return super().get_serializer_class()
 
+    @property
+    def paginator(self):
+        """
+        Использует keyset-пагинацию для каталога, если она запрошена.
+        Для поиска номера страниц определяются выдачей Elasticsearch.
+        """
+        if (
+            not hasattr(self, "_paginator")
+            and self.action == "list"
+            and not self.request.query_params.get("search")
+            and CursorProductPagination.is_requested(self.request)
+        ):
+            self._paginator = CursorProductPagination()
+
+        return super().paginator
+
     def paginate_queryset(self, queryset, count: int = None):
         if count is not None:
             return self.paginator.paginate_queryset(
@@ -428,6 +508,8 @@ class ProductViewSet(
         queryset = super().get_queryset()
 
         queryset = queryset.order_by("-priority", "title", "-created_at")
+        if self.action in ("retrieve", "productdetail"):
+            queryset = ProductDetailSerializer.prefetch_queryset(queryset, self.sparse_fieldset)
         return queryset
 
     def filter_queryset(self, queryset):
@@ -440,7 +522,7 @@ class ProductViewSet(
         )
         qs = filterset.qs
         self.min_qs_price, self.max_qs_price = filterset.min_price, filterset.max_price
-        self.queryset_count = filterset.count
+        self.filterset = filterset
         self.chars = filterset.chars
         self.brand_ids = filterset.brands
 
@@ -450,19 +532,22 @@ class ProductViewSet(
         return qs
 
     def _get_products(self, queryset):
-        queryset = self.get_products_only_with_price(self.annotate_queryset(queryset))
+        # Цены аннотируются всегда: по ним отбираются товары в наличии в городе
+        fields = ["prices"] + [
+            field for field in ("cart_quantity", "category_slug") if self.is_field_requested(field)
+        ]
+        queryset = self.get_products_only_with_price(self.annotate_queryset(queryset, fields=fields))
         return queryset
 
     def get_response(self, queryset, count: int = None) -> Response:
         products = self._get_products(queryset)
-        page = self.paginate_queryset(products, count=count)
+        builder = ProductCardBuilder.for_queryset(products, self.sparse_fieldset)
+        rows = builder.values(products)
+        page = self.paginate_queryset(rows, count=count)
         if page is not None:
-            response = self.get_paginated_response
-        else:
-            response = Response
+            return self.get_paginated_response(builder.build(page))
 
-        serializer = self.get_serializer(page, many=True)
-        return response(serializer.data)
+        return Response(builder.build(rows))
 
     @action(detail=True, methods=["get"])
     def frequenly_bought(self, request, *args, **kwargs):
@@ -490,15 +575,48 @@ class ProductViewSet(
         serializer = self.get_serializer(product)
         return Response(serializer.data)
 
+    def get_cache_query_params(self):
+        sparse_fieldset_params = (SparseFieldset.FIELDS_QUERY_PARAM, SparseFieldset.OMIT_QUERY_PARAM)
+        if self.action != "list":
+            return ("city_domain", *sparse_fieldset_params)
+
+        return (
+            *self.filterset_class.base_filters,
+            "city_domain",
+            "order_by",
+            "page",
+            CursorProductPagination.mode_query_param,
+            CursorProductPagination.cursor_query_param,
+            *sparse_fieldset_params,
+        )
+
+    def apply_user_overlay(self, data):
+        products = data
+        if isinstance(products, dict):
+            products = products.get("results", {})
+        if isinstance(products, dict):
+            products = products.get("products", [])
+
+        if isinstance(products, list) and self.is_field_requested("cart_quantity"):
+            self.apply_cart_quantity(products)
+
+        return data
+
     def list(self, request, *args, **kwargs):
+        return self._get_cached_response(
+            "catalog_list", self._list_cache_lifetime, *args, **kwargs
+        )
+
+    def catalog_list(self, request, *args, **kwargs):
         count = None
         queryset = self.filter_queryset(
             self.get_queryset(),
         )
         if not self.request.query_params.get("search"):
+            # Количество считает пагинатор; в режиме курсора оно не нужно вовсе
             queryset = self.sorted_queryset(queryset)
         else:
-            count = self.queryset_count
+            count = self.filterset.count
 
         brands = Brand.objects.filter(
             id__in=self.brand_ids,
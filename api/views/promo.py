@@ -152,6 +152,14 @@ class PromoViewSet(ActiveQuerysetMixin, IntegrityErrorHandlingMixin, CacheRespon
     queryset = Promo.objects.all()
     serializer_class = PromoSerializer
     permission_classes = [ReadOnlyOrAdminPermission]
+    cache_tags = (
+        "shop.promo",
+        "shop.product",
+        "shop.catalogprice",
+        "shop.category",
+        "account.city",
+    )
+    cache_retrieve_tags = ("shop.product", "shop.catalogprice", "shop.category", "account.city")
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -22,6 +22,19 @@ class SimilarProducts(
     permission_classes = [permissions.AllowAny]
     serializer_class = ProductCatalogSerializer
     queryset = Product.objects.all()
+    cache_tags = ("shop.product", "shop.catalogprice")
+    cache_anonymous = True
+    cache_user_overlay = True
+    cache_collapse_city_domain = True
+    cache_query_params = ("city_domain", "page")
+
+    def get_queryset(self):
+        return self.annotate_queryset(super().get_queryset())
+
+    def apply_user_overlay(self, data):
+        products = data.get("results", []) if isinstance(data, dict) else data
+        self.apply_cart_quantity(products)
+        return data
 
     @extend_schema(
         description="Получить список всех похожих продуктов",
@@ -57,6 +70,5 @@ class SimilarProducts(
             self.queryset = self.queryset.exclude(
                 unavailable_in__domain=self.domain
             )
-        self.queryset = self.annotate_queryset(self.queryset)
 
         return super().list(request, **kwargs)
@@ -1,6 +1,7 @@
 import unittest
 from unittest import mock
 
+from django.core.cache.backends.locmem import LocMemCache
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 
@@ -99,6 +100,35 @@ class OrderViewSetTests(APITestCase):
         self.assertIsInstance(called_args.get("created_at"), (str, type(None)))
 
 
+    def test_list_orders_is_cached_per_user(self):
+        cache = LocMemCache("order-cache-tests", {})
+        cache.clear()
+        patcher = mock.patch("api.mixins.cache_response.cache", cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        other_user = CustomUser.objects.create(
+            email="other@gmail.com", password="other", username="other-users"
+        )
+        orders = {
+            user.pk: Order.objects.create(customer=user, total=100, **self.order_data)
+            for user in (self.user, other_user)
+        }
+        url = reverse("api:cart:orders-list")
+
+        for user in (self.user, other_user, self.user):
+            self.client.force_authenticate(user=user)
+            response = send_request(self.client.get, url)
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual([order["id"] for order in response.json()["results"]], [orders[user.pk].id])
+
+        user_keys = [key for key in cache._cache if "_user_" in key and not key.endswith("_lock")]
+        self.assertEqual(len(user_keys), 2)
+
+        response = send_request(self.client.get, reverse("api:cart:orders-detail", args=[orders[self.user.pk].id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
     def authenticate_user(self):
         self.client.force_authenticate(user=self.user)
 
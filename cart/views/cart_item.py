@@ -261,7 +261,7 @@ class CartItemViewSet(
         queryset = self.annotate_queryset(
             self.filter_queryset(self.get_queryset()),
             prefix="product__",
-            fields=["prices"],
+            fields=["prices", "category_slug"],
         )
         serializer = self.get_serializer(queryset, many=True).data
         return Response(serializer, status=status.HTTP_200_OK)
@@ -6,10 +6,10 @@ from import_app.models import ImportTask, ImportSetting
 
 from decimal import Decimal, InvalidOperation
 from django.db import models, transaction
-from django.core.management import call_command
 from django.contrib.contenttypes.models import ContentType
-from django.core.management.base import CommandError
 from mptt.fields import TreeForeignKey
+from shop.models import Category
+from shop.services import CategoryDescendantsIndex, SearchIndexQueue
 from loguru import logger
 
 
@@ -110,14 +110,8 @@ class ImportTaskService:
             from shop.models import Category
             Category.objects.rebuild()
 
-        # Обновление Elasticsearch-индексов
-        try:
-            call_command('update_index')
-            logger.info('Elasticsearch-индексы успешно обновлены.')
-        except CommandError as e:
-            logger.info(str(e))
-        except Exception as e:
-            logger.error(str(e.with_traceback(e.__traceback__)))
+        # Измененные объекты попадают в очередь инкрементальной индексации Elasticsearch
+        # через сигналы сохранения, полная перестройка индексов не требуется
 
     def categorize_fields(self, model: models.Model, fields: dict) -> None:
         """
@@ -342,7 +336,10 @@ class ImportTaskService:
 
         elif self.inactive_items_action == "ACTIVATE":
             # Активируем все неактивные элементы
-            model.objects.filter(is_active=False).update(is_active=True)
+            queryset = model.objects.filter(is_active=False)
+            SearchIndexQueue.push_queryset(queryset)
+            queryset.update(is_active=True)
+            self.invalidate_category_index(model)
 
         else:
             # Если значение настройки некорректно, записываем ошибку
@@ -354,6 +351,17 @@ class ImportTaskService:
             logger.error(self.invalid_value_error_text_en.format(**format_kwargs))
             self.errors.append(self.invalid_value_error_text_ru.format(**format_kwargs))
 
+    @staticmethod
+    def invalidate_category_index(model: models.Model) -> None:
+        """
+        Сбрасывает индекс потомков категорий после массового `update()` категорий,
+        который не отправляет сигналы.
+
+        :param model: Модель Django, для которой выполнено обновление.
+        """
+        if model is Category:
+            transaction.on_commit(CategoryDescendantsIndex.invalidate)
+
     def process_items_not_in_file_action(self, model: models.Model) -> None:
         """
         Обрабатывает элементы модели, которые отсутствуют в файле.
@@ -366,7 +374,9 @@ class ImportTaskService:
 
         if self.items_not_in_file_action == "DEACTIVATE":
             # Деактивируем элементы, отсутствующие в файле
+            SearchIndexQueue.push_queryset(queryset)
             queryset.update(is_active=False)
+            self.invalidate_category_index(model)
 
         elif self.items_not_in_file_action == "DELETE":
             # Удаляем элементы, отсутствующие в файле
@@ -377,6 +387,7 @@ class ImportTaskService:
             if not hasattr(model, "in_stock"):
                 logger.info(f"У модели '{model.__name__}' отсутствует атрибут 'in_stock', обработка пропущена.")
             else:
+                SearchIndexQueue.push_queryset(queryset)
                 queryset.update(in_stock=False)
 
         elif self.items_not_in_file_action == "IGNORE":
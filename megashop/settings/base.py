@@ -98,6 +98,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "api.middlewares.ApiKeyMiddleware",
+    "api.middlewares.CityMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "debug_toolbar.middleware.DebugToolbarMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -194,6 +195,10 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": PAGE_SIZE,
     "DEFAULT_SCHEMA_CLASS": "api.schema.CustomAutoSchema",
@@ -288,6 +293,21 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 CELERY_BROKER_URL = f"redis://{REDIS_HOST}:6379/0"
 CELERY_RESULT_BACKEND = f"db+postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}/{POSTGRES_NAME}"
 
+# Incremental Elasticsearch indexing queue settings
+SEARCH_INDEX_QUEUE_INTERVAL = int(os.getenv("SEARCH_INDEX_QUEUE_INTERVAL", 10))
+SEARCH_INDEX_QUEUE_BATCH_SIZE = int(os.getenv("SEARCH_INDEX_QUEUE_BATCH_SIZE", 500))
+SEARCH_INDEX_QUEUE_MAX_BATCHES = int(os.getenv("SEARCH_INDEX_QUEUE_MAX_BATCHES", 20))
+
+# General search result cache lifetime, seconds
+SEARCH_CACHE_TIMEOUT = int(os.getenv("SEARCH_CACHE_TIMEOUT", 300))
+
+CELERY_BEAT_SCHEDULE = {
+    "drain-search-index-queue": {
+        "task": "api.tasks.drain_search_index_queue",
+        "schedule": SEARCH_INDEX_QUEUE_INTERVAL,
+    },
+}
+
 # Default token generator setting
 DEFAULT_TOKEN_GENERATOR = PasswordResetTokenGenerator()
 
@@ -1,7 +1,42 @@
-from django.db.models import Avg
 from django_elasticsearch_dsl import Document, fields
 from django_elasticsearch_dsl.registries import registry
-from .models import Category, Product, Brand
+from django.db.models import Exists, OuterRef, Prefetch, QuerySet
+from elasticsearch_dsl import analyzer, token_filter
+from .models import Brand, CatalogPrice, Category, Product
+
+
+# Префиксы слов (edge n-граммы) индексируются заранее, поэтому поиск по началу слова
+# выполняется обычным match по подполю `autocomplete` вместо wildcard `*query*`.
+autocomplete_analyzer = analyzer(
+    "autocomplete",
+    tokenizer="standard",
+    filter=[
+        "lowercase",
+        token_filter("autocomplete_edge_ngram", type="edge_ngram", min_gram=2, max_gram=20),
+    ],
+)
+autocomplete_search_analyzer = analyzer(
+    "autocomplete_search", tokenizer="standard", filter=["lowercase"]
+)
+
+
+def autocomplete_text_field(**kwargs) -> fields.TextField:
+    """
+    Текстовое поле с подполем `autocomplete` для поиска по началу слов.
+
+    :param kwargs: Параметры основного поля.
+    :return: Поле документа.
+    :rtype: fields.TextField
+    """
+    return fields.TextField(
+        fields={
+            "autocomplete": fields.TextField(
+                analyzer=autocomplete_analyzer,
+                search_analyzer=autocomplete_search_analyzer,
+            )
+        },
+        **kwargs,
+    )
 
 
 @registry.register_document
@@ -11,7 +46,9 @@ class CategoryDocument(Document):
     """
 
     id = fields.IntegerField(attr="id")
+    name = autocomplete_text_field()
     products_exist = fields.BooleanField()
+    image = fields.KeywordField(index=False)
 
     class Index:
         name = "categories"
@@ -24,16 +61,32 @@ class CategoryDocument(Document):
 
     class Django:
         model = Category
-        ignore_signals = False
+        # Индексация выполняется очередью SearchIndexQueue, а не синхронно в сигналах
+        ignore_signals = True
         auto_refresh = False
         fields = [
-            "name",
             "description",
             "slug",
             "is_active",
             "is_visible",
         ]
 
+    def get_queryset(self) -> QuerySet:
+        """
+        Категории для индексации с признаком наличия активных товаров с ценами,
+        вычисленным в том же запросе.
+
+        :return: QuerySet категорий.
+        :rtype: QuerySet
+        """
+        return super().get_queryset().annotate(
+            has_products=Exists(
+                Product.objects.filter(
+                    category_id=OuterRef("pk"), is_active=True, prices__isnull=False
+                )
+            )
+        )
+
     def prepare_products_exist(self, instance: Category) -> bool:
         """
         Проверяет наличие активных товаров с ценами в категории.
@@ -41,11 +94,23 @@ class CategoryDocument(Document):
         :param instance: Экземпляр категории.
         :return: True, если товары существуют, иначе False.
         """
+        if hasattr(instance, "has_products"):
+            return instance.has_products
+
         return instance.products.filter(
             is_active=True,
             prices__isnull=False,
         ).exists()
 
+    def prepare_image(self, instance: Category) -> str | None:
+        """
+        Подготовка URL изображения категории для результата поиска.
+
+        :param instance: Экземпляр категории.
+        :return: URL изображения или None.
+        """
+        return instance.image.url if instance.image else None
+
 
 @registry.register_document
 class ProductDocument(Document):
@@ -54,20 +119,24 @@ class ProductDocument(Document):
     """
 
     id = fields.IntegerField(attr="id")
+    title = autocomplete_text_field()
+    description = autocomplete_text_field()
     category = fields.ObjectField(
         properties={
             "slug": fields.TextField(analyzer="russian"),
             "name": fields.TextField(analyzer="russian"),
         }
     )
-    prices = fields.ListField(
-        fields.ObjectField(
-            properties={
-                "amount": fields.FloatField(),
-                "cg_domain": fields.TextField(analyzer="russian"),
-            }
-        )
+    prices = fields.NestedField(
+        properties={
+            "city_group_id": fields.IntegerField(),
+            "cg_domain": fields.KeywordField(),
+            "price": fields.ScaledFloatField(scaling_factor=100),
+            "old_price": fields.ScaledFloatField(scaling_factor=100),
+            "in_promo": fields.BooleanField(),
+        }
     )
+    search_image = fields.KeywordField(index=False)
     rating = fields.FloatField()
 
     def prepare_rating(self, instance: Product) -> float:
@@ -77,27 +146,75 @@ class ProductDocument(Document):
         :param instance: Экземпляр продукта.
         :return: Округленный средний рейтинг.
         """
-        value = (
-            instance.reviews.aggregate(average_rating=Avg("rating"))["average_rating"]
-            or 0.0
-        )
-        return round(value, 1)
+        return round(instance.rating_avg, 1)
 
     def prepare_prices(self, instance: Product) -> list[dict]:
         """
-        Подготовка цен для индексации.
+        Подготовка цен по группам городов для индексации. Цены хранятся строками,
+        чтобы карточка результата поиска отдавала их без потери точности.
 
         :param instance: Экземпляр продукта.
         :return: Список словарей с ценами.
         """
+        prices = instance.catalog_prices.all()
+        if "catalog_prices" not in getattr(instance, "_prefetched_objects_cache", {}):
+            prices = prices.select_related("city_group__main_city")
+
         return [
             {
-                "amount": price.price,
+                "city_group_id": price.city_group_id,
                 "cg_domain": price.city_group.main_city.domain,
+                "price": str(price.price),
+                "old_price": str(price.old_price) if price.old_price is not None else None,
+                "in_promo": price.in_promo,
             }
-            for price in instance.prices.all().select_related("city_group__main_city")
+            for price in prices
+            if price.city_group.main_city is not None
         ]
 
+    def prepare_search_image(self, instance: Product) -> str | None:
+        """
+        Подготовка URL изображения для карточки результата поиска.
+
+        :param instance: Экземпляр продукта.
+        :return: URL изображения или None.
+        """
+        return instance.search_image.url if instance.search_image else None
+
+    def get_queryset(self) -> QuerySet:
+        """
+        Товары для индексации вместе с категориями и ценами с доменами групп городов:
+        один запрос товаров и один запрос цен на пачку. Рейтинг хранится в товаре.
+
+        :return: QuerySet товаров.
+        :rtype: QuerySet
+        """
+        return (
+            super()
+            .get_queryset()
+            .select_related("category")
+            .prefetch_related(
+                Prefetch(
+                    "catalog_prices",
+                    queryset=CatalogPrice.objects.select_related("city_group__main_city"),
+                )
+            )
+        )
+
+    @staticmethod
+    def set_city_prices(hit, cg_domain: str) -> None:
+        """
+        Выставляет результату поиска цену и старую цену в группе городов домена.
+
+        :param hit: Результат поиска из индекса товаров.
+        :param cg_domain: Домен главного города группы.
+        """
+        price = next(
+            (price for price in hit.prices or [] if price.cg_domain == cg_domain), None
+        )
+        hit.city_price = price.price if price else None
+        hit.old_price = price.old_price if price else None
+
     class Index:
         name = "products"
         settings = {
@@ -109,9 +226,8 @@ class ProductDocument(Document):
 
     class Django:
         model = Product
+        ignore_signals = True
         fields = [
-            "title",
-            "description",
             "article",
             "in_stock",
             "is_new",
@@ -119,6 +235,7 @@ class ProductDocument(Document):
             "priority",
             "slug",
             "is_active",
+            "reviews_count",
         ]
 
 
@@ -129,6 +246,7 @@ class BrandDocument(Document):
     """
 
     id = fields.IntegerField(attr="id")
+    name = autocomplete_text_field()
 
     class Index:
         name = "brands"
@@ -141,8 +259,8 @@ class BrandDocument(Document):
 
     class Django:
         model = Brand
+        ignore_signals = True
         fields = [
-            "name",
             "slug",
             "is_active",
         ]
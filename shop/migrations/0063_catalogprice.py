@@ -0,0 +1,53 @@
+# Generated by Django 4.2.11 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_catalog_prices(apps, schema_editor):
+    Price = apps.get_model("shop", "Price")
+    CatalogPrice = apps.get_model("shop", "CatalogPrice")
+
+    objs = [
+        CatalogPrice(
+            product_id=product_id,
+            city_group_id=city_group_id,
+            price=price,
+            old_price=old_price,
+            in_promo=bool(price and old_price and price < old_price),
+        )
+        for product_id, city_group_id, price, old_price in Price.objects.values_list(
+            "product_id", "city_group_id", "price", "old_price"
+        ).iterator()
+    ]
+    CatalogPrice.objects.bulk_create(objs, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0012_store_latitude_store_longitude'),
+        ('shop', '0062_alter_opengraphmeta_description_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена')),
+                ('old_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Старая цена')),
+                ('in_promo', models.BooleanField(default=False, verbose_name='Участвует в акции')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('city_group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='catalog_prices', to='account.citygroup', verbose_name='Группа городов')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='catalog_prices', to='shop.product', verbose_name='Продукт')),
+            ],
+            options={
+                'verbose_name': 'Цена в каталоге',
+                'verbose_name_plural': 'Цены в каталоге',
+                'indexes': [models.Index(fields=['city_group', 'price'], name='catalogprice_cg_price_idx')],
+                'unique_together': {('product', 'city_group')},
+            },
+        ),
+        migrations.RunPython(fill_catalog_prices, migrations.RunPython.noop),
+    ]
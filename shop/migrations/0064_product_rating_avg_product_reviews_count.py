@@ -0,0 +1,45 @@
+# Generated by Django 4.2.11 on 2026-10-18 12:00
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_product_ratings(apps, schema_editor):
+    Product = apps.get_model("shop", "Product")
+    Review = apps.get_model("shop", "Review")
+
+    reviews = (
+        Review.objects.filter(product_id=OuterRef("pk"), is_active=True)
+        .order_by()
+        .values("product_id")
+    )
+    Product.objects.update(
+        rating_avg=Coalesce(Subquery(reviews.annotate(value=Avg("rating")).values("value")), 0.0),
+        reviews_count=Coalesce(Subquery(reviews.annotate(value=Count("pk")).values("value")), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0063_catalogprice'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_avg',
+            field=models.FloatField(default=0.0, editable=False, verbose_name='Средний рейтинг'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество отзывов'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-rating_avg', '-priority'], name='product_rating_priority_idx'),
+        ),
+        migrations.RunPython(fill_product_ratings, migrations.RunPython.noop),
+    ]
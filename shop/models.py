@@ -1,7 +1,8 @@
 import os
 
 from typing import Optional, Union
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MaxValueValidator, MinValueValidator, validate_image_file_extension
@@ -12,6 +13,7 @@ from django.contrib.contenttypes.models import ContentType
 from unidecode import unidecode
 
 from account.models import City, CityGroup, CustomUser, TimeBasedModel
+from mptt.managers import TreeManager
 from mptt.models import MPTTModel, TreeForeignKey
 
 from shop.validators import validate_object_exists, FileSizeValidator
@@ -26,6 +28,20 @@ class ThumbModel(TimeBasedModel):
     )
 
 
+class CategoryManager(TreeManager):
+    """
+    Менеджер категорий, сбрасывающий индекс потомков после перестроения дерева
+    (после фиксации транзакции).
+    """
+
+    def rebuild(self):
+        super().rebuild()
+
+        from shop.services.category_index import CategoryDescendantsIndex
+
+        transaction.on_commit(CategoryDescendantsIndex.invalidate)
+
+
 class Category(MPTTModel, ThumbModel):
     name = models.CharField(
         max_length=255,
@@ -67,6 +83,8 @@ class Category(MPTTModel, ThumbModel):
     )
     opengraph_metadata = GenericRelation("OpenGraphMeta", related_query_name="category")
 
+    objects = CategoryManager()
+
     def get_absolute_url(self):
         return f"katalog/{self.slug}"
 
@@ -193,6 +211,12 @@ class Product(ThumbModel):
             MinValueValidator(1),
         ],
     )
+    rating_avg = models.FloatField(
+        default=0.0, verbose_name=_("Средний рейтинг"), editable=False
+    )
+    reviews_count = models.PositiveIntegerField(
+        default=0, verbose_name=_("Количество отзывов"), editable=False
+    )
     frequenly_bought_together = models.ManyToManyField(
         "self",
         through="ProductFrequenlyBoughtTogether",
@@ -242,6 +266,7 @@ class Product(ThumbModel):
             models.Index(fields=["slug"]),
             models.Index(fields=["category"]),
             models.Index(fields=["article"]),
+            models.Index(fields=["-rating_avg", "-priority"], name="product_rating_priority_idx"),
         ]
         ordering = ("-priority", "title", "-created_at")
 
@@ -262,6 +287,34 @@ class Product(ThumbModel):
     def get_absolute_url(self):
         return os.path.join("katalog", self.category.slug, self.slug)
 
+    @classmethod
+    def update_rating(cls, product_ids=None) -> int:
+        """
+        Пересчитывает средний рейтинг и количество активных отзывов одним UPDATE.
+
+        :param product_ids: Идентификаторы товаров. Если не указаны, пересчитываются все товары.
+        :return: Количество обновленных товаров.
+        """
+        reviews = (
+            Review.objects.filter(product_id=models.OuterRef("pk"), is_active=True)
+            .order_by()
+            .values("product_id")
+        )
+        queryset = cls.objects.all()
+        if product_ids is not None:
+            queryset = queryset.filter(pk__in=product_ids)
+
+        return queryset.update(
+            rating_avg=Coalesce(
+                models.Subquery(reviews.annotate(value=models.Avg("rating")).values("value")),
+                0.0,
+            ),
+            reviews_count=Coalesce(
+                models.Subquery(reviews.annotate(value=models.Count("pk")).values("value")),
+                0,
+            ),
+        )
+
 
 class FavoriteProduct(TimeBasedModel):
     user = models.ForeignKey(
@@ -517,6 +570,88 @@ class Price(TimeBasedModel):
         return f"{self.product.title} - {self.city_group.name}: {self.price}"
 
 
+class CatalogPrice(models.Model):
+    """
+    Денормализованная цена товара в группе городов для выборок каталога.
+
+    Заполняется сигналами модели `Price`, вручную не редактируется.
+    """
+
+    product = models.ForeignKey(
+        Product,
+        related_name="catalog_prices",
+        on_delete=models.CASCADE,
+        verbose_name=_("Продукт"),
+    )
+    city_group = models.ForeignKey(
+        CityGroup,
+        related_name="catalog_prices",
+        on_delete=models.CASCADE,
+        verbose_name=_("Группа городов"),
+    )
+    price = models.DecimalField(_("Цена"), max_digits=10, decimal_places=2)
+    old_price = models.DecimalField(
+        _("Старая цена"), max_digits=10, decimal_places=2, null=True, blank=True
+    )
+    in_promo = models.BooleanField(_("Участвует в акции"), default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Цена в каталоге")
+        verbose_name_plural = _("Цены в каталоге")
+        unique_together = ("product", "city_group")
+        indexes = [
+            models.Index(fields=["city_group", "price"], name="catalogprice_cg_price_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} - {self.city_group_id}: {self.price}"
+
+    @staticmethod
+    def is_in_promo(price, old_price) -> bool:
+        return bool(price and old_price and price < old_price)
+
+    @classmethod
+    def sync(cls, price: Price) -> None:
+        """
+        Обновляет строку каталога по объекту `Price`.
+        """
+        cls.objects.update_or_create(
+            product_id=price.product_id,
+            city_group_id=price.city_group_id,
+            defaults={
+                "price": price.price,
+                "old_price": price.old_price,
+                "in_promo": cls.is_in_promo(price.price, price.old_price),
+            },
+        )
+
+    @classmethod
+    def rebuild(cls, batch_size: int = 1000) -> int:
+        """
+        Полностью пересобирает цены каталога по таблице `Price`.
+
+        :return: Количество созданных строк.
+        """
+        objs = [
+            cls(
+                product_id=product_id,
+                city_group_id=city_group_id,
+                price=price,
+                old_price=old_price,
+                in_promo=cls.is_in_promo(price, old_price),
+            )
+            for product_id, city_group_id, price, old_price in Price.objects.values_list(
+                "product_id", "city_group_id", "price", "old_price"
+            ).iterator()
+        ]
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(objs, batch_size=batch_size)
+
+        return len(objs)
+
+
 class SettingChoices(models.TextChoices):
     CDN_ADDRESS = "cdn_address", _("Адрес CDN")
     MAINTENANCE = "maintenance", _("Тех. работы")
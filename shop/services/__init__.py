@@ -1,4 +1,10 @@
 from .metadata_service import MetaDataService
 from .feed import FeedsService
 from .mail import EmailService
-from .sitemap import SitemapService
\ No newline at end of file
+from .sitemap import SitemapService
+from .facets import CharacteristicFacetService
+from .category_index import CategoryDescendantsIndex
+from .category_tree import CategoryTree
+from .city_table import CityTable
+from .search_queries import SearchQueryBuilder
+from .search_index_queue import SearchIndexQueue
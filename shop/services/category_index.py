@@ -0,0 +1,148 @@
+from typing import Dict, Iterable, List, Optional, Set
+
+from django.core.cache import cache
+
+from shop.models import Category
+
+
+class CategoryDescendantsIndex:
+    """
+    Предрассчитанный индекс потомков категорий.
+
+    Хранит для каждой категории идентификаторы всех видимых и активных потомков,
+    а также соответствие слагов идентификаторам. Индекс лежит в Redis и
+    дублируется в памяти процесса; актуальность памяти процесса проверяется
+    по версии индекса в Redis.
+    """
+
+    CACHE_KEY = "CATEGORY_DESCENDANTS_INDEX"
+    VERSION_CACHE_KEY = "CATEGORY_DESCENDANTS_INDEX_VERSION"
+    CACHE_TIMEOUT = 60 * 60 * 24
+
+    _local: Dict[str, Optional[dict]] = {"version": None, "index": None}
+
+    @classmethod
+    def build(cls) -> dict:
+        """
+        Строит индекс одним запросом к таблице категорий.
+
+        :return: Словарь с ключами `descendants` (id -> список id потомков) и `slugs` (slug -> id).
+        """
+        rows = list(
+            Category.objects.order_by().values_list(
+                "id", "parent_id", "slug", "is_active", "is_visible"
+            )
+        )
+        parents = {pk: parent_id for pk, parent_id, *_ in rows}
+        descendants: Dict[int, List[int]] = {pk: [] for pk in parents}
+
+        for pk, parent_id, _, is_active, is_visible in rows:
+            if not (is_active and is_visible):
+                continue
+
+            while parent_id is not None:
+                descendants[parent_id].append(pk)
+                parent_id = parents.get(parent_id)
+
+        return {
+            "descendants": descendants,
+            "slugs": {slug: pk for pk, _, slug, *_ in rows},
+        }
+
+    @classmethod
+    def get_index(cls) -> dict:
+        """
+        Возвращает индекс из памяти процесса, Redis или строит его заново.
+
+        :return: Индекс потомков категорий.
+        """
+        version = cls.get_version()
+        if cls._local["version"] == version and cls._local["index"] is not None:
+            return cls._local["index"]
+
+        cached = cache.get(cls.CACHE_KEY)
+        if not cached or cached.get("version") != version:
+            cached = {"version": version, "index": cls.build()}
+            cache.set(cls.CACHE_KEY, cached, cls.CACHE_TIMEOUT)
+
+        cls._local = {"version": version, "index": cached["index"]}
+        return cached["index"]
+
+    @classmethod
+    def get_version(cls) -> int:
+        """
+        Возвращает текущую версию дерева категорий. Версия меняется при любом
+        изменении категорий и используется производными кешами.
+
+        :return: Версия индекса.
+        """
+        version = cache.get(cls.VERSION_CACHE_KEY)
+        if version is None:
+            version = cls._bump_version()
+
+        return version
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """
+        Сбрасывает индекс во всех процессах.
+        """
+        cache.delete(cls.CACHE_KEY)
+        cls._bump_version()
+        cls._local = {"version": None, "index": None}
+
+    @classmethod
+    def _bump_version(cls) -> int:
+        """
+        Увеличивает версию индекса в Redis.
+
+        :return: Новая версия индекса.
+        """
+        try:
+            version = cache.incr(cls.VERSION_CACHE_KEY)
+        except ValueError:
+            version = 1
+            cache.set(cls.VERSION_CACHE_KEY, version, None)
+
+        return version
+
+    @classmethod
+    def get_descendant_ids(
+        cls, category_ids: Iterable[int], include_self: bool = True
+    ) -> Set[int]:
+        """
+        Возвращает идентификаторы видимых и активных потомков категорий.
+
+        :param category_ids: Идентификаторы категорий.
+        :param include_self: Включать ли сами переданные категории.
+        :return: Множество идентификаторов категорий.
+        """
+        descendants = cls.get_index()["descendants"]
+        result = set()
+        for pk in category_ids:
+            if pk not in descendants:
+                continue
+
+            if include_self:
+                result.add(pk)
+            result.update(descendants[pk])
+
+        return result
+
+    @classmethod
+    def get_ids_by_slugs(
+        cls, slugs: Iterable[str], include_descendants: bool = True
+    ) -> Set[int]:
+        """
+        Возвращает идентификаторы категорий по слагам (и их потомков).
+
+        :param slugs: Слаги категорий.
+        :param include_descendants: Включать ли потомков категорий.
+        :return: Множество идентификаторов категорий.
+        """
+        slug_map = cls.get_index()["slugs"]
+        ids = {slug_map[slug] for slug in slugs if slug in slug_map}
+        if not include_descendants:
+            return ids
+
+        return cls.get_descendant_ids(ids)
@@ -0,0 +1,86 @@
+from typing import Dict, List, Optional
+
+from django.core.cache import cache
+
+from shop.models import Category
+from shop.services.category_index import CategoryDescendantsIndex
+
+
+class CategoryTree:
+    """
+    Снимок дерева категорий, построенный одним запросом в порядке MPTT.
+
+    Снимок хранит экземпляры категорий и списки детей каждой категории, что
+    позволяет получать детей и предков без обращений к базе. Снимок лежит в
+    Redis и дублируется в памяти процесса; версия совпадает с версией
+    `CategoryDescendantsIndex` и меняется при любом изменении категорий.
+    """
+
+    CACHE_KEY = "CATEGORY_TREE_SNAPSHOT"
+    CACHE_TIMEOUT = 60 * 60 * 24
+
+    _local: Dict[str, Optional[dict]] = {"version": None, "tree": None}
+
+    @classmethod
+    def build(cls) -> dict:
+        """
+        Строит снимок дерева одним запросом к таблице категорий.
+
+        :return: Словарь с ключами `nodes` (id -> категория) и `children` (id -> список id детей).
+        """
+        nodes = {}
+        children: Dict[Optional[int], List[int]] = {}
+        for category in Category.objects.order_by("tree_id", "lft"):
+            nodes[category.pk] = category
+            children.setdefault(category.parent_id, []).append(category.pk)
+
+        return {"nodes": nodes, "children": children}
+
+    @classmethod
+    def get_tree(cls) -> dict:
+        """
+        Возвращает снимок из памяти процесса, Redis или строит его заново.
+
+        :return: Снимок дерева категорий.
+        """
+        version = CategoryDescendantsIndex.get_version()
+        if cls._local["version"] == version and cls._local["tree"] is not None:
+            return cls._local["tree"]
+
+        cached = cache.get(cls.CACHE_KEY)
+        if not cached or cached.get("version") != version:
+            cached = {"version": version, "tree": cls.build()}
+            cache.set(cls.CACHE_KEY, cached, cls.CACHE_TIMEOUT)
+
+        cls._local = {"version": version, "tree": cached["tree"]}
+        return cached["tree"]
+
+    @staticmethod
+    def get_children(tree: dict, category_id: int) -> List[Category]:
+        """
+        Возвращает детей категории в порядке дерева.
+
+        :param tree: Снимок дерева категорий.
+        :param category_id: Идентификатор категории.
+        :return: Список дочерних категорий.
+        """
+        nodes = tree["nodes"]
+        return [nodes[pk] for pk in tree["children"].get(category_id, [])]
+
+    @staticmethod
+    def get_ancestors(tree: dict, category: Category) -> List[Category]:
+        """
+        Возвращает предков категории, начиная от корневой категории до родителя.
+
+        :param tree: Снимок дерева категорий.
+        :param category: Категория.
+        :return: Список родительских категорий.
+        """
+        nodes = tree["nodes"]
+        ancestors = []
+        parent = nodes.get(category.parent_id)
+        while parent is not None:
+            ancestors.append(parent)
+            parent = nodes.get(parent.parent_id)
+
+        return list(reversed(ancestors))
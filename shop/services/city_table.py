@@ -0,0 +1,138 @@
+import time
+from typing import Dict, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+
+from account.models import City, CityGroup
+
+
+class CityTable:
+    """
+    Таблица всех городов в памяти процесса.
+
+    Строится одним запросом (города вместе с группами) и перестраивается при
+    смене версии в Redis, которая увеличивается при изменении городов и групп.
+    Версия проверяется не чаще одного раза в `VERSION_CHECK_INTERVAL` секунд.
+    """
+
+    VERSION_CACHE_KEY = "CITY_TABLE_VERSION"
+    VERSION_CHECK_INTERVAL = 5
+
+    _local: Dict[str, Optional[object]] = {"version": None, "checked_at": 0.0, "table": None}
+
+    @classmethod
+    def build(cls) -> dict:
+        """
+        Строит таблицу одним запросом к таблице городов.
+
+        :return: Словарь с ключами `by_domain` (домен -> город) и `by_pk` (id -> город).
+        """
+        cities = list(City.objects.select_related("city_group"))
+        return {
+            "by_domain": {city.domain: city for city in cities if city.domain},
+            "by_pk": {city.pk: city for city in cities},
+        }
+
+    @classmethod
+    def get_table(cls) -> dict:
+        """
+        Возвращает таблицу из памяти процесса, перестраивая её при смене версии.
+
+        :return: Таблица городов.
+        """
+        now = time.monotonic()
+        local = cls._local
+        if local["table"] is not None and now - local["checked_at"] < cls.VERSION_CHECK_INTERVAL:
+            return local["table"]
+
+        version = cache.get(cls.VERSION_CACHE_KEY)
+        if version is None:
+            version = cls._bump_version()
+
+        table = local["table"] if local["version"] == version else None
+        if table is None:
+            table = cls.build()
+
+        cls._local = {"version": version, "checked_at": now, "table": table}
+        return table
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """
+        Сбрасывает таблицу во всех процессах. Таблица текущего процесса сбрасывается
+        сразу, а версия в Redis увеличивается после фиксации транзакции, чтобы другие
+        процессы не перестроили таблицу по прежним данным под новой версией.
+        """
+        cls._local = {"version": None, "checked_at": 0.0, "table": None}
+        transaction.on_commit(cls._bump_version)
+
+    @classmethod
+    def _bump_version(cls) -> int:
+        """
+        Увеличивает версию таблицы в Redis.
+
+        :return: Новая версия таблицы.
+        """
+        try:
+            version = cache.incr(cls.VERSION_CACHE_KEY)
+        except ValueError:
+            version = 1
+            cache.set(cls.VERSION_CACHE_KEY, version, None)
+
+        return version
+
+    @classmethod
+    def get_city(cls, domain: Optional[str]) -> Optional[City]:
+        """
+        Возвращает город по домену.
+
+        :param domain: Домен города.
+        :return: Объект City или None.
+        """
+        if not domain:
+            return None
+
+        return cls.get_table()["by_domain"].get(domain)
+
+    @classmethod
+    def get_request_city(cls, request, domain: Optional[str]) -> Optional[City]:
+        """
+        Возвращает город запроса по домену, который читает представление.
+        Город, определенный `CityMiddleware`, используется, если он найден по тому же
+        домену; иначе (запрос без middleware или с другим параметром домена) город
+        берется из таблицы.
+
+        :param request: Объект HTTP-запроса.
+        :param domain: Домен города.
+        :return: Объект City или None.
+        """
+        city = getattr(request, "city", None)
+        if city is not None and city.domain == domain:
+            return city
+
+        return cls.get_city(domain)
+
+    @classmethod
+    def get_city_group(cls, domain: Optional[str]) -> Optional[CityGroup]:
+        """
+        Возвращает группу городов по домену города.
+
+        :param domain: Домен города.
+        :return: Объект CityGroup или None.
+        """
+        city = cls.get_city(domain)
+        return city.city_group if city else None
+
+    @classmethod
+    def get_main_city(cls, city_group: Optional[CityGroup]) -> Optional[City]:
+        """
+        Возвращает главный город группы.
+
+        :param city_group: Группа городов.
+        :return: Объект City или None.
+        """
+        if city_group is None or city_group.main_city_id is None:
+            return None
+
+        return cls.get_table()["by_pk"].get(city_group.main_city_id)
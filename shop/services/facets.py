@@ -0,0 +1,67 @@
+from typing import Any, Dict, List
+
+from django.db.models import Count, Exists, Min, OuterRef, Q, QuerySet
+
+from shop.models import Characteristic, CharacteristicValue
+
+
+class CharacteristicFacetService:
+    """
+    Сервис для построения фасетов фильтрации по характеристикам товаров.
+    """
+
+    @classmethod
+    def get_facets(cls, queryset: QuerySet) -> List[Dict[str, Any]]:
+        """
+        Возвращает характеристики для фильтрации, их уникальные значения и
+        количество товаров по каждому значению одним сгруппированным запросом.
+
+        :param queryset: Отфильтрованный QuerySet товаров.
+        :return: Список словарей вида
+            {"name", "slug", "values": [{"value", "slug", "count"}, ...]}.
+        """
+        product_ids = queryset.values("pk")
+        category_ids = queryset.values("category")
+
+        # Характеристика доступна, если привязана к категории товаров или к её родителю
+        char_in_categories = Characteristic.categories.through.objects.filter(
+            Q(category_id__in=category_ids) | Q(category__children__in=category_ids),
+            characteristic_id=OuterRef("characteristic_id"),
+        )
+
+        rows = (
+            CharacteristicValue.objects.filter(
+                Exists(char_in_categories),
+                product__in=product_ids,
+                is_active=True,
+                characteristic__for_filtering=True,
+                characteristic__is_active=True,
+            )
+            .values(
+                "characteristic_id",
+                "characteristic__name",
+                "characteristic__slug",
+                "slug",
+            )
+            .annotate(value=Min("value"), count=Count("product_id", distinct=True))
+            .order_by("characteristic__name", "characteristic_id", "slug")
+        )
+
+        result = []
+        current_id = None
+        for row in rows:
+            if row["characteristic_id"] != current_id:
+                current_id = row["characteristic_id"]
+                result.append(
+                    {
+                        "name": row["characteristic__name"],
+                        "slug": row["characteristic__slug"],
+                        "values": [],
+                    }
+                )
+
+            result[-1]["values"].append(
+                {"value": row["value"], "slug": row["slug"], "count": row["count"]}
+            )
+
+        return result
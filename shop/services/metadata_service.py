@@ -1,9 +1,12 @@
 from typing import Any, Dict, Iterable, Literal
 from django.contrib.contenttypes.models import ContentType
+from django.db.models import Min
 
 from pymorphy2 import MorphAnalyzer
 
-from shop.models import OpenGraphMeta
+from shop.models import OpenGraphMeta, Product
+from shop.services.category_index import CategoryDescendantsIndex
+from shop.services.city_table import CityTable
 from account.models import City, CityGroup
 
 _morph = MorphAnalyzer()
@@ -115,7 +118,7 @@ class MetaDataService:
         :param city_domain: Домен города.
         :return: Объект City.
         """
-        return City.objects.filter(domain=city_domain).first() or City.get_default_city()
+        return CityTable.get_city(city_domain) or City.get_default_city()
 
     @classmethod
     def _get_city_group_name(cls, city: City) -> str:
@@ -194,24 +197,16 @@ class MetaDataService:
             )
             products_count = instance.category.products.count()
         elif instance._meta.model_name == "category":
-            ctgs = (
-                instance.get_descendants(include_self=True)
-                .filter(
-                    is_visible=True,
-                    is_active=True,
-                    products__isnull=False,
-                    products__prices__city_group__name=city_group_name,
-                )
-                .distinct()
+            category_ids = CategoryDescendantsIndex.get_descendant_ids([instance.pk])
+            priced = Product.objects.filter(
+                category_id__in=category_ids,
+                prices__city_group__name=city_group_name,
             )
 
-            price_value = (
-                ctgs.prefetch_related("products__prices")
-                .order_by("products__prices__price")
-                .values_list("products__prices__price", flat=True)
-                .first()
-            )
-            products_count = sum(ctg.products.count() for ctg in ctgs)
+            price_value = priced.aggregate(price=Min("prices__price"))["price"]
+            products_count = Product.objects.filter(
+                category_id__in=priced.values("category_id")
+            ).count()
         else:
             price_value, products_count = None, 0
 
@@ -0,0 +1,145 @@
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Type
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+from django_elasticsearch_dsl import Document
+from django_elasticsearch_dsl.registries import registry
+from django_redis import get_redis_connection
+from elasticsearch.helpers import bulk
+from loguru import logger
+
+
+class SearchIndexQueue:
+    """
+    Очередь инкрементальной индексации документов Elasticsearch.
+
+    Сигналы моделей добавляют id изменённых объектов в Redis-множество документа,
+    периодическая задача Celery забирает их пачками и индексирует только эти объекты.
+    Повторные изменения объекта между запусками задачи схлопываются в одну индексацию.
+    """
+
+    KEY_PREFIX = "search_index_queue:"
+    PAUSE_KEY_PREFIX = "search_index_queue_pause:"
+    PAUSE_TIMEOUT = 6 * 60 * 60
+
+    @classmethod
+    def _get_key(cls, document: Type[Document]) -> str:
+        return cache.make_key(f"{cls.KEY_PREFIX}{document._index._name}")
+
+    @classmethod
+    def _get_pause_key(cls, document: Type[Document]) -> str:
+        return f"{cls.PAUSE_KEY_PREFIX}{document._index._name}"
+
+    @classmethod
+    @contextmanager
+    def pause(cls, document: Type[Document]) -> Iterator[None]:
+        """
+        Приостанавливает индексацию очереди документа, например на время перестройки
+        индекса: изменения накапливаются в очереди и применяются после возобновления.
+
+        :param document: Класс документа.
+        """
+        cache.set(cls._get_pause_key(document), True, cls.PAUSE_TIMEOUT)
+        try:
+            yield
+        finally:
+            cache.delete(cls._get_pause_key(document))
+
+    @staticmethod
+    def _get_connection():
+        return get_redis_connection("default")
+
+    @classmethod
+    def push(cls, model: Type[models.Model], ids: Iterable) -> None:
+        """
+        Добавляет id объектов модели в очереди всех её документов.
+
+        :param model: Модель Django.
+        :param ids: Id изменённых или удалённых объектов.
+        """
+        ids = [pk for pk in ids if pk is not None]
+        documents = registry.get_documents(models=[model])
+        if not ids or not documents:
+            return
+
+        connection = cls._get_connection()
+        for document in documents:
+            connection.sadd(cls._get_key(document), *ids)
+
+    @classmethod
+    def push_queryset(cls, queryset: models.QuerySet) -> None:
+        """
+        Добавляет в очередь все объекты QuerySet. Используется перед массовыми
+        `update()`, которые не отправляют сигналы. Id выбираются сразу,
+        а добавляются в очередь после фиксации транзакции.
+
+        :param queryset: QuerySet изменяемых объектов.
+        """
+        if registry.get_documents(models=[queryset.model]):
+            ids = list(queryset.values_list("pk", flat=True))
+            transaction.on_commit(lambda: cls.push(queryset.model, ids))
+
+    @classmethod
+    def drain(cls, batch_size: int = None, max_batches: int = None) -> Dict[str, List[int]]:
+        """
+        Забирает id из очередей всех документов и индексирует соответствующие объекты.
+        Объекты, которых больше нет в базе данных, удаляются из индекса.
+        При ошибке индексации id возвращаются в очередь. Приостановленные очереди пропускаются.
+
+        :param batch_size: Размер пачки id.
+        :param max_batches: Максимальное количество пачек на документ за один запуск.
+        :return: Проиндексированные id по именам индексов.
+        :rtype: Dict[str, List[int]]
+        """
+        batch_size = batch_size or settings.SEARCH_INDEX_QUEUE_BATCH_SIZE
+        max_batches = max_batches or settings.SEARCH_INDEX_QUEUE_MAX_BATCHES
+        connection = cls._get_connection()
+        indexed = {}
+
+        for document in registry.get_documents():
+            if cache.get(cls._get_pause_key(document)):
+                continue
+
+            key = cls._get_key(document)
+            for _ in range(max_batches):
+                ids = [int(pk) for pk in connection.spop(key, batch_size)]
+                if not ids:
+                    break
+
+                try:
+                    cls.index(document, ids)
+                except Exception as e:
+                    connection.sadd(key, *ids)
+                    logger.error(f"SEARCH INDEX: failed to index {document._index._name}: {e}")
+                    break
+
+                indexed.setdefault(document._index._name, []).extend(ids)
+
+        return indexed
+
+    @staticmethod
+    def index(document: Type[Document], ids: List[int]) -> None:
+        """
+        Индексирует объекты документа одним bulk запросом и удаляет из индекса
+        отсутствующие в базе данных.
+
+        :param document: Класс документа.
+        :param ids: Id объектов.
+        """
+        doc = document()
+        objects = list(doc.get_queryset().filter(pk__in=ids))
+        if objects:
+            doc.update(objects)
+
+        missing = set(ids) - {obj.pk for obj in objects}
+        if missing:
+            bulk(
+                doc._get_connection(),
+                (
+                    {"_op_type": "delete", "_index": document._index._name, "_id": pk}
+                    for pk in missing
+                ),
+                raise_on_error=False,
+            )
@@ -0,0 +1,128 @@
+from elasticsearch_dsl import Q
+from elasticsearch_dsl.query import Query
+
+from shop.documents import BrandDocument, CategoryDocument, ProductDocument
+
+
+class SearchQueryBuilder:
+    """
+    Строит запросы общего поиска по индексам товаров, категорий и брендов.
+
+    Поиск по вхождению подстроки выполняется по подполям `autocomplete` с edge n-граммами.
+    Совпадение оборачивается в `constant_score` с прежним весом, поэтому вклад в релевантность
+    такой же, как у заменённого wildcard запроса `*query*`. Режим `autocomplete=False`
+    строит прежние wildcard запросы и нужен для сверки релевантности.
+    """
+
+    def __init__(self, query: str, autocomplete: bool = True):
+        self.query = query.lower()
+        self.autocomplete = autocomplete
+
+    def contains(self, field: str, boost: float) -> Query:
+        """
+        Запрос на вхождение строки запроса в поле.
+
+        :param field: Имя поля документа.
+        :param boost: Вес совпадения.
+        :return: Запрос Elasticsearch.
+        :rtype: Query
+        """
+        if not self.autocomplete:
+            return Q("wildcard", **{field: {"value": f"*{self.query}*", "boost": boost}})
+
+        return Q(
+            "constant_score",
+            filter=Q(
+                "match", **{f"{field}.autocomplete": {"query": self.query, "operator": "and"}}
+            ),
+            boost=boost,
+        )
+
+    def products(self, domain: str) -> Query:
+        """
+        Запрос по индексу товаров с ценой в группе городов домена.
+
+        :param domain: Домен главного города группы.
+        :return: Запрос Elasticsearch.
+        :rtype: Query
+        """
+        query = self.query
+        return Q(
+            "bool",
+            must=[
+                Q("nested", path="prices", query=Q("term", prices__cg_domain=domain)),
+                Q("term", _index=ProductDocument._index._name),
+            ],
+            should=(
+                Q("term", article={"value": query, "boost": 5.0}),
+                Q("fuzzy", title={"value": query, "fuzziness": "AUTO", "boost": 5.0}),
+                self.contains("title", 2.5),
+                self.contains("description", 1.5),
+                Q("match_phrase", title=query),
+                Q("match_phrase", description=query),
+            ),
+            minimum_should_match=1,
+        )
+
+    def categories(self) -> Query:
+        """
+        Запрос по индексу видимых категорий с товарами.
+
+        :return: Запрос Elasticsearch.
+        :rtype: Query
+        """
+        query = self.query
+        return Q(
+            "bool",
+            must=[
+                Q("term", is_visible=True),
+                Q("term", products_exist=True),
+                Q("term", _index=CategoryDocument._index._name),
+            ],
+            should=(
+                Q("term", name={"value": query, "boost": 4.0}),
+                Q("fuzzy", name={"value": query, "fuzziness": "AUTO", "boost": 4.0}),
+                self.contains("name", 2.7),
+                Q("match", name=query),
+                Q("match_phrase", name=query),
+            ),
+            minimum_should_match=1,
+        )
+
+    def brands(self) -> Query:
+        """
+        Запрос по индексу брендов.
+
+        :return: Запрос Elasticsearch.
+        :rtype: Query
+        """
+        query = self.query
+        return Q(
+            "bool",
+            must=[Q("term", _index=BrandDocument._index._name)],
+            should=[
+                Q("term", name={"value": query, "boost": 3.0}),
+                Q("fuzzy", name={"value": query, "fuzziness": "AUTO", "boost": 3.0}),
+                self.contains("name", 2.6),
+                Q("match_phrase", name=query),
+            ],
+            minimum_should_match=1,
+        )
+
+    def for_index(self, index: str, domain: str) -> Query:
+        """
+        Запрос по индексу с указанным именем.
+
+        :param index: Имя индекса.
+        :param domain: Домен главного города группы.
+        :return: Запрос Elasticsearch.
+        :rtype: Query
+        """
+        if index == ProductDocument._index._name:
+            return self.products(domain)
+        if index == CategoryDocument._index._name:
+            return self.categories()
+        if index == BrandDocument._index._name:
+            return self.brands()
+
+        raise ValueError(f"Unknown search index: {index}")
@@ -4,10 +4,15 @@ import os
 from PIL import Image
 from django.conf import settings
 from loguru import logger
-from shop.models import ThumbModel
+from shop.models import ThumbModel, Brand, Category, Price, CatalogPrice, Product, Review
+from shop.services.category_index import CategoryDescendantsIndex
+from shop.services.city_table import CityTable
+from shop.services.search_index_queue import SearchIndexQueue
+from account.models import City, CityGroup
+from django.db import transaction
 from django.dispatch import receiver
 from django.core.files.storage import default_storage
-from django.db.models.signals import post_save, pre_delete
+from django.db.models.signals import post_save, post_delete, pre_delete
 
 
 @receiver(pre_delete)
@@ -77,3 +82,163 @@ def set_thumb(sender, instance, created, **kwargs):
                 logger.error(
                     f"Error while creating thumbnail image for {instance.__class__.__name__} object with pk {instance.pk}: {err}"
                 )
+
+
+@receiver(post_save, sender=Price)
+def sync_catalog_price(sender, instance: Price, created, **kwargs):
+    """
+    Синхронизирует денормализованную цену каталога после сохранения цены.
+
+    :param sender: Отправитель сигнала.
+    :param instance: Сохраненная цена.
+    :param created: Флаг, указывающий, был ли объект только что создан.
+    :param kwargs: Дополнительные параметры.
+    """
+    CatalogPrice.sync(instance)
+    if not created:
+        # Группа городов у цены могла смениться - удаляем строки без исходной цены
+        CatalogPrice.objects.filter(product_id=instance.product_id).exclude(
+            city_group_id__in=Price.objects.filter(
+                product_id=instance.product_id
+            ).values("city_group_id")
+        ).delete()
+
+
+@receiver(post_delete, sender=Price)
+def delete_catalog_price(sender, instance: Price, **kwargs):
+    """
+    Удаляет денормализованную цену каталога вместе с исходной ценой.
+
+    :param sender: Отправитель сигнала.
+    :param instance: Удаленная цена.
+    :param kwargs: Дополнительные параметры.
+    """
+    CatalogPrice.objects.filter(
+        product_id=instance.product_id, city_group_id=instance.city_group_id
+    ).delete()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_index(sender, instance: Category, **kwargs):
+    """
+    Сбрасывает индекс потомков категорий при изменении или удалении категории
+    после фиксации транзакции, чтобы индекс не был перестроен по прежнему дереву
+    под новой версией.
+
+    :param sender: Отправитель сигнала.
+    :param instance: Измененная категория.
+    :param kwargs: Дополнительные параметры.
+    """
+    transaction.on_commit(CategoryDescendantsIndex.invalidate)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def update_product_rating(sender, instance: Review, **kwargs):
+    """
+    Пересчитывает рейтинг и количество отзывов товара при создании, изменении,
+    деактивации или удалении отзыва.
+
+    :param sender: Отправитель сигнала.
+    :param instance: Измененный отзыв.
+    :param kwargs: Дополнительные параметры.
+    """
+    Product.update_rating([instance.product_id])
+
+
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+@receiver(post_save, sender=CityGroup)
+@receiver(post_delete, sender=CityGroup)
+def invalidate_city_table(sender, instance, **kwargs):
+    """
+    Сбрасывает таблицу городов при изменении или удалении города или группы городов.
+
+    :param sender: Отправитель сигнала.
+    :param instance: Измененный город или группа городов.
+    :param kwargs: Дополнительные параметры.
+    """
+    CityTable.invalidate()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def enqueue_product_indexing(sender, instance: Product, **kwargs):
+    """
+    Ставит товар и его категорию (наличие товаров) в очередь индексации.
+    Id добавляются после фиксации транзакции, чтобы задача индексации
+    не прочитала из базы данных незафиксированное состояние.
+
+    :param sender: Отправитель сигнала.
+    :param instance: Измененный товар.
+    :param kwargs: Дополнительные параметры.
+    """
+    pk, category_id = instance.pk, instance.category_id
+
+    def push():
+        SearchIndexQueue.push(Product, [pk])
+        SearchIndexQueue.push(Category, [category_id])
+
+    transaction.on_commit(push)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def enqueue_category_indexing(sender, instance: Category, **kwargs):
+    """
+    Ставит категорию и её товары (название и slug категории в документе товара)
+    в очередь индексации после фиксации транзакции.
+
+    :param sender: Отправитель сигнала.
+    :param instance: Измененная категория.
+    :param kwargs: Дополнительные параметры.
+    """
+    pk = instance.pk
+
+    def push():
+        SearchIndexQueue.push(Category, [pk])
+        SearchIndexQueue.push_queryset(Product.objects.filter(category_id=pk))
+
+    transaction.on_commit(push)
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+def enqueue_brand_indexing(sender, instance: Brand, **kwargs):
+    """
+    Ставит бренд в очередь индексации после фиксации транзакции.
+
+    :param sender: Отправитель сигнала.
+    :param instance: Измененный бренд.
+    :param kwargs: Дополнительные параметры.
+    """
+    pk = instance.pk
+    transaction.on_commit(lambda: SearchIndexQueue.push(Brand, [pk]))
+
+
+@receiver(post_save, sender=Price)
+@receiver(post_delete, sender=Price)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def enqueue_related_product_indexing(sender, instance: Price | Review, **kwargs):
+    """
+    Ставит в очередь индексации товар измененной цены или отзыва (цены и рейтинг
+    в документе товара), а для цены - и категорию товара (наличие товаров с ценами).
+    Id добавляются после фиксации транзакции.
+
+    :param sender: Отправитель сигнала.
+    :param instance: Измененная цена или отзыв.
+    :param kwargs: Дополнительные параметры.
+    """
+    product_id = instance.product_id
+
+    def push():
+        SearchIndexQueue.push(Product, [product_id])
+        if sender is Price:
+            SearchIndexQueue.push(
+                Category,
+                Product.objects.filter(pk=product_id).values_list("category_id", flat=True),
+            )
+
+    transaction.on_commit(push)
@@ -1,8 +1,22 @@
 import unittest
+from unittest import mock
+from django.core.cache import cache
 from django.test import TestCase
 from rest_framework import test
 from api.test_utils import send_request
-from shop.models import Product, Category, Brand
+from shop.models import Product, Category, Brand, Price, CatalogPrice, Review, Characteristic, CharacteristicValue
+from shop.services import (
+    CategoryDescendantsIndex,
+    CategoryTree,
+    CharacteristicFacetService,
+    CityTable,
+    SearchIndexQueue,
+    SearchQueryBuilder,
+)
+from account.models import City, CityGroup, CustomUser
+from shop.documents import CategoryDocument, ProductDocument
+from api.middlewares import CityMiddleware
+from django.test import RequestFactory
 from django.urls import reverse
 
 
@@ -38,5 +52,386 @@ class TestProductModel(TestCase):
         self.assertEqual(len(similar_prods), len(self.prod.similar_products.all()))
 
 
+class TestCatalogPriceSync(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="dummy category", order=1)
+        cls.prod = Product.objects.create(
+            title="dummy-product",
+            category=cls.category,
+            article="dummy-article",
+            slug="dummy-product",
+        )
+        cls.cg = CityGroup.objects.create(name="dummy city group")
+        cls.cg1 = CityGroup.objects.create(name="dummy city group 1")
+
+    def test_price_create_and_update_are_mirrored(self):
+        price = Price.objects.create(product=self.prod, city_group=self.cg, price=100, old_price=120)
+
+        catalog_price = CatalogPrice.objects.get(product=self.prod, city_group=self.cg)
+        self.assertEqual(catalog_price.price, 100)
+        self.assertTrue(catalog_price.in_promo)
+
+        price.old_price = None
+        price.save()
+        catalog_price.refresh_from_db()
+        self.assertIsNone(catalog_price.old_price)
+        self.assertFalse(catalog_price.in_promo)
+
+    def test_city_group_change_and_delete_are_mirrored(self):
+        price = Price.objects.create(product=self.prod, city_group=self.cg, price=100)
+
+        price.city_group = self.cg1
+        price.save()
+        self.assertEqual(
+            list(CatalogPrice.objects.filter(product=self.prod).values_list("city_group", flat=True)),
+            [self.cg1.pk],
+        )
+
+        price.delete()
+        self.assertFalse(CatalogPrice.objects.filter(product=self.prod).exists())
+
+
+class TestCategoryDescendantsIndex(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.root = Category.objects.create(name="root", slug="root", order=1)
+        cls.child = Category.objects.create(name="child", slug="child", parent=cls.root, order=2)
+        cls.hidden = Category.objects.create(
+            name="hidden", slug="hidden", parent=cls.root, is_visible=False, order=3
+        )
+
+    def setUp(self):
+        # Категории тестовых данных созданы без фиксации транзакции
+        CategoryDescendantsIndex.invalidate()
+
+    def test_index_contains_visible_descendants_only(self):
+        self.assertEqual(
+            CategoryDescendantsIndex.get_ids_by_slugs(["root"]),
+            {self.root.pk, self.child.pk},
+        )
+
+    def test_index_is_rebuilt_on_category_change(self):
+        CategoryDescendantsIndex.get_index()
+        with self.captureOnCommitCallbacks() as callbacks:
+            grandchild = Category.objects.create(
+                name="grandchild", slug="grandchild", parent=self.child, order=4
+            )
+        self.assertNotIn(
+            grandchild.pk, CategoryDescendantsIndex.get_descendant_ids([self.root.pk])
+        )
+
+        for callback in callbacks:
+            callback()
+        self.assertIn(
+            grandchild.pk, CategoryDescendantsIndex.get_descendant_ids([self.root.pk])
+        )
+
+
+class TestCategoryTree(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.root = Category.objects.create(name="tree root", slug="tree-root", order=1)
+        cls.child = Category.objects.create(
+            name="tree child", slug="tree-child", parent=cls.root, order=2
+        )
+        cls.leaf = Category.objects.create(
+            name="tree leaf", slug="tree-leaf", parent=cls.child, order=3
+        )
+
+    def setUp(self):
+        CategoryDescendantsIndex.invalidate()
+
+    def test_children_and_ancestors_from_snapshot(self):
+        tree = CategoryTree.get_tree()
+
+        with self.assertNumQueries(0):
+            children = CategoryTree.get_children(tree, self.root.pk)
+            ancestors = CategoryTree.get_ancestors(tree, self.leaf)
+
+        self.assertEqual([c.pk for c in children], [self.child.pk])
+        self.assertEqual([c.pk for c in ancestors], [self.root.pk, self.child.pk])
+
+    def test_snapshot_is_rebuilt_on_category_change(self):
+        CategoryTree.get_tree()
+        with self.captureOnCommitCallbacks(execute=True):
+            sibling = Category.objects.create(
+                name="tree sibling", slug="tree-sibling", parent=self.root, order=4
+            )
+        self.assertIn(
+            sibling.pk,
+            [c.pk for c in CategoryTree.get_children(CategoryTree.get_tree(), self.root.pk)],
+        )
+
+
+class TestCharacteristicFacetService(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        parent = Category.objects.create(name="facet parent", slug="facet-parent", order=1)
+        cls.category = Category.objects.create(
+            name="facet child", slug="facet-child", parent=parent, order=2
+        )
+        other = Category.objects.create(name="facet other", slug="facet-other", order=3)
+
+        # Цвет привязан к родительской категории, длина - к чужой, вес не для фильтрации
+        color = Characteristic.objects.create(name="Цвет", slug="facet-color", for_filtering=True)
+        color.categories.add(parent)
+        length = Characteristic.objects.create(name="Длина", slug="facet-length", for_filtering=True)
+        length.categories.add(other)
+        weight = Characteristic.objects.create(name="Вес", slug="facet-weight")
+        weight.categories.add(cls.category)
+
+        products = [
+            Product.objects.create(
+                title=f"facet product {i}", slug=f"facet-product-{i}", article=f"facet-{i}",
+                category=cls.category if i < 3 else other,
+            )
+            for i in range(4)
+        ]
+        for product, value, slug in zip(
+            products, ("красный", "красный", "синий", "зеленый"), ("red", "red", "blue", "green")
+        ):
+            CharacteristicValue.objects.create(product=product, characteristic=color, value=value, slug=slug)
+        CharacteristicValue.objects.create(product=products[0], characteristic=length, value="2", slug="2")
+        CharacteristicValue.objects.create(product=products[0], characteristic=weight, value="5", slug="5")
+
+    def test_facets_are_counted_in_one_query(self):
+        queryset = Product.objects.filter(category=self.category)
+
+        with self.assertNumQueries(1):
+            facets = CharacteristicFacetService.get_facets(queryset)
+
+        self.assertEqual(
+            facets,
+            [
+                {
+                    "name": "Цвет",
+                    "slug": "facet-color",
+                    "values": [
+                        {"value": "синий", "slug": "blue", "count": 1},
+                        {"value": "красный", "slug": "red", "count": 2},
+                    ],
+                }
+            ],
+        )
+
+
+class TestCityTable(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.city_group = CityGroup.objects.create(name="table group")
+        cls.city = City.objects.create(
+            name="table city", domain="table.domain.com", city_group=cls.city_group
+        )
+
+    def test_city_and_group_are_resolved_without_queries(self):
+        CityTable.get_table()
+        with self.assertNumQueries(0):
+            self.assertEqual(CityTable.get_city("table.domain.com"), self.city)
+            self.assertEqual(CityGroup.get_pk_by_domain("table.domain.com"), self.city_group.pk)
+
+    def test_table_is_rebuilt_on_city_change(self):
+        CityTable.get_table()
+        other_group = CityGroup.objects.create(name="other table group")
+        self.city.city_group = other_group
+        self.city.save()
+        self.assertEqual(CityTable.get_city_group("table.domain.com"), other_group)
+
+    def test_version_is_bumped_after_commit(self):
+        CityTable.get_table()
+        version = cache.get(CityTable.VERSION_CACHE_KEY)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.city.save()
+        self.assertEqual(cache.get(CityTable.VERSION_CACHE_KEY), version)
+
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(cache.get(CityTable.VERSION_CACHE_KEY), version)
+
+    def test_middleware_sets_request_city(self):
+        request = RequestFactory().get("/", {"city_domain": "table.domain.com"})
+        CityMiddleware(lambda r: None)(request)
+        self.assertEqual((request.city, request.city_group), (self.city, self.city_group))
+
+    def test_request_city_follows_domain_read_by_view(self):
+        other_city = City.objects.create(
+            name="other table city", domain="other.domain.com", city_group=self.city_group
+        )
+        request = RequestFactory().get("/", {"city_domain": "table.domain.com", "domain": "other.domain.com"})
+        self.assertEqual(CityTable.get_request_city(request, "table.domain.com"), self.city)
+
+        CityMiddleware(lambda r: None)(request)
+        self.assertEqual(CityTable.get_request_city(request, "table.domain.com"), self.city)
+        self.assertEqual(CityTable.get_request_city(request, "other.domain.com"), other_city)
+
+
+class TestProductRatingSync(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="rating category", order=1)
+        cls.prod = Product.objects.create(
+            title="rating-product",
+            category=category,
+            article="rating-article",
+            slug="rating-product",
+        )
+        cls.user = CustomUser.objects.create_user(username="reviewer", password="pass12345")
+
+    def test_rating_follows_review_changes(self):
+        first = Review.objects.create(product=self.prod, user=self.user, rating=5)
+        Review.objects.create(product=self.prod, user=self.user, rating=3)
+        self.prod.refresh_from_db()
+        self.assertEqual((self.prod.rating_avg, self.prod.reviews_count), (4.0, 2))
+
+        first.is_active = False
+        first.save()
+        self.prod.refresh_from_db()
+        self.assertEqual((self.prod.rating_avg, self.prod.reviews_count), (3.0, 1))
+
+        first.delete()
+        Review.objects.filter(product=self.prod).delete()
+        self.prod.refresh_from_db()
+        self.assertEqual((self.prod.rating_avg, self.prod.reviews_count), (0.0, 0))
+
+
 if __name__ == "__main__":
     unittest.main()
+
+
+class TestSearchQueryBuilder(unittest.TestCase):
+
+    def test_contains_uses_autocomplete_subfield(self):
+        query = SearchQueryBuilder("Профнастил").contains("title", 2.5).to_dict()
+
+        self.assertEqual(
+            query,
+            {
+                "constant_score": {
+                    "filter": {
+                        "match": {"title.autocomplete": {"query": "профнастил", "operator": "and"}}
+                    },
+                    "boost": 2.5,
+                }
+            },
+        )
+
+    def test_legacy_contains_uses_wildcard(self):
+        query = SearchQueryBuilder("Профнастил", autocomplete=False).contains("title", 2.5).to_dict()
+
+        self.assertEqual(query, {"wildcard": {"title": {"value": "*профнастил*", "boost": 2.5}}})
+
+    def test_queries_have_no_leading_wildcards(self):
+        builder = SearchQueryBuilder("водосток")
+        queries = [builder.products("moskva"), builder.categories(), builder.brands()]
+
+        for query in queries:
+            self.assertNotIn("wildcard", str(query.to_dict()))
+
+
+class TestSearchIndexQueue(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="queue category", slug="queue-category", order=1)
+        cls.product = Product.objects.create(
+            title="queue product", slug="queue-product", article="queue-article", category=cls.category
+        )
+
+    def setUp(self):
+        with mock.patch.object(SearchIndexQueue, "index"):
+            SearchIndexQueue.drain()
+
+    def test_changes_are_debounced_into_one_indexing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for title in ("first", "second", "third"):
+                self.product.title = title
+                self.product.save()
+
+        with mock.patch.object(SearchIndexQueue, "index") as index:
+            indexed = SearchIndexQueue.drain()
+
+        self.assertEqual(indexed["products"], [self.product.pk])
+        self.assertEqual(indexed["categories"], [self.category.pk])
+        self.assertEqual(index.call_count, 2)
+
+    def test_review_is_fanned_out_to_product(self):
+        user = CustomUser.objects.create_user(username="queue-reviewer", password="pass12345")
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(product=self.product, user=user, rating=5, review="ok")
+
+        with mock.patch.object(SearchIndexQueue, "index"):
+            indexed = SearchIndexQueue.drain()
+
+        self.assertEqual(indexed["products"], [self.product.pk])
+
+    def test_changes_are_queued_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.product.save()
+
+        self.assertEqual(SearchIndexQueue.drain(), {})
+
+        for callback in callbacks:
+            callback()
+        with mock.patch.object(SearchIndexQueue, "index"):
+            self.assertEqual(SearchIndexQueue.drain()["products"], [self.product.pk])
+
+    def test_failed_indexing_keeps_ids_queued(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+
+        with mock.patch.object(SearchIndexQueue, "index", side_effect=ConnectionError):
+            self.assertNotIn("products", SearchIndexQueue.drain())
+
+        with mock.patch.object(SearchIndexQueue, "index"):
+            self.assertEqual(SearchIndexQueue.drain()["products"], [self.product.pk])
+
+
+class TestSearchDocumentQuerysets(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.city_group = CityGroup.objects.create(name="index group")
+        cls.city = City.objects.create(name="index city", domain="index.domain.com", city_group=cls.city_group)
+        cls.city_group.main_city = cls.city
+        cls.city_group.save()
+
+        cls.category = Category.objects.create(name="index category", slug="index-category", order=1)
+        cls.empty_category = Category.objects.create(name="empty category", slug="empty-category", order=2)
+        for i in range(3):
+            product = Product.objects.create(
+                title=f"index product {i}", slug=f"index-product-{i}", article=f"index-{i}", category=cls.category
+            )
+            Price.objects.create(product=product, city_group=cls.city_group, price=100 + i, old_price=200)
+
+    def prepare_all(self, document):
+        doc = document()
+        return [action["_source"] for action in doc.get_actions(doc.get_queryset(), "index")]
+
+    def test_product_documents_are_prepared_in_two_queries(self):
+        with self.assertNumQueries(2):
+            sources = self.prepare_all(ProductDocument)
+
+        self.assertEqual(
+            [source["prices"] for source in sources],
+            [
+                [{"city_group_id": self.city_group.pk, "cg_domain": "index.domain.com",
+                  "price": f"{100 + i}.00", "old_price": "200.00", "in_promo": True}]
+                for i in range(3)
+            ],
+        )
+
+    def test_category_documents_are_prepared_in_one_query(self):
+        with self.assertNumQueries(1):
+            sources = self.prepare_all(CategoryDocument)
+
+        self.assertEqual(
+            {source["slug"]: source["products_exist"] for source in sources},
+            {"index-category": True, "empty-category": False},
+        )
@@ -7,8 +7,7 @@ from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiParamete
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
 
-from account.models import City
-from shop.services import SitemapService
+from shop.services import CityTable, SitemapService
 from api.serializers import SettingSerializer
 
 
@@ -61,7 +60,7 @@ class SitemapView(APIView):
         if not domain:  
             return HttpResponse(status=404)
 
-        c = City.objects.filter(domain=domain).first()
+        c = CityTable.get_request_city(request, domain)
         if not c:
             return HttpResponse(status=404)
 